@@ -1,19 +1,100 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, make_response
-from flask_migrate import Migrate
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, flash, make_response, send_file
 from datetime import datetime, timedelta
+import json
 import os
+import threading
+import time
 import uuid
+from urllib.parse import quote, unquote
 
 from config import config
 from models.database import db
 from models.task import Task
 from models.user import User
-from services.telegram_service import TelegramService
-from services.task_service import TaskService
-from services.analytics_service import AnalyticsService
-from services.auth_service import AuthService
-from services.settings_service import SettingsService
-from utils.decorators import login_required, admin_required, it_staff_required, user_or_higher_required, get_current_user
+from services.registry import ServiceRegistry
+from services.attachment_service import AttachmentTooLarge
+from services.password_service import PasswordServiceBusy
+from services.user_import_service import ImportTooLarge
+from utils.decorators import login_required, admin_required, it_staff_required, user_or_higher_required, get_current_user, upload_size_limit, token_required
+from utils.assets import init_assets
+from utils.compression import init_compression
+from utils.fragment_cache import init_fragment_cache, cached_row
+from utils.http_cache import conditional_get, time_bucket
+from utils.idempotency import idempotent
+from utils.json_provider import init_json_provider
+from utils.scheduler import init_scheduler
+from utils.schema_check import check_label_codes
+from utils.session_store import init_session_store, start_user_session, end_user_session
+
+def create_service_registry(app):
+    """Реестр сервисов приложения"""
+    services = ServiceRegistry()
+    
+    def build_password_service():
+        from services.password_service import PasswordService
+        return PasswordService.from_config(app.config)
+    
+    def build_auth_service():
+        from services.auth_service import AuthService
+        return AuthService(password_service=services.get('password'),
+                           settings_service=services.get('settings'))
+    
+    def build_task_events():
+        from services.task_events import TaskEventBroker
+        return TaskEventBroker.from_config(app.config)
+    
+    def build_task_service():
+        from services.task_service import TaskService
+        return TaskService(events=services.get('task_events'),
+                           summary_ttl=app.config['TASK_SUMMARY_CACHE_SECONDS'])
+    
+    def build_archive_service():
+        from services.archive_service import ArchiveService
+        return ArchiveService(services.get('settings'), batch_size=app.config['ARCHIVE_BATCH_SIZE'])
+    
+    def build_backup_service():
+        from services.backup_service import BackupService
+        return BackupService.from_config(services.get('settings'),
+                                         db.engine.url.render_as_string(hide_password=False), app.config)
+    
+    def build_task_ingest_service():
+        from services.task_ingest_service import TaskIngestService
+        return TaskIngestService(services.get('task'), batch_size=app.config['TASK_INGEST_BATCH_SIZE'])
+    
+    def build_attachment_service():
+        from services.attachment_service import AttachmentService
+        from services.attachment_storage import create_storage
+        return AttachmentService(create_storage(app.config), services.get('settings'),
+                                 chunk_size=app.config['ATTACHMENTS_CHUNK_SIZE'])
+    
+    def build_thumbnail_service():
+        from services.thumbnail_service import ThumbnailService
+        return ThumbnailService.from_config(services.get('attachments').storage, app.config)
+    
+    def build_user_import_service():
+        from services.user_import_service import UserImportService
+        from services.password_service import PasswordService
+        # Свой пул: хеширование пачки импорта не вытесняет входы пользователей
+        return UserImportService(PasswordService.for_import(app.config))
+    
+    services.register('telegram', 'services.telegram_service:TelegramService')
+    services.register('task_events', build_task_events)
+    services.register('task', build_task_service)
+    services.register('task_ingest', build_task_ingest_service)
+    services.register('attachments', build_attachment_service)
+    services.register('thumbnails', build_thumbnail_service)
+    services.register('archive', build_archive_service)
+    services.register('backup', build_backup_service)
+    services.register('analytics', 'services.analytics_service:AnalyticsService')
+    services.register('search', 'services.search_service:SearchService')
+    services.register('settings', 'services.settings_service:SettingsService')
+    services.register('password', build_password_service)
+    services.register('auth', build_auth_service)
+    services.register('user_import', build_user_import_service)
+    # LDAPService хранит соединение текущего вызова, поэтому не разделяется
+    services.register('ldap', 'services.ldap_service:LDAPService', shared=False)
+    
+    return services
 
 def create_app(config_name='default'):
     """Фабрика создания Flask приложения"""
@@ -25,58 +106,173 @@ def create_app(config_name='default'):
     
     # Инициализация расширений
     db.init_app(app)
-    migrate = Migrate(app, db)
+    if app.config['SCHEMA_CHECK_ENABLED']:
+        check_label_codes(app)
+    
+    # Flask-Migrate (alembic) нужен только командам `flask db`, а его импорт
+    # занимает больше половины времени запуска воркера
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    init_session_store(app)
+    init_fragment_cache(app)
+    init_json_provider(app)
+    init_compression(app)
+    init_assets(app)
+    
+    # Регистрация сервисов: создаются лениво при первом обращении
+    services = create_service_registry(app)
+    app.extensions['services'] = services
+    
+    # Фоновые задания воркера: перенос завершенных задач в архив и
+    # резервное копирование базы
+    scheduler = init_scheduler(app)
+    scheduler.add_job('archive', lambda: services.get('archive').archive_due(),
+                      app.config['ARCHIVE_INTERVAL_SECONDS'])
+    scheduler.add_job('backup', lambda: services.get('backup').backup_due(),
+                      app.config['BACKUP_CHECK_INTERVAL_SECONDS'])
+    if app.config['SCHEDULER_ENABLED']:
+        scheduler.start()
+    
+    telegram_service = services.lazy('telegram')
+    task_service = services.lazy('task')
+    task_events = services.lazy('task_events')
+    task_ingest_service = services.lazy('task_ingest')
+    attachment_service = services.lazy('attachments')
+    thumbnail_service = services.lazy('thumbnails')
+    analytics_service = services.lazy('analytics')
+    search_service = services.lazy('search')
+    auth_service = services.lazy('auth')
+    user_import_service = services.lazy('user_import')
+    settings_service = services.lazy('settings')
+    
+    # Маркеры изменений для ETag: считаются до тяжелых запросов обработчика
+    def user_marker():
+        current_user = get_current_user()
+        return (current_user.id, current_user.role, current_user.name)
+    
+    def dashboard_marker():
+        current_user = get_current_user()
+        if current_user.is_admin or current_user.is_it_staff:
+            scope = task_service.get_change_marker(active_only=True)
+        else:
+            scope = task_service.get_change_marker(requester_email=current_user.email)
+        # ID события встроен в страницу; минутный интервал - для просрочки
+        return user_marker() + scope + (task_events.last_id(), time_bucket(60))
+    
+    def tasks_list_marker():
+        current_user = get_current_user()
+        if current_user.is_admin or current_user.is_it_staff:
+            scope = task_service.get_change_marker(
+                status=request.args.get('status'),
+                task_type=request.args.get('type'),
+                priority=request.args.get('priority')
+            )
+        else:
+            scope = task_service.get_change_marker(requester_email=current_user.email)
+        return (current_user.id, current_user.role) + scope
     
-    # Инициализация сервисов
-    telegram_service = TelegramService()
-    task_service = TaskService()
-    analytics_service = AnalyticsService()
-    auth_service = AuthService()
-    settings_service = SettingsService()
+    def task_marker(task_id):
+        updated_at = task_service.get_task_marker(task_id)
+        if updated_at is None:
+            # Задача удалена или перенесена в архив: без ETag
+            return None
+        return user_marker() + (updated_at, time_bucket(60))
+    
+    def analytics_marker():
+        # Окна "за последние 30 дней" сдвигаются со временем: не реже раза в час
+        return task_service.get_change_marker() + (time_bucket(3600),)
+    
+    def dashboard_summary():
+        """Счетчики рабочего стола текущего пользователя (того же набора задач)"""
+        current_user = get_current_user()
+        if current_user.is_admin or current_user.is_it_staff:
+            return task_service.get_task_summary(active_only=True)
+        return task_service.get_task_summary(requester_email=current_user.email)
     
     # Главная страница - рабочий стол с активными задачами
     @app.route('/')
     @user_or_higher_required
+    @conditional_get(dashboard_marker)
     def dashboard():
         """Основной рабочий стол с активными задачами"""
         current_user = get_current_user()
+        # ID события фиксируется до выборки: изменения, сделанные во время
+        # рендеринга, придут в поток событий и не потеряются
+        last_event_id = task_events.last_id()
         if current_user.is_admin or current_user.is_it_staff:
             # Администраторы и IT сотрудники видят все задачи
             tasks = task_service.get_active_tasks()
         else:
             # Обычные пользователи видят только свои задачи
             tasks = task_service.get_tasks_by_requester(str(current_user.id))
-        return render_template('dashboard.html', tasks=tasks, current_user=current_user)
+        # Просрочка считается один раз здесь, а не в шаблоне
+        rows = task_service.mark_overdue_tasks(tasks)
+        return render_template('dashboard.html', rows=rows, counters=dashboard_summary(),
+                               current_user=current_user, last_event_id=last_event_id)
     
     # Архив выполненных задач
+    def archive_filters():
+        """Фильтры архива из параметров запроса (кроме статуса)"""
+        current_user = get_current_user()
+        
+        def parse_date(value):
+            if not value:
+                return None
+            try:
+                return datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"Некорректная дата: {value}")
+        
+        return {
+            'task_type': request.args.get('type') or None,
+            'priority': request.args.get('priority') or None,
+            'date_from': parse_date(request.args.get('date_from')),
+            'date_to': parse_date(request.args.get('date_to')),
+            'search': request.args.get('q'),
+            # IT сотрудники видят только задачи, которые они обрабатывали
+            'assigned_to_id': None if current_user.is_admin else str(current_user.id),
+            # Вместе с задачами, перенесенными в tasks_archive
+            'include_archived': request.args.get('archived') == '1'
+        }
+    
     @app.route('/archive')
     @it_staff_required
     def archive():
-        """Архив выполненных и отмененных задач"""
+        """Архив выполненных и отмененных задач (первая страница)"""
         current_user = get_current_user()
-        if current_user.is_admin:
-            # Администраторы видят все задачи
-            tasks = task_service.get_completed_tasks()
-        else:
-            # IT сотрудники видят только задачи, которые они обрабатывали
-            tasks = task_service.get_completed_tasks_by_user(str(current_user.id))
-        return render_template('archive.html', tasks=tasks, current_user=current_user)
+        try:
+            filters = archive_filters()
+        except ValueError:
+            return redirect(url_for('archive'))
+        
+        tasks, has_next = task_service.get_archive_page(
+            per_page=app.config['TASKS_PER_PAGE'],
+            status=request.args.get('status'),
+            **filters
+        )
+        counters = task_service.get_archive_counters(**filters)
+        return render_template('archive.html', tasks=tasks, counters=counters, has_next=has_next,
+                               current_user=current_user)
     
     # Страница аналитики
     @app.route('/analytics')
     @admin_required
+    @conditional_get(lambda: user_marker() + analytics_marker())
     def analytics():
         """Страница аналитики эффективности"""
-        stats = analytics_service.get_performance_stats()
+        stats = analytics_service.get_performance_stats(include_archived=request.args.get('archived') == '1')
         return render_template('analytics.html', stats=stats, current_user=get_current_user())
     
     # Просмотр и редактирование задачи
     @app.route('/task/<task_id>')
     @user_or_higher_required
+    @conditional_get(task_marker)
     def view_task(task_id):
         """Просмотр и редактирование задачи"""
         current_user = get_current_user()
-        task = task_service.get_task_by_id(task_id)
+        # Задача из архива открывается только для просмотра
+        task = task_service.get_task_by_id(task_id) or task_service.get_archived_task(task_id)
         if not task:
             return redirect(url_for('dashboard'))
         
@@ -85,7 +281,8 @@ def create_app(config_name='default'):
             flash('У вас нет прав для просмотра этой задачи', 'danger')
             return redirect(url_for('dashboard'))
         
-        return render_template('task_detail.html', task=task, current_user=current_user)
+        return render_template('task_detail.html', task=task, current_user=current_user,
+                               thumbnails=attachment_thumbnails(task))
     
     # Аутентификация
     @app.route('/login', methods=['GET', 'POST'])
@@ -95,9 +292,14 @@ def create_app(config_name='default'):
             username = request.form.get('username')
             password = request.form.get('password')
             
-            user = auth_service.authenticate_user(username, password)
+            try:
+                user = auth_service.authenticate_user(username, password)
+            except PasswordServiceBusy as e:
+                flash(str(e), 'warning')
+                return render_template('login.html'), 503
+            
             if user:
-                session['user_id'] = str(user.id)
+                start_user_session(user)
                 flash(f'Добро пожаловать, {user.name}!', 'success')
                 return redirect(url_for('dashboard'))
             else:
@@ -108,7 +310,7 @@ def create_app(config_name='default'):
     @app.route('/logout')
     def logout():
         """Выход из системы"""
-        session.pop('user_id', None)
+        end_user_session()
         flash('Вы успешно вышли из системы', 'info')
         return redirect(url_for('login'))
     
@@ -122,6 +324,8 @@ def create_app(config_name='default'):
     # API для создания задач из веб-формы
     @app.route('/api/tasks', methods=['POST'])
     @user_or_higher_required
+    @upload_size_limit(lambda: attachment_service.max_file_size())
+    @idempotent('tasks.create', content_window=app.config['IDEMPOTENCY_CONTENT_WINDOW'])
     def create_task():
         """API для создания новой задачи из веб-формы"""
         try:
@@ -161,16 +365,32 @@ def create_app(config_name='default'):
             if data['screenshot_url'] == '':
                 data['screenshot_url'] = None
             
-            # Обработка загруженного файла
-            if 'screenshot' in request.files:
-                file = request.files['screenshot']
-                if file and file.filename:
-                    # Здесь можно добавить логику сохранения файла
-                    # Пока просто сохраняем имя файла
-                    data['screenshot_url'] = f"uploaded_file_{file.filename}"
+            # Загруженный файл записывается в хранилище до создания задачи:
+            # слишком большой файл не должен оставлять задачу без вложения
+            file = request.files.get('screenshot')
+            blob = None
+            if file and file.filename:
+                blob = attachment_service.store(file.stream)
             
-            # Создание новой задачи
-            task = task_service.create_task_from_form(data)
+            try:
+                # Создание новой задачи
+                task = task_service.create_task_from_form(data)
+
+                if blob:
+                    attachment = attachment_service.attach(
+                        task, blob, file.filename, file.mimetype, user_id=session.get('user_id'),
+                        screenshot_url=lambda attachment: url_for('download_attachment', attachment_id=attachment.id)
+                    )
+                    thumbnail_service.schedule(attachment)
+            except Exception:
+                # Содержимое без вложения иначе осталось бы в хранилище навсегда
+                if blob:
+                    db.session.rollback()
+                    try:
+                        attachment_service.delete_unreferenced([blob.sha256])
+                    except Exception as cleanup_error:
+                        print(f"Ошибка удаления файла {blob.sha256}: {cleanup_error}")
+                raise
             
             # Отправка уведомления в Telegram (не блокируем создание задачи при ошибке)
             try:
@@ -186,6 +406,11 @@ def create_app(config_name='default'):
                 'task_number': task.task_number
             }), 201
             
+        except AttachmentTooLarge as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 413
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -194,13 +419,10 @@ def create_app(config_name='default'):
     
     # API для создания задач из Google Forms (оставляем для обратной совместимости)
     @app.route('/api/tasks/google-forms', methods=['POST'])
+    @token_required('GOOGLE_FORMS_SECRET_TOKEN')
+    @idempotent('tasks.google_forms', content_window=app.config['IDEMPOTENCY_CONTENT_WINDOW'])
     def create_task_google_forms():
         """API для создания новой задачи из Google Forms (обратная совместимость)"""
-        # Проверка секретного токена
-        auth_token = request.headers.get('Authorization')
-        if not auth_token or auth_token != f"Bearer {app.config['GOOGLE_FORMS_SECRET_TOKEN']}":
-            return jsonify({'error': 'Unauthorized'}), 401
-        
         try:
             data = request.get_json()
             
@@ -223,28 +445,258 @@ def create_app(config_name='default'):
         except Exception as e:
             return jsonify({'error': str(e)}), 400
     
+    @app.route('/api/tasks/ingest', methods=['POST'])
+    @token_required('GOOGLE_FORMS_SECRET_TOKEN')
+    def ingest_tasks():
+        """API пакетного приема заявок (JSON-массив или NDJSON)
+        
+        Повторная отправка заявки с тем же external_id (или тем же
+        содержимым) возвращает уже созданную задачу с duplicate=true.
+        """
+        try:
+            rows = task_ingest_service.parse_stream(request.stream, request.mimetype)
+            results, created = task_ingest_service.ingest(rows, source=request.args.get('source'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Одна сводка вместо уведомления на каждую заявку
+        try:
+            telegram_service.send_new_tasks_digest(created)
+        except Exception as telegram_error:
+            print(f"Ошибка отправки уведомления в Telegram: {telegram_error}")
+        
+        failed = sum(1 for result in results if not result['success'])
+        return jsonify({
+            'success': failed == 0,
+            'created': len(created),
+            'duplicates': sum(1 for result in results if result.get('duplicate')),
+            'failed': failed,
+            'results': results
+        }), 201 if created else 200
+    
     # API для получения списка задач
     @app.route('/api/tasks', methods=['GET'])
     @user_or_higher_required
+    @conditional_get(tasks_list_marker)
     def get_tasks():
-        """API для получения списка задач с фильтрацией"""
+        """API для получения списка задач с фильтрацией
+        
+        fields=id,title,status - только перечисленные поля задач.
+        """
         current_user = get_current_user()
-        status = request.args.get('status')
-        task_type = request.args.get('type')
-        priority = request.args.get('priority')
+        try:
+            fields = task_service.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
         if current_user.is_admin or current_user.is_it_staff:
             # Администраторы и IT сотрудники видят все задачи
-            tasks = task_service.get_tasks_filtered(
-                status=status,
-                task_type=task_type,
-                priority=priority
+            tasks = task_service.get_task_rows(
+                fields=fields,
+                status=request.args.get('status'),
+                task_type=request.args.get('type'),
+                priority=request.args.get('priority')
             )
         else:
             # Обычные пользователи видят только свои задачи
-            tasks = task_service.get_tasks_by_requester(str(current_user.id))
+            tasks = task_service.get_task_rows(fields=fields, requester_email=current_user.email)
         
-        return jsonify([task.to_dict() for task in tasks])
+        return jsonify(tasks)
+    
+    @app.route('/api/tasks/summary', methods=['GET'])
+    @user_or_higher_required
+    def get_tasks_summary():
+        """API счетчиков рабочего стола (всего, неразобранные, в работе, просрочены)"""
+        return jsonify({
+            'success': True,
+            'counters': dashboard_summary()
+        })
+    
+    # Полнотекстовый поиск по задачам
+    @app.route('/search')
+    @user_or_higher_required
+    def search_tasks_page():
+        """Страница поиска по задачам"""
+        return render_template('search.html', current_user=get_current_user())
+    
+    @app.route('/api/tasks/search', methods=['GET'])
+    @user_or_higher_required
+    def search_tasks():
+        """API полнотекстового поиска с ранжированием и подсветкой"""
+        current_user = get_current_user()
+        try:
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = request.args.get('per_page', app.config['TASKS_PER_PAGE'], type=int)
+            results, has_next, truncated = search_service.search(
+                request.args.get('q', ''),
+                page=page,
+                per_page=per_page,
+                status=request.args.get('status') or None,
+                # Обычные пользователи ищут только по своим заявкам
+                requester_email=None if current_user.can_manage_tasks else current_user.email
+            )
+            return jsonify({
+                'success': True,
+                'results': results,
+                'page': page,
+                'per_page': per_page,
+                'has_next': has_next,
+                # Показаны только самые релевантные совпадения (SQLite)
+                'truncated': truncated
+            })
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+    
+    # API для постраничной подгрузки архива
+    @app.route('/api/tasks/archive', methods=['GET'])
+    @it_staff_required
+    def get_archive():
+        """API страницы архива; html=1 - строки таблицы вместо списка задач"""
+        try:
+            filters = archive_filters()
+            status = request.args.get('status')
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = request.args.get('per_page', app.config['TASKS_PER_PAGE'], type=int)
+            tasks, has_next = task_service.get_archive_page(page, per_page, status=status, **filters)
+            
+            payload = {
+                'success': True,
+                'page': page,
+                'per_page': per_page,
+                'has_next': has_next
+            }
+            # Счетчики нужны только при смене фильтров, следующие страницы без них
+            if page == 1:
+                counters = task_service.get_archive_counters(**filters)
+                payload['counters'] = counters
+                payload['total'] = {'Готово': counters['done'],
+                                    'Отменено': counters['cancelled']}.get(status, counters['total'])
+            if request.args.get('html'):
+                payload['html'] = ''.join(cached_row('_archive_row.html', task) for task in tasks)
+            else:
+                payload['tasks'] = [task.to_dict() for task in tasks]
+            return jsonify(payload)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+    
+    # API синхронизации: изменения задач после водяного знака
+    @app.route('/api/tasks/changes', methods=['GET'])
+    @user_or_higher_required
+    def get_task_changes():
+        """API для получения созданных, измененных и удаленных задач после since"""
+        current_user = get_current_user()
+        try:
+            limit = min(request.args.get('limit', 500, type=int), app.config['TASK_CHANGES_MAX_LIMIT'])
+            changes, watermark, has_more = task_service.get_changes_since(
+                since=request.args.get('since'),
+                limit=max(limit, 1),
+                # Обычные пользователи синхронизируют только свои заявки
+                requester_email=None if current_user.can_manage_tasks else current_user.email,
+                settle_seconds=app.config['TASK_CHANGES_SETTLE_SECONDS']
+            )
+            return jsonify({
+                'success': True,
+                'changes': changes,
+                'watermark': watermark,
+                'has_more': has_more
+            })
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+    
+    # Потоки воркера, занятые ожиданием событий (SSE и long-poll)
+    event_waiting_slots = threading.BoundedSemaphore(app.config['TASK_EVENTS_MAX_WAITING'])
+    
+    # Поток изменений задач для живого обновления рабочего стола
+    @app.route('/api/tasks/events', methods=['GET'])
+    @user_or_higher_required
+    def task_events_stream():
+        """События о создании и изменении задач (SSE или опрос при poll=1)
+
+        Ждущих соединений на воркер не больше TASK_EVENTS_MAX_WAITING. Поток
+        SSE получают только IT-сотрудники при свободном месте, иначе 204 и
+        браузер переходит на опрос. Опрос ждет событий, если есть место, а
+        без него отвечает сразу и задает паузу до следующего запроса (retry).
+        """
+        current_user = get_current_user()
+        # Обычные пользователи получают события только по своим заявкам
+        requester_email = None if current_user.can_manage_tasks else current_user.email
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+        
+        if request.args.get('poll'):
+            if event_waiting_slots.acquire(blocking=False):
+                try:
+                    events, last_id = task_events.read(last_id, app.config['TASK_EVENTS_POLL_TIMEOUT'],
+                                                       requester_email=requester_email)
+                finally:
+                    event_waiting_slots.release()
+                retry = 0
+            else:
+                events, last_id = task_events.read(last_id, 0, requester_email=requester_email)
+                retry = app.config['TASK_EVENTS_POLL_INTERVAL']
+            return jsonify({'success': True, 'events': events, 'last_id': last_id, 'retry': retry})
+        
+        # 204 останавливает переподключения EventSource, клиент переходит на опрос
+        if not current_user.can_manage_tasks or not event_waiting_slots.acquire(blocking=False):
+            return '', 204
+        
+        # Брокер и настройки берутся до начала потока: генератор работает
+        # уже после выхода из обработчика запроса
+        broker = app.extensions['services'].get('task_events')
+        heartbeat = app.config['TASK_EVENTS_HEARTBEAT']
+        deadline = time.monotonic() + app.config['TASK_EVENTS_STREAM_TIMEOUT']
+        
+        def stream(last_id):
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                events, last_id = broker.read(last_id, heartbeat, requester_email=requester_email)
+                if not events:
+                    # Комментарий-пульс не дает прокси закрыть соединение
+                    yield ': ping\n\n'
+                    continue
+                for event in events:
+                    yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+        
+        response = Response(stream(last_id), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        # Место освобождается при закрытии ответа сервером, даже если
+        # генератор так и не был запущен
+        response.call_on_close(event_waiting_slots.release)
+        return response
+    
+    # Строка задачи для обновления рабочего стола на месте
+    @app.route('/api/tasks/<task_id>/row', methods=['GET'])
+    @user_or_higher_required
+    def task_row(task_id):
+        """HTML строки задачи; 204, если задача больше не видна на рабочем столе"""
+        current_user = get_current_user()
+        task = task_service.get_task_by_id(task_id)
+        if not task:
+            return '', 204
+        
+        if current_user.can_manage_tasks:
+            # На рабочем столе IT-отдела только активные задачи
+            if not task.is_active:
+                return '', 204
+        elif task.requester_email != current_user.email:
+            return '', 204
+        
+        return cached_row('_task_row.html', task, task.is_overdue, current_user.can_manage_tasks)
     
     # API для обновления задачи
     @app.route('/api/tasks/<task_id>', methods=['PUT'])
@@ -268,26 +720,243 @@ def create_app(config_name='default'):
         except Exception as e:
             return jsonify({'error': str(e)}), 400
     
+    # Пакетное обновление задач (разбор очереди)
+    @app.route('/api/tasks', methods=['PATCH'])
+    @it_staff_required
+    def update_tasks_batch():
+        """API пакетного обновления: [{id, changes}, ...] одной транзакцией"""
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'message': 'Ожидается список {id, changes}'
+            }), 400
+        if len(items) > app.config['TASK_BATCH_MAX_ITEMS']:
+            return jsonify({
+                'success': False,
+                'message': f"Не более {app.config['TASK_BATCH_MAX_ITEMS']} задач за запрос"
+            }), 400
+        
+        results, status_changed = task_service.update_tasks(items, user_id=session.get('user_id'))
+        
+        # Одно уведомление на весь пакет (не блокируем обновление при ошибке)
+        try:
+            telegram_service.send_batch_status_notification(status_changed)
+        except Exception as telegram_error:
+            print(f"Ошибка отправки уведомления в Telegram: {telegram_error}")
+        
+        updated = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': updated > 0,
+            'updated': updated,
+            'failed': len(results) - updated,
+            'results': results
+        })
+    
+    # Вложения задач
+    def can_view_task(user, task):
+        """Пользователь видит только свои заявки, IT-отдел - все"""
+        return user.can_manage_tasks or task.requester_email == user.email
+    
+    def attachment_task(attachment):
+        """Задача вложения, в том числе перенесенная в архив"""
+        if attachment is None:
+            return None
+        return attachment.task or task_service.get_archived_task(attachment.task_id)
+    
+    def attachment_thumbnails(task):
+        """URL готовых превью вложений; недостающие ставятся в очередь"""
+        thumbnails = {}
+        for attachment in task.attachments:
+            if not thumbnail_service.supports(attachment):
+                continue
+            if thumbnail_service.thumbnail_path(attachment):
+                thumbnails[attachment.id] = url_for('attachment_thumbnail', attachment_id=attachment.id)
+            else:
+                thumbnail_service.schedule(attachment)
+        return thumbnails
+    
+    @app.route('/api/tasks/<task_id>/attachments', methods=['GET'])
+    @user_or_higher_required
+    def list_attachments(task_id):
+        """API списка вложений задачи"""
+        task = task_service.get_task_by_id(task_id) or task_service.get_archived_task(task_id)
+        if not task or not can_view_task(get_current_user(), task):
+            return jsonify({'success': False, 'message': 'Задача не найдена'}), 404
+        
+        return jsonify({
+            'success': True,
+            'attachments': [dict(attachment.to_dict(),
+                                 url=url_for('download_attachment', attachment_id=attachment.id))
+                            for attachment in task.attachments]
+        })
+    
+    @app.route('/api/tasks/<task_id>/attachments', methods=['POST'])
+    @user_or_higher_required
+    @upload_size_limit(lambda: attachment_service.max_file_size())
+    def upload_attachment(task_id):
+        """API загрузки вложения
+        
+        Тело запроса - сам файл (имя в заголовке X-Filename или параметре
+        filename), он пишется в хранилище потоком без разбора формы.
+        Поддерживается и multipart с полем file.
+        """
+        task = task_service.get_task_by_id(task_id)
+        if not task or not can_view_task(get_current_user(), task):
+            return jsonify({'success': False, 'message': 'Задача не найдена'}), 404
+        
+        try:
+            if request.mimetype == 'multipart/form-data':
+                file = request.files.get('file')
+                if not file or not file.filename:
+                    raise ValueError("Не передан файл (поле file)")
+                filename, content_type = file.filename, file.mimetype
+                blob = attachment_service.store(file.stream)
+            else:
+                filename = unquote(request.headers.get('X-Filename') or request.args.get('filename') or '')
+                content_type = request.mimetype
+                blob = attachment_service.store(request.stream, content_length=request.content_length)
+            
+            attachment = attachment_service.attach(
+                task, blob, filename, content_type, user_id=session.get('user_id'),
+                screenshot_url=lambda attachment: url_for('download_attachment', attachment_id=attachment.id)
+            )
+        except AttachmentTooLarge as e:
+            return jsonify({'success': False, 'message': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        thumbnail_service.schedule(attachment)
+        url = url_for('download_attachment', attachment_id=attachment.id)
+        response = jsonify({
+            'success': True,
+            'deduplicated': blob.deduplicated,
+            'attachment': dict(attachment.to_dict(), url=url)
+        })
+        response.status_code = 201
+        response.headers['Location'] = url
+        return response
+    
+    @app.route('/attachments/<attachment_id>')
+    @user_or_higher_required
+    def download_attachment(attachment_id):
+        """Скачивание вложения
+        
+        Файл отдает не приложение: nginx по X-Accel-Redirect (если задан
+        ATTACHMENTS_ACCEL_REDIRECT), S3 по подписанной ссылке или сервер
+        через sendfile (send_file с путем к файлу).
+        """
+        attachment = attachment_service.get_attachment(attachment_id)
+        task = attachment_task(attachment)
+        if not task or not can_view_task(get_current_user(), task):
+            return jsonify({'success': False, 'message': 'Файл не найден'}), 404
+        
+        storage = attachment_service.storage
+        disposition = 'inline' if attachment.is_image else 'attachment'
+        url = storage.url(attachment.storage_key, filename=attachment.filename,
+                          expires=app.config['ATTACHMENTS_URL_EXPIRES'])
+        if url:
+            return redirect(url)
+        
+        accel_prefix = app.config['ATTACHMENTS_ACCEL_REDIRECT']
+        if accel_prefix and hasattr(storage, 'path'):
+            response = Response(mimetype=attachment.content_type)
+            response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{attachment.storage_key}"
+            response.headers['Content-Disposition'] = \
+                f"{disposition}; filename*=UTF-8''{quote(attachment.filename)}"
+        else:
+            source = storage.path(attachment.storage_key) if hasattr(storage, 'path') else storage.open(attachment.storage_key)
+            response = send_file(source, mimetype=attachment.content_type, as_attachment=not attachment.is_image,
+                                 download_name=attachment.filename, etag=attachment.sha256, conditional=True)
+        # Содержимое вложения не меняется, но доступ к нему зависит от прав
+        response.headers['Cache-Control'] = 'private, max-age=86400'
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        # Даже открытый в браузере файл не выполняет скрипты в контексте приложения
+        response.headers['Content-Security-Policy'] = 'sandbox'
+        return response
+    
+    @app.route('/attachments/<attachment_id>/thumbnail')
+    @user_or_higher_required
+    def attachment_thumbnail(attachment_id):
+        """Превью изображения; 404, пока оно не готово (задание ставится в очередь)"""
+        attachment = attachment_service.get_attachment(attachment_id)
+        task = attachment_task(attachment)
+        if not task or not can_view_task(get_current_user(), task):
+            return jsonify({'success': False, 'message': 'Файл не найден'}), 404
+        
+        path = thumbnail_service.thumbnail_path(attachment)
+        if not path:
+            thumbnail_service.schedule(attachment)
+            return jsonify({'success': False, 'message': 'Превью еще не готово'}), 404
+        
+        mimetype = f"image/{'jpeg' if thumbnail_service.extension == 'jpg' else thumbnail_service.extension}"
+        accel_prefix = app.config['ATTACHMENTS_ACCEL_REDIRECT']
+        if accel_prefix:
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = \
+                f"{accel_prefix.rstrip('/')}/{thumbnail_service.thumbnail_key(attachment.sha256)}"
+        else:
+            response = send_file(path, mimetype=mimetype, etag=attachment.sha256, conditional=True)
+        # Превью содержимого с этим sha256 не меняется
+        response.headers['Cache-Control'] = f"private, max-age={app.config['THUMBNAIL_MAX_AGE']}, immutable"
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
+    
+    @app.route('/api/attachments/<attachment_id>', methods=['DELETE'])
+    @it_staff_required
+    def delete_attachment(attachment_id):
+        """API удаления вложения"""
+        attachment = attachment_service.get_attachment(attachment_id)
+        if not attachment:
+            return jsonify({'success': False, 'message': 'Файл не найден'}), 404
+        
+        removed = attachment_service.delete_attachment(
+            attachment, screenshot_url=url_for('download_attachment', attachment_id=attachment.id))
+        thumbnail_service.discard(removed)
+        return jsonify({'success': True, 'message': f'Файл {attachment.filename} удален'})
+    
+    # API для удаления задачи
+    @app.route('/api/tasks/<task_id>', methods=['DELETE'])
+    @admin_required
+    def delete_task(task_id):
+        """API для удаления задачи (остается отметка для синхронизации)"""
+        try:
+            task = task_service.get_task_by_id(task_id)
+            hashes = [attachment.sha256 for attachment in task.attachments] if task else []
+            task = task_service.delete_task(task_id)
+            thumbnail_service.discard(attachment_service.delete_unreferenced(hashes))
+            return jsonify({
+                'success': True,
+                'message': f'Задача №{task.task_number} удалена'
+            })
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+    
     # Управление пользователями (только для администраторов)
     @app.route('/admin/users')
     @admin_required
     def admin_users():
         """Страница управления пользователями"""
-        users = auth_service.get_all_users()
-        return render_template('admin_users.html', users=users)
+        users_page = auth_service.search_users(per_page=app.config['USERS_PER_PAGE'])
+        return render_template('admin_users.html', users=users_page.items, users_page=users_page)
     
     # Настройки системы (только для администраторов)
     @app.route('/admin/settings')
     @admin_required
     def admin_settings():
         """Страница настроек системы"""
-        users = auth_service.get_all_users()
+        users_page = auth_service.search_users(per_page=app.config['USERS_PER_PAGE'])
         telegram_settings = settings_service.get_telegram_settings()
         ldap_settings = settings_service.get_ldap_settings()
         
         # Отключаем кэширование для этой страницы
         response = make_response(render_template('admin_settings.html', 
-                                              users=users, 
+                                              users=users_page.items, 
+                                              users_page=users_page, 
                                               telegram_settings=telegram_settings,
                                               ldap_settings=ldap_settings))
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -299,16 +968,45 @@ def create_app(config_name='default'):
     @admin_required
     def admin_settings_v2():
         """Тестовая страница настроек системы V2"""
-        users = auth_service.get_all_users()
+        users_page = auth_service.search_users(per_page=app.config['USERS_PER_PAGE'])
         telegram_settings = settings_service.get_telegram_settings()
         
         # Отключаем кэширование для этой страницы
-        response = make_response(render_template('admin_settings_v2.html', users=users, telegram_settings=telegram_settings))
+        response = make_response(render_template('admin_settings_v2.html', users=users_page.items, users_page=users_page,
+                                                 telegram_settings=telegram_settings))
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
         return response
     
+    # API для постраничного списка пользователей
+    @app.route('/api/users', methods=['GET'])
+    @admin_required
+    def list_users():
+        """API для постраничного поиска пользователей"""
+        try:
+            users_page = auth_service.search_users(
+                search=request.args.get('q'),
+                role=request.args.get('role'),
+                department=request.args.get('department'),
+                status=request.args.get('status', 'active'),
+                page=request.args.get('page', 1, type=int),
+                per_page=request.args.get('per_page', app.config['USERS_PER_PAGE'], type=int)
+            )
+            return jsonify({
+                'success': True,
+                'users': [user.to_dict() for user in users_page.items],
+                'page': users_page.page,
+                'per_page': users_page.per_page,
+                'total': users_page.total,
+                'has_next': users_page.has_next
+            })
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+    
     # API для управления пользователями
     @app.route('/api/users', methods=['POST'])
     @admin_required
@@ -336,6 +1034,42 @@ def create_app(config_name='default'):
                 'message': str(e)
             }), 400
     
+    @app.route('/api/users/bulk', methods=['POST'])
+    @admin_required
+    def bulk_import_users():
+        """API для массового импорта пользователей (CSV, JSON, NDJSON)"""
+        try:
+            upsert = request.args.get('upsert', 'false').lower() in ('1', 'true')
+            
+            # Файл из формы или тело запроса целиком
+            if 'file' in request.files:
+                file = request.files['file']
+                fmt = user_import_service.detect_format(file.filename, file.mimetype)
+                stream = file.stream
+            else:
+                fmt = user_import_service.detect_format(mimetype=request.mimetype)
+                stream = request.stream
+            
+            rows = user_import_service.parse_stream(stream, fmt)
+            report = user_import_service.import_users(rows, upsert=upsert,
+                                                      max_rows=app.config['USER_IMPORT_API_MAX_ROWS'])
+            
+            return jsonify({
+                'success': report['failed'] == 0,
+                'message': f"Создано: {report['created']}, обновлено: {report['updated']}, ошибок: {report['failed']}",
+                **report
+            })
+        except ImportTooLarge as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 413
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+    
     @app.route('/api/users/<user_id>/role', methods=['PUT'])
     @admin_required
     def update_user_role(user_id):
@@ -430,11 +1164,21 @@ def create_app(config_name='default'):
     # API для получения аналитики
     @app.route('/api/analytics', methods=['GET'])
     @admin_required
+    @conditional_get(analytics_marker)
     def get_analytics():
         """API для получения аналитических данных"""
-        stats = analytics_service.get_performance_stats()
+        stats = analytics_service.get_performance_stats(include_archived=request.args.get('archived') == '1')
         return jsonify(stats)
     
+    @app.route('/api/analytics/status-times', methods=['GET'])
+    @admin_required
+    @conditional_get(analytics_marker)
+    def get_status_analytics():
+        """API времени в статусах и сроков реакции за период (?days=30&archived=1)"""
+        days = max(1, min(request.args.get('days', 30, type=int), 365))
+        return jsonify(analytics_service.get_status_statistics(
+            days, include_archived=request.args.get('archived') == '1'))
+    
     # API для настроек Telegram
     @app.route('/api/settings/telegram', methods=['GET'])
     @admin_required
@@ -596,9 +1340,7 @@ def create_app(config_name='default'):
         try:
             data = request.get_json()
             
-            # Импортируем LDAPService здесь для избежания циклических импортов
-            from services.ldap_service import LDAPService
-            ldap_service = LDAPService()
+            ldap_service = services.get('ldap')
             
             # Тестирование подключения
             result = ldap_service.test_connection(
@@ -634,9 +1376,7 @@ def create_app(config_name='default'):
                     'message': 'LDAP интеграция отключена'
                 }), 400
             
-            # Импортируем LDAPService здесь для избежания циклических импортов
-            from services.ldap_service import LDAPService
-            ldap_service = LDAPService()
+            ldap_service = services.get('ldap')
             
             # Поиск пользователей
             result = ldap_service.search_users(
@@ -664,9 +1404,7 @@ def create_app(config_name='default'):
         try:
             data = request.get_json()
             
-            # Импортируем LDAPService здесь для избежания циклических импортов
-            from services.ldap_service import LDAPService
-            ldap_service = LDAPService()
+            ldap_service = services.get('ldap')
             
             # Получение информации о сервере
             result = ldap_service.get_server_info(
@@ -711,11 +1449,12 @@ def create_app(config_name='default'):
     @admin_required
     def admin_settings_fixed():
         """Исправленная страница настроек системы"""
-        users = auth_service.get_all_users()
+        users_page = auth_service.search_users(per_page=app.config['USERS_PER_PAGE'])
         telegram_settings = settings_service.get_telegram_settings()
         
         # Отключаем кэширование для этой страницы
-        response = make_response(render_template('admin_settings_fixed.html', users=users, telegram_settings=telegram_settings))
+        response = make_response(render_template('admin_settings_fixed.html', users=users_page.items, users_page=users_page,
+                                                 telegram_settings=telegram_settings))
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
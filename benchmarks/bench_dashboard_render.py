@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк рендеринга рабочего стола с кэшем фрагментов
+
+Для рабочих столов на 1 000 и 10 000 активных задач измеряется время
+render_template('dashboard.html'):
+- без кэша (FRAGMENT_CACHE_SIZE=0);
+- с холодным кэшем (первый рендеринг);
+- с теплым кэшем (ничего не изменилось);
+- с теплым кэшем после изменения 1% задач.
+
+Задачи загружаются заранее, так что измеряется только рендеринг.
+
+Запуск: python benchmarks/bench_dashboard_render.py [--sizes 1000 10000] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template
+from sqlalchemy import insert
+
+from app import create_app
+from models.database import db
+from models.task import Task
+from models.user import User
+
+STATUSES = ['Неразобранная', 'В работе', 'В очереди', 'Ожидает']
+TYPES = ['Сбой', 'Новая разработка', 'Консультация', 'Прочее']
+PRIORITIES = ['Высокий', 'Средний', 'Низкий']
+
+
+def populate(count):
+    now = datetime.utcnow()
+    db.session.execute(insert(Task), [
+        {
+            'id': str(uuid.uuid4()),
+            'task_number': f'TASK-BENCH-{i:06d}',
+            'title': f'Задача {i}',
+            'description': 'Описание задачи для проверки рендеринга строки ' * 3,
+            'task_type': TYPES[i % len(TYPES)],
+            'status': STATUSES[i % len(STATUSES)],
+            'priority': PRIORITIES[i % len(PRIORITIES)],
+            'requester_name': 'Постановщик',
+            'requester_department': 'Отдел',
+            'created_at': now,
+            'updated_at': now,
+            # Часть задач просрочена
+            'deadline': now + timedelta(days=(i % 10) - 3)
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def render(task_service, current_user):
+    tasks = task_service.get_active_tasks()
+    started = time.perf_counter()
+    rows = task_service.mark_overdue_tasks(tasks)
+    render_template('dashboard.html', rows=rows, counters=task_service.get_task_summary(active_only=True),
+                    current_user=current_user, last_event_id='0')
+    return (time.perf_counter() - started) * 1000
+
+
+def median_render(task_service, current_user, runs):
+    return statistics.median(render(task_service, current_user) for _ in range(runs))
+
+
+def bench(size, runs):
+    app, auth_service, _ = create_app('testing')
+    with app.app_context(), app.test_request_context('/'):
+        db.create_all()
+        auth_service.create_default_users()
+        populate(size)
+
+        services = app.extensions['services']
+        task_service = services.get('task')
+        cache = app.extensions['fragment_cache']
+        current_user = User.query.filter_by(username='admin').first()
+
+        cache.max_entries = 0
+        uncached = median_render(task_service, current_user, runs)
+
+        cache.max_entries = size * 2
+        cold = render(task_service, current_user)
+        warm = median_render(task_service, current_user, runs)
+
+        # Изменение 1% задач: новые updated_at дают новые ключи фрагментов
+        changed = Task.query.limit(max(size // 100, 1)).all()
+        for task in changed:
+            task.updated_at = datetime.utcnow()
+        db.session.commit()
+        partial = render(task_service, current_user)
+
+        print(f"{size:>7} задач: без кэша {uncached:8.1f} мс | холодный {cold:8.1f} мс | "
+              f"теплый {warm:8.1f} мс | изменен 1% {partial:8.1f} мс "
+              f"(фрагментов в кэше: {len(cache)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        bench(size, args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбора сроков задач (utils/deadline_parser.py)
+
+На наборах строк, как в пакетах заявок, сравниваются:
+- прежний TaskService._parse_deadline (strptime по пяти форматам подряд);
+- DeadlineParser.parse по одной строке;
+- DeadlineParser.parse_many по столбцу (формат предыдущего значения
+  проверяется первым, повторы разбираются один раз).
+
+Наборы: все строки в одном формате (выгрузка из внешней системы) и смесь
+форматов веб-формы, Google Forms и API с ~1% мусора. Сроки - случайные
+моменты в пределах года: даты без времени повторяются (как и в реальных
+пакетах), строки со временем почти все разные.
+
+Запуск: python benchmarks/bench_deadline_parser.py [--count 1000000] [--runs 3]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.deadline_parser import DeadlineParser
+
+LEGACY_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M')
+
+# Формат строки и доля в смешанном наборе
+MIXED = (
+    ('%Y-%m-%dT%H:%M', 0.45),      # datetime-local веб-формы
+    ('%d.%m.%Y', 0.25),            # Google Forms
+    ('%Y-%m-%d', 0.15),
+    ('%Y-%m-%dT%H:%M:%SZ', 0.10),  # API с часовым поясом
+    ('%d/%m/%Y', 0.04),
+    (None, 0.01),                  # нераспознаваемое значение
+)
+
+
+def legacy_parse(value):
+    """Прежний TaskService._parse_deadline"""
+    if not value:
+        return None
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def generate(count, formats):
+    random.seed(1)
+    start = datetime(2024, 1, 1)
+    names = [fmt for fmt, _ in formats]
+    weights = [share for _, share in formats]
+    values = []
+    for fmt in random.choices(names, weights, k=count):
+        moment = start + timedelta(minutes=random.randint(0, 60 * 24 * 365))
+        values.append(moment.strftime(fmt) if fmt else 'до пятницы')
+    return values
+
+
+def measure(func, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    deadline_parser = DeadlineParser()
+
+    def parse_each(values):
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(deadline_parser.parse(value))
+            except ValueError:
+                parsed.append(None)
+        return parsed
+
+    datasets = (
+        ('один формат (дд.мм.гггг)', generate(args.count, (('%d.%m.%Y', 1.0),))),
+        ('смесь форматов', generate(args.count, MIXED)),
+    )
+    print(f'{args.count} строк, медиана из {args.runs} запусков')
+    for title, values in datasets:
+        print(title)
+        legacy_s, legacy = measure(lambda: [legacy_parse(value) for value in values], args.runs)
+        each_s, _ = measure(lambda: parse_each(values), args.runs)
+        many_s, (parsed, rejects) = measure(lambda: deadline_parser.parse_many(values), args.runs)
+
+        for name, seconds in (('strptime по форматам', legacy_s), ('parse', each_s),
+                              ('parse_many', many_s)):
+            print(f'  {name:<22} {seconds:6.2f} с  {args.count / seconds / 1000:8.0f} тыс. строк/с')
+        print(f'  отклонено parse_many: {len(rejects)}, '
+              f'прежний разбор молча вернул None: {sum(value is None for value in legacy)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк хранения статуса, типа и приоритета: строки против кодов SMALLINT
+
+На одинаковых данных для VARCHAR-подписей и LabelCode (models/types.py)
+измеряются:
+- размер таблицы и индекса (status, completed_at);
+- группировка по статусу и типу (как счетчики аналитики);
+- активные задачи с сортировкой по приоритету (как рабочий стол).
+
+SQLite: размеры по dbstat. PostgreSQL (--url): pg_relation_size.
+
+Запуск: python benchmarks/bench_label_codes.py [--tasks 200000] [--runs 5] [--url postgresql://...]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, create_engine,
+                        func, insert, select, text)
+
+from models.task import TASK_PRIORITY_CODES, TASK_STATUS_CODES, TASK_TYPE_CODES
+from models.types import LabelCode
+
+VARIANTS = (
+    ('VARCHAR', lambda labels: String(50)),
+    ('SMALLINT', LabelCode),
+)
+
+
+def define_table(metadata, suffix, column_type):
+    tasks = Table(f'bench_labels_{suffix}', metadata,
+                  Column('id', Integer, primary_key=True),
+                  Column('status', column_type(TASK_STATUS_CODES), nullable=False),
+                  Column('task_type', column_type(TASK_TYPE_CODES), nullable=False),
+                  Column('priority', column_type(TASK_PRIORITY_CODES), nullable=False),
+                  Column('completed_at', DateTime))
+    Index(f'idx_bench_labels_{suffix}_status_completed_at', tasks.c.status, tasks.c.completed_at)
+    return tasks
+
+
+def relation_sizes(conn, table):
+    """(размер таблицы, размер индексов) в байтах"""
+    if conn.dialect.name == 'postgresql':
+        return conn.execute(text('SELECT pg_relation_size(:t), pg_indexes_size(:t)'), {'t': table}).one()
+    rows = dict(conn.execute(text('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')).all())
+    indexes = sum(size for name, size in rows.items() if name.startswith(f'idx_{table}_'))
+    return rows[table], indexes
+
+
+def measure(conn, statement, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(statement).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--url', help='URL базы (по умолчанию временный файл SQLite)')
+    args = parser.parse_args()
+
+    workdir = None if args.url else tempfile.mkdtemp()
+
+    random.seed(1)
+    now = datetime.utcnow()
+    statuses = list(TASK_STATUS_CODES.values())
+    rows = []
+    for i in range(args.tasks):
+        status = random.choice(statuses)
+        rows.append({'id': i, 'status': status,
+                     'task_type': random.choice(list(TASK_TYPE_CODES.values())),
+                     'priority': random.choice(list(TASK_PRIORITY_CODES.values())),
+                     'completed_at': now - timedelta(minutes=i) if status == 'Готово' else None})
+
+    print(f"{'postgresql' if args.url else 'sqlite'}: {args.tasks} задач")
+    print(f"{'хранение':<10} {'таблица':>10} {'индекс':>10} {'GROUP BY':>10} {'активные':>10}")
+    for suffix, (name, column_type) in zip(('text', 'code'), VARIANTS):
+        engine = create_engine(args.url or f"sqlite:///{os.path.join(workdir, suffix + '.db')}")
+        metadata = MetaData()
+        tasks = define_table(metadata, suffix, column_type)
+        metadata.drop_all(engine)
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(tasks), rows)
+            conn.execute(text('ANALYZE'))
+
+        with engine.connect() as conn:
+            table_size, index_size = relation_sizes(conn, tasks.name)
+            grouped = select(tasks.c.status, tasks.c.task_type, func.count()).group_by(
+                tasks.c.status, tasks.c.task_type)
+            active = select(tasks.c.id, tasks.c.status, tasks.c.priority).where(
+                tasks.c.status.notin_(['Готово', 'Отменено'])).order_by(tasks.c.priority, tasks.c.id)
+            group_ms = measure(conn, grouped, args.runs)
+            active_ms = measure(conn, active, args.runs)
+
+        print(f'{name:<10} {table_size / 1048576:7.1f} МБ {index_size / 1048576:7.1f} МБ '
+              f'{group_ms:7.1f} мс {active_ms:7.1f} мс')
+        metadata.drop_all(engine)
+        engine.dispose()
+
+    if workdir:
+        for suffix in ('text', 'code'):
+            os.remove(os.path.join(workdir, suffix + '.db'))
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пропускной способности входа при всплеске запросов
+
+Моделирует волну одновременных входов (каждый поток проверяет пароль)
+и параллельно замеряет задержку легкого запроса "рабочего стола".
+Сравнивает прямой вызов check_password_hash в потоке запроса с пулом
+PasswordService.
+
+Запуск: python benchmarks/bench_login_burst.py [--logins 200] [--threads 32]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+from services.password_service import PasswordService, PasswordServiceBusy
+
+
+def dashboard_probe(stop_event, latencies):
+    """Имитация легкого запроса: немного CPU-работы на чистом Python"""
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        sum(i * i for i in range(20000))
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.01)
+
+
+def run_burst(name, check, logins, threads):
+    stop_event = threading.Event()
+    latencies = []
+    probe = threading.Thread(target=dashboard_probe, args=(stop_event, latencies))
+    probe.start()
+
+    counters = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    per_thread = logins // threads
+
+    def worker():
+        for _ in range(per_thread):
+            try:
+                check()
+                result = 'ok'
+            except PasswordServiceBusy:
+                result = 'busy'
+            with lock:
+                counters[result] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stop_event.set()
+    probe.join()
+
+    p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0
+    print(f"{name:<24} {counters['ok'] / elapsed:8.1f} вход/с  "
+          f"отказов: {counters['busy']:4d}  "
+          f"рабочий стол p50={statistics.median(latencies):6.2f} мс p95={p95:6.2f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    password_hash = generate_password_hash('secret', method=args.method)
+
+    run_burst('Прямой вызов', lambda: check_password_hash(password_hash, 'secret'),
+              args.logins, args.threads)
+
+    service = PasswordService(method=args.method, max_workers=args.workers)
+    run_burst(f'Пул ({args.workers} потока)',
+              lambda: service.check_password(password_hash, 'secret'),
+              args.logins, args.threads)
+    service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
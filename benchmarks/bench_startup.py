@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк времени запуска приложения
+
+1. Разбор вывода `python -X importtime -c "import app"`: самые дорогие
+   модули по суммарному времени импорта.
+2. Время от старта процесса до ответа на первый запрос (create_app +
+   GET /login), медиана по нескольким запускам в чистых процессах.
+
+Запуск: python benchmarks/bench_startup.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST_SCRIPT = """
+import time
+started = time.perf_counter()
+from app import create_app
+app, _, _ = create_app('testing')
+created = time.perf_counter()
+response = app.test_client().get('/login')
+assert response.status_code == 200, response.status_code
+finished = time.perf_counter()
+print(f"{(created - started) * 1000:.1f} {(finished - started) * 1000:.1f}")
+"""
+
+
+def run_python(code, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def report_import_time(top):
+    result = run_python('import app', '-X', 'importtime')
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line.split('|')
+        modules.append((int(cumulative_us), int(self_us.split(':')[-1]), name.strip()))
+
+    total = max(modules)[0] if modules else 0
+    print(f"Импорт app: {total / 1000:.1f} мс (суммарно)\n")
+    print(f"{'суммарно, мс':>13} {'свое, мс':>9}  модуль")
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:13.1f} {self_us / 1000:9.1f}  {name}")
+
+    heavy = [name for _, _, name in modules if name in ('ldap3', 'requests')]
+    print(f"\nТяжелые опциональные зависимости при импорте: {', '.join(heavy) or 'нет'}")
+
+
+def report_first_request(runs):
+    create_times = []
+    request_times = []
+    for _ in range(runs):
+        output = run_python(FIRST_REQUEST_SCRIPT).stdout.split()
+        create_times.append(float(output[0]))
+        request_times.append(float(output[1]))
+
+    print(f"\nЗапусков: {runs}")
+    print(f"create_app:          медиана {statistics.median(create_times):7.1f} мс")
+    print(f"до первого ответа:   медиана {statistics.median(request_times):7.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    report_import_time(args.top)
+    report_first_request(args.runs)
+
+
+if __name__ == '__main__':
+    main()
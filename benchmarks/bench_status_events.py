@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк аналитики по журналу смен статусов (task_status_events)
+
+Задачи равномерно распределены по году, у каждой 3-6 смен статуса (часть
+открывается повторно). Для периодов 7, 30 и 365 дней измеряется время
+AnalyticsService.get_status_statistics (время в статусах и сроки реакции):
+запросы ограничены событиями периода по индексам (status, at) и
+(task_id, at), поэтому отчет за месяц не зависит от объема всей истории.
+
+Запуск: python benchmarks/bench_status_events.py [--tasks 200000] [--runs 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from app import create_app
+from models.database import db
+from models.task import Task, TaskStatusEvent
+
+# Типовые истории: с ожиданием, с очередью, с повторным открытием, отмена
+HISTORIES = (
+    ('Неразобранная', 'В работе', 'Готово'),
+    ('Неразобранная', 'В работе', 'Ожидает', 'В работе', 'Готово'),
+    ('Неразобранная', 'В очереди', 'В работе', 'Готово'),
+    ('Неразобранная', 'В работе', 'Готово', 'В работе', 'Готово'),
+    ('Неразобранная', 'Отменено'),
+    ('Неразобранная', 'В работе', 'Ожидает'),
+)
+PRIORITIES = ('Высокий', 'Средний', 'Низкий')
+
+
+def populate(count, batch_size=20000):
+    random.seed(1)
+    now = datetime.utcnow()
+    events = 0
+    for start in range(0, count, batch_size):
+        tasks, history_rows = [], []
+        for i in range(start, min(start + batch_size, count)):
+            task_id = str(uuid.uuid4())
+            created_at = now - timedelta(minutes=random.randint(60 * 24, 60 * 24 * 365))
+            history = HISTORIES[i % len(HISTORIES)]
+            at = created_at
+            for status in history:
+                history_rows.append({'task_id': task_id, 'status': status, 'at': at})
+                at += timedelta(minutes=random.randint(5, 60 * 24))
+            tasks.append({
+                'id': task_id, 'task_number': f'TASK-BENCH-{i:07d}', 'title': f'Задача {i}',
+                'task_type': 'Сбой', 'status': history[-1], 'priority': PRIORITIES[i % 3],
+                'requester_name': 'Иванов', 'requester_department': 'Бухгалтерия',
+                'created_at': created_at, 'updated_at': at
+            })
+        db.session.execute(insert(Task), tasks)
+        db.session.execute(insert(TaskStatusEvent), history_rows)
+        events += len(history_rows)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app, _, _ = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        events = populate(args.tasks)
+        analytics = app.extensions['services'].get('analytics')
+
+        print(f'{args.tasks} задач, {events} событий за год')
+        for days in (7, 30, 365):
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                stats = analytics.get_status_statistics(days)
+                timings.append((time.perf_counter() - started) * 1000)
+            created = sum(row['total'] for row in stats['sla'])
+            print(f'период {days:>3} дн.: {statistics.median(timings):8.1f} мс '
+                  f'(задач создано за период: {created})')
+
+
+if __name__ == '__main__':
+    main()
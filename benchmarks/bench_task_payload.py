@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации списка задач (GET /api/tasks)
+
+Для 10 000 задач сравниваются:
+- прежний путь: модели Task + to_dict() + стандартный json (как jsonify
+  по умолчанию: ensure_ascii, сортировка ключей);
+- проекция столбцов (TaskService.get_task_rows) + JSON-провайдер приложения
+  (orjson, если установлен);
+- проекция с разреженным набором полей (fields=).
+
+Для каждого варианта выводится время выборки и сериализации и размер
+ответа: без сжатия, gzip и br (если установлен brotli).
+
+Запуск: python benchmarks/bench_task_payload.py [--size 10000] [--runs 5]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from app import create_app
+from models.database import db
+from models.task import Task
+from models.user import User
+from utils import compression, json_provider
+
+STATUSES = ['Неразобранная', 'В работе', 'В очереди', 'Ожидает', 'Готово']
+TYPES = ['Сбой', 'Новая разработка', 'Консультация', 'Прочее']
+PRIORITIES = ['Высокий', 'Средний', 'Низкий']
+SPARSE_FIELDS = 'id,task_number,title,status,priority,created_at'
+
+
+def populate(count):
+    now = datetime.utcnow()
+    staff = User.query.filter_by(username='it_staff').first()
+    db.session.execute(insert(Task), [
+        {
+            'id': str(uuid.uuid4()),
+            'task_number': f'TASK-BENCH-{i:06d}',
+            'title': f'Не работает принтер в кабинете {i}',
+            'description': 'Принтер не печатает, на экране ошибка замятия бумаги. ' * 3,
+            'task_type': TYPES[i % len(TYPES)],
+            'status': STATUSES[i % len(STATUSES)],
+            'priority': PRIORITIES[i % len(PRIORITIES)],
+            'requester_name': 'Иванов Иван Иванович',
+            'requester_department': 'Бухгалтерия',
+            'requester_email': f'user{i % 50}@company.com',
+            'requester_phone': '+7 900 000-00-00',
+            'created_at': now - timedelta(minutes=i),
+            'taken_at': now - timedelta(minutes=i // 2) if i % 5 else None,
+            'deadline': now + timedelta(days=i % 10),
+            'assigned_to_id': staff.id if i % 3 else None,
+            'updated_at': now
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def measure(produce, runs):
+    """Медиана времени produce() в мс и результат последнего запуска"""
+    timings = []
+    for _ in range(runs):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        body = produce()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), body
+
+
+def report(name, elapsed, body):
+    sizes = [f'{len(body) / 1024:8.0f} КБ', f'gzip {len(gzip.compress(body, 6)) / 1024:6.0f} КБ']
+    if compression.brotli is not None:
+        sizes.append(f'br {len(compression.brotli.compress(body, quality=4)) / 1024:6.0f} КБ')
+    print(f'{name:<34} {elapsed:8.1f} мс | ' + ' | '.join(sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app, auth_service, _ = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        auth_service.create_default_users()
+        populate(args.size)
+        task_service = app.extensions['services'].get('task')
+
+        def legacy():
+            tasks = task_service.get_tasks_filtered()
+            return json.dumps([task.to_dict() for task in tasks], sort_keys=True).encode('utf-8')
+
+        def projection(fields=None):
+            return app.json.response(task_service.get_task_rows(fields=fields)).get_data()
+
+        print(f'{args.size} задач, JSON-провайдер: '
+              f'{"orjson" if json_provider.orjson is not None else "json"}')
+        report('to_dict + json (прежний путь)', *measure(legacy, args.runs))
+        report('проекция + провайдер', *measure(projection, args.runs))
+        sparse = task_service.parse_fields(SPARSE_FIELDS)
+        report(f'проекция, fields={len(sparse)} полей', *measure(lambda: projection(sparse), args.runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк компактных ключей: VARCHAR(36) против GUID (models/types.py)
+
+На одинаковых данных (пользователи и задачи с исполнителями) для обоих
+вариантов ключей измеряются:
+- размер таблицы задач и ее индексов (первичный ключ и assigned_to_id);
+- соединение задач с исполнителями и группировка по исполнителю;
+- выборка задач по списку id (как загрузка пакета в PATCH /api/tasks).
+
+SQLite: размеры по dbstat. PostgreSQL (--url): pg_relation_size.
+
+Запуск: python benchmarks/bench_uuid_keys.py [--tasks 200000] [--users 500] [--runs 5]
+        [--url postgresql://...]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (Column, ForeignKey, Index, MetaData, String, Table, create_engine,
+                        func, insert, select, text)
+
+from models.types import GUID
+
+VARIANTS = (('VARCHAR(36)', lambda: String(36)), ('GUID', GUID))
+
+
+def define_tables(metadata, suffix, key_type):
+    users = Table(f'bench_users_{suffix}', metadata,
+                  Column('id', key_type(), primary_key=True),
+                  Column('name', String(100), nullable=False))
+    tasks = Table(f'bench_tasks_{suffix}', metadata,
+                  Column('id', key_type(), primary_key=True),
+                  Column('title', String(200), nullable=False),
+                  Column('assigned_to_id', key_type(), ForeignKey(users.c.id)))
+    Index(f'idx_bench_tasks_{suffix}_assigned_to_id', tasks.c.assigned_to_id)
+    return users, tasks
+
+
+def relation_sizes(conn, table):
+    """(размер таблицы, размер индексов) в байтах"""
+    if conn.dialect.name == 'postgresql':
+        return conn.execute(text('SELECT pg_relation_size(:t), pg_indexes_size(:t)'), {'t': table}).one()
+    rows = dict(conn.execute(text('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')).all())
+    indexes = sum(size for name, size in rows.items()
+                  if name != table and (name.startswith(f'sqlite_autoindex_{table}_')
+                                        or name.startswith(f'idx_{table}_')))
+    return rows[table], indexes
+
+
+def measure(conn, statement, runs, params=None):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(statement, params or {}).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--url', help='URL базы (по умолчанию временный файл SQLite)')
+    args = parser.parse_args()
+
+    workdir = None if args.url else tempfile.mkdtemp()
+
+    random.seed(1)
+    user_ids = [str(uuid.uuid4()) for _ in range(args.users)]
+    task_rows = [{'id': str(uuid.uuid4()), 'title': f'Задача {i}',
+                  'assigned_to_id': random.choice(user_ids) if i % 4 else None}
+                 for i in range(args.tasks)]
+    lookup_ids = [row['id'] for row in random.sample(task_rows, min(500, len(task_rows)))]
+
+    print(f"{'postgresql' if args.url else 'sqlite'}: {args.tasks} задач, {args.users} пользователей")
+    print(f"{'ключ':<12} {'таблица':>10} {'индексы':>10} {'JOIN+GROUP':>12} {'IN (500 id)':>12}")
+    for suffix, (name, key_type) in zip(('text', 'guid'), VARIANTS):
+        # SQLite: отдельный файл на вариант, чтобы страницы первого не мешали второму
+        engine = create_engine(args.url or f"sqlite:///{os.path.join(workdir, suffix + '.db')}")
+        metadata = MetaData()
+        users, tasks = define_tables(metadata, suffix, key_type)
+        metadata.drop_all(engine)
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(users), [{'id': user_id, 'name': f'Сотрудник {i}'}
+                                         for i, user_id in enumerate(user_ids)])
+            conn.execute(insert(tasks), task_rows)
+            conn.execute(text('ANALYZE'))
+
+        with engine.connect() as conn:
+            table_size, index_size = relation_sizes(conn, tasks.name)
+            join = (select(users.c.name, func.count())
+                    .select_from(tasks.join(users, tasks.c.assigned_to_id == users.c.id))
+                    .group_by(users.c.name))
+            lookup = select(tasks.c.id, tasks.c.title).where(tasks.c.id.in_(lookup_ids))
+            join_ms = measure(conn, join, args.runs)
+            lookup_ms = measure(conn, lookup, args.runs)
+
+        print(f'{name:<12} {table_size / 1048576:7.1f} МБ {index_size / 1048576:7.1f} МБ '
+              f'{join_ms:9.1f} мс {lookup_ms:9.2f} мс')
+        metadata.drop_all(engine)
+        engine.dispose()
+
+    if workdir:
+        for suffix in ('text', 'guid'):
+            os.remove(os.path.join(workdir, suffix + '.db'))
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
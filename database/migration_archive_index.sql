@@ -0,0 +1,5 @@
+-- Миграция: индекс для постраничного архива задач
+-- Описание: /archive и /api/tasks/archive выбирают выполненные и отмененные
+-- задачи по статусу и дате завершения; счетчики архива считаются по тому же индексу
+
+CREATE INDEX IF NOT EXISTS idx_tasks_status_completed_at ON tasks (status, completed_at);
@@ -0,0 +1,20 @@
+-- Миграция: вложения задач
+-- Описание: файлы хранятся в хранилище вложений (каталог uploads или S3)
+-- по ключу из sha256, одинаковое содержимое записывается один раз
+
+CREATE TABLE IF NOT EXISTS attachments (
+    id VARCHAR(36) PRIMARY KEY,
+    task_id VARCHAR(36) REFERENCES tasks(id) ON DELETE CASCADE,
+    sha256 VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    content_type VARCHAR(100) NOT NULL DEFAULT 'application/octet-stream',
+    uploaded_by_id VARCHAR(36) REFERENCES users(id),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Вложения задачи и проверка ссылок на содержимое при удалении
+CREATE INDEX IF NOT EXISTS idx_attachments_task_id ON attachments (task_id);
+CREATE INDEX IF NOT EXISTS idx_attachments_sha256 ON attachments (sha256);
+
+COMMENT ON TABLE attachments IS 'Файлы, прикрепленные к задачам (содержимое адресуется по sha256)';
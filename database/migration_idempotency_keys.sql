@@ -0,0 +1,20 @@
+-- Миграция: ключи идемпотентности для создания задач
+-- Описание: повтор POST /api/tasks и /api/tasks/google-forms с тем же
+-- Idempotency-Key (или та же отправка формы в течение
+-- IDEMPOTENCY_CONTENT_WINDOW) получает сохраненный ответ
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(64) PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,
+    status_code INTEGER,
+    response_body TEXT,
+    content_type VARCHAR(100),
+    location VARCHAR(500),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Очистка устаревших ключей
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+
+COMMENT ON TABLE idempotency_keys IS 'Сохраненные ответы идемпотентных запросов создания задач';
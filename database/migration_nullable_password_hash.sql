@@ -0,0 +1,7 @@
+-- Миграция: учетные записи без локального пароля
+-- Описание: пользователи, созданные из LDAP, больше не получают случайный
+-- хеш-заглушку; отсутствие локального пароля обозначается NULL
+
+ALTER TABLE users ALTER COLUMN password_hash DROP NOT NULL;
+
+COMMENT ON COLUMN users.password_hash IS 'Хеш локального пароля (NULL - вход только через LDAP)';
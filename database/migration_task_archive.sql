@@ -0,0 +1,68 @@
+-- Миграция: архив завершенных задач
+-- Описание: services/archive_service.py переносит задачи "Готово" и
+-- "Отменено" старше auto_archive_days в tasks_archive, секционированную по
+-- месяцам closed_at. Секции создаются архиватором по мере надобности.
+-- Выполняется после migration_task_status_events.sql.
+
+-- Журнал статусов и вложения ссылаются на id задачи и после переноса в
+-- архив, поэтому внешние ключи на tasks снимаются (удаление задачи
+-- удаляет их через каскад ORM)
+ALTER TABLE attachments DROP CONSTRAINT IF EXISTS attachments_task_id_fkey;
+ALTER TABLE task_status_events DROP CONSTRAINT IF EXISTS task_status_events_task_id_fkey;
+
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    id UUID NOT NULL,
+    closed_at TIMESTAMP NOT NULL,
+    task_number VARCHAR(20) NOT NULL,
+    title VARCHAR(200) NOT NULL,
+    description TEXT,
+    task_type SMALLINT NOT NULL,
+    status SMALLINT NOT NULL,
+    priority SMALLINT NOT NULL,
+    requester_name VARCHAR(100) NOT NULL,
+    requester_department VARCHAR(100) NOT NULL,
+    requester_email VARCHAR(120),
+    requester_phone VARCHAR(20),
+    created_at TIMESTAMP NOT NULL,
+    taken_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    deadline TIMESTAMP,
+    estimated_hours DOUBLE PRECISION,
+    screenshot_url VARCHAR(500),
+    completion_comment TEXT,
+    external_id VARCHAR(128),
+    assigned_to_id UUID REFERENCES users(id),
+    updated_at TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Уникальные ключи секционированной таблицы включают ключ секционирования
+    PRIMARY KEY (id, closed_at)
+) PARTITION BY RANGE (closed_at);
+
+-- Поиск архивной задачи по id (карточка, вложения)
+CREATE INDEX IF NOT EXISTS idx_tasks_archive_id ON tasks_archive (id);
+-- Страница архива и аналитика с ?archived=1
+CREATE INDEX IF NOT EXISTS idx_tasks_archive_status_completed_at ON tasks_archive (status, completed_at);
+-- Повторная отправка уже архивной заявки не создает дубликат
+CREATE INDEX IF NOT EXISTS idx_tasks_archive_external_id ON tasks_archive (external_id);
+
+-- Полнотекстовый поиск по архиву (как migration_task_search.sql для tasks)
+ALTER TABLE tasks_archive ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(completion_comment, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(requester_name, '') || ' ' ||
+                                        coalesce(requester_department, '') || ' ' ||
+                                        coalesce(requester_email, '')), 'D')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_tasks_archive_search_vector ON tasks_archive USING gin (search_vector);
+
+-- Перенос в архив отмечается для синхронизации клиентов так же, как
+-- удаление, но с причиной 'archived'
+ALTER TABLE task_tombstones ADD COLUMN IF NOT EXISTS reason VARCHAR(10) NOT NULL DEFAULT 'deleted';
+
+COMMENT ON TABLE tasks_archive IS 'Завершенные задачи старше auto_archive_days (секции по месяцам closed_at)';
+COMMENT ON COLUMN tasks_archive.closed_at IS 'Время завершения или отмены задачи, ключ секционирования';
+
+-- Секция по умолчанию не создается: строка без подходящей секции
+-- откатывает пачку архиватора, а не оседает в общей секции
@@ -0,0 +1,19 @@
+-- Миграция: синхронизация изменений задач по водяному знаку
+-- Описание: GET /api/tasks/changes выбирает задачи в порядке (updated_at, id)
+-- после переданного водяного знака, а удаления - из таблицы отметок
+
+-- У старых задач updated_at мог остаться пустым
+UPDATE tasks SET updated_at = COALESCE(updated_at, created_at) WHERE updated_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS task_tombstones (
+    task_id VARCHAR(36) PRIMARY KEY,
+    task_number VARCHAR(20) NOT NULL,
+    requester_email VARCHAR(120),
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_task_tombstones_deleted_at ON task_tombstones (deleted_at, task_id);
+
+COMMENT ON TABLE task_tombstones IS 'Отметки об удаленных задачах для синхронизации клиентов';
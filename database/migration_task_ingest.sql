@@ -0,0 +1,9 @@
+-- Миграция: пакетный прием заявок из Google Forms и внешних систем
+-- Описание: POST /api/tasks/ingest сохраняет ключ идемпотентности заявки,
+-- чтобы повторная отправка после сбоя не создавала дубликаты
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS external_id VARCHAR(128);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_external_id ON tasks (external_id);
+
+COMMENT ON COLUMN tasks.external_id IS 'Ключ идемпотентности: источник:ID заявки или sha256 содержимого';
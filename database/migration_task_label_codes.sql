@@ -0,0 +1,41 @@
+-- Миграция: коды SMALLINT вместо строк для status, task_type и priority
+-- Описание: подписи ('В работе', 'Высокий') хранятся номерами из
+-- models/task.py (TASK_STATUS_CODES, TASK_TYPE_CODES, TASK_PRIORITY_CODES);
+-- API и шаблоны по-прежнему работают с подписями. Строка задачи и индексы
+-- по статусу становятся меньше, приоритет сортируется как число.
+--
+-- Неизвестная подпись превращается в NULL и останавливает миграцию на
+-- NOT NULL. Проверка перед запуском:
+--   SELECT status, task_type, priority, count(*) FROM tasks GROUP BY 1, 2, 3;
+
+BEGIN;
+
+ALTER TABLE tasks
+    ALTER COLUMN status DROP DEFAULT,
+    ALTER COLUMN priority DROP DEFAULT;
+
+ALTER TABLE tasks
+    ALTER COLUMN status TYPE SMALLINT USING CASE status
+        WHEN 'Неразобранная' THEN 1
+        WHEN 'В работе' THEN 2
+        WHEN 'В очереди' THEN 3
+        WHEN 'Ожидает' THEN 4
+        WHEN 'Готово' THEN 5
+        WHEN 'Отменено' THEN 6
+    END,
+    ALTER COLUMN task_type TYPE SMALLINT USING CASE task_type
+        WHEN 'Сбой' THEN 1
+        WHEN 'Новая разработка' THEN 2
+        WHEN 'Консультация' THEN 3
+        WHEN 'Прочее' THEN 4
+    END,
+    ALTER COLUMN priority TYPE SMALLINT USING CASE priority
+        WHEN 'Высокий' THEN 1
+        WHEN 'Средний' THEN 2
+        WHEN 'Низкий' THEN 3
+    END;
+
+COMMIT;
+
+-- idx_tasks_status_completed_at перестроен вместе со столбцом
+ANALYZE tasks;
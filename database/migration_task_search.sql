@@ -0,0 +1,20 @@
+-- Миграция: полнотекстовый поиск по задачам
+-- Описание: /api/tasks/search ищет по названию, описанию, комментарию
+-- выполнения и данным постановщика. Вектор поиска хранится в генерируемом
+-- столбце (PostgreSQL 12+) и индексируется GIN; веса A-D задают ранжирование.
+-- Данные постановщика индексируются конфигурацией simple (имена и email не
+-- нужно приводить к основе слова).
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(completion_comment, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(requester_name, '') || ' ' ||
+                                        coalesce(requester_department, '') || ' ' ||
+                                        coalesce(requester_email, '')), 'D')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_search_vector ON tasks USING gin (search_vector);
+
+COMMENT ON COLUMN tasks.search_vector IS 'Вектор полнотекстового поиска (генерируется из текстовых полей задачи)';
@@ -0,0 +1,45 @@
+-- Миграция: журнал смен статусов задач
+-- Описание: Task.update_status дописывает событие на каждую смену статуса,
+-- аналитика считает время в статусах и сроки реакции оконными функциями
+-- по журналу. Выполняется после migration_uuid_keys.sql и
+-- migration_task_label_codes.sql (uuid и коды статусов из models/task.py).
+
+CREATE TABLE IF NOT EXISTS task_status_events (
+    id BIGSERIAL PRIMARY KEY,
+    task_id UUID NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    status SMALLINT NOT NULL,
+    at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- История задачи по порядку (PARTITION BY task_id ORDER BY at)
+CREATE INDEX IF NOT EXISTS idx_task_status_events_task_id_at ON task_status_events (task_id, at);
+-- События статуса за период. Покрывающий: время в статусах считается
+-- index-only scan (журнал только дописывается, карта видимости актуальна)
+CREATE INDEX IF NOT EXISTS idx_task_status_events_status_at
+    ON task_status_events (status, at, task_id) INCLUDE (id);
+
+COMMENT ON TABLE task_status_events IS 'Журнал смен статусов задач (только дописывается)';
+
+-- Начальная история существующих задач восстанавливается приближенно:
+-- создание (1 - Неразобранная), последние taken_at (2 - В работе) и
+-- completed_at (5 - Готово), текущий статус, если он не покрыт ими
+INSERT INTO task_status_events (task_id, status, at)
+SELECT id, 1, created_at FROM tasks
+WHERE NOT EXISTS (SELECT 1 FROM task_status_events e WHERE e.task_id = tasks.id);
+
+INSERT INTO task_status_events (task_id, status, at)
+SELECT id, 2, taken_at FROM tasks
+WHERE taken_at IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM task_status_events e WHERE e.task_id = tasks.id AND e.status = 2);
+
+INSERT INTO task_status_events (task_id, status, at)
+SELECT id, 5, completed_at FROM tasks
+WHERE completed_at IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM task_status_events e WHERE e.task_id = tasks.id AND e.status = 5);
+
+INSERT INTO task_status_events (task_id, status, at)
+SELECT id, status, GREATEST(COALESCE(updated_at, created_at), created_at, taken_at, completed_at) FROM tasks
+WHERE status <> 1
+  AND NOT EXISTS (SELECT 1 FROM task_status_events e WHERE e.task_id = tasks.id AND e.status = tasks.status);
+
+ANALYZE task_status_events;
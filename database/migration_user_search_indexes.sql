@@ -0,0 +1,18 @@
+-- Миграция: индексы для постраничного списка и поиска пользователей
+-- Описание: поиск подстроки по username/name/email/department в админке
+-- использует триграммные GIN-индексы, сортировка по ФИО - составной индекс
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Фильтр по статусу и сортировка по ФИО
+CREATE INDEX IF NOT EXISTS idx_users_active_name ON users (is_active, name, id);
+
+-- Фильтры по роли и отделу
+CREATE INDEX IF NOT EXISTS idx_users_role ON users (role);
+CREATE INDEX IF NOT EXISTS idx_users_department ON users (department);
+
+-- Поиск подстроки без учета регистра (LIKE '%...%')
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_department_trgm ON users USING gin (lower(department) gin_trgm_ops);
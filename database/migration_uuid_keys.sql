@@ -0,0 +1,47 @@
+-- Миграция: идентификаторы uuid вместо VARCHAR(36)
+-- Описание: первичные и внешние ключи хранятся в нативном типе uuid
+-- (16 байт вместо 37), индексы и соединения по ним становятся меньше.
+-- API не меняется: приложение читает и передает id строками (models/types.py).
+-- Внешние ключи снимаются на время смены типа и создаются заново.
+
+BEGIN;
+
+ALTER TABLE tasks DROP CONSTRAINT IF EXISTS tasks_assigned_to_id_fkey;
+ALTER TABLE system_settings DROP CONSTRAINT IF EXISTS system_settings_updated_by_fkey;
+ALTER TABLE attachments DROP CONSTRAINT IF EXISTS attachments_task_id_fkey;
+ALTER TABLE attachments DROP CONSTRAINT IF EXISTS attachments_uploaded_by_id_fkey;
+
+ALTER TABLE users ALTER COLUMN id TYPE uuid USING id::uuid;
+
+ALTER TABLE tasks
+    ALTER COLUMN id TYPE uuid USING id::uuid,
+    ALTER COLUMN assigned_to_id TYPE uuid USING assigned_to_id::uuid;
+
+ALTER TABLE system_settings
+    ALTER COLUMN id TYPE uuid USING id::uuid,
+    ALTER COLUMN updated_by TYPE uuid USING updated_by::uuid;
+
+ALTER TABLE task_tombstones ALTER COLUMN task_id TYPE uuid USING task_id::uuid;
+
+ALTER TABLE attachments
+    ALTER COLUMN id TYPE uuid USING id::uuid,
+    ALTER COLUMN task_id TYPE uuid USING task_id::uuid,
+    ALTER COLUMN uploaded_by_id TYPE uuid USING uploaded_by_id::uuid;
+
+ALTER TABLE tasks ADD CONSTRAINT tasks_assigned_to_id_fkey
+    FOREIGN KEY (assigned_to_id) REFERENCES users(id);
+ALTER TABLE system_settings ADD CONSTRAINT system_settings_updated_by_fkey
+    FOREIGN KEY (updated_by) REFERENCES users(id);
+ALTER TABLE attachments ADD CONSTRAINT attachments_task_id_fkey
+    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE;
+ALTER TABLE attachments ADD CONSTRAINT attachments_uploaded_by_id_fkey
+    FOREIGN KEY (uploaded_by_id) REFERENCES users(id);
+
+COMMIT;
+
+-- Статистика планировщика после перезаписи таблиц
+ANALYZE users;
+ANALYZE tasks;
+ANALYZE system_settings;
+ANALYZE task_tombstones;
+ANALYZE attachments;
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Служебные команды Менеджера задач
+
+Примеры:
+    python manage.py import-users users.csv
+    python manage.py import-users users.ndjson --upsert
+    python manage.py build-assets
+    python manage.py convert-uuid-keys
+    python manage.py convert-label-codes
+    python manage.py archive-tasks
+    python manage.py backup
+    python manage.py verify-backup backups/taskmanager_20240101_020000.pgdump
+    python manage.py restore-backup backups/taskmanager_20240101_020000.pgdump --yes
+"""
+
+import argparse
+import os
+import sys
+import uuid
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Фоновые задания работают в воркерах приложения, не в служебных командах
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+# Команды обновления (convert-label-codes) запускаются как раз на старой схеме
+os.environ.setdefault('SCHEMA_CHECK_ENABLED', 'false')
+
+from app import create_app
+
+
+def import_users(app, args):
+    """Массовый импорт пользователей из CSV, JSON или NDJSON"""
+    service = app.extensions['services'].get('user_import')
+    service.batch_size = args.batch_size
+    fmt = args.format or service.detect_format(args.file)
+
+    with open(args.file, 'rb') as stream:
+        rows = service.parse_stream(stream, fmt)
+        report = service.import_users(rows, upsert=args.upsert)
+
+    print(f"✅ Создано: {report['created']}, обновлено: {report['updated']}")
+    if report['failed']:
+        print(f"❌ Ошибок: {report['failed']}")
+        for error in report['errors']:
+            print(f"  строка {error['row']} ({error['username'] or '-'}): {error['message']}")
+        return 1
+    return 0
+
+
+def build_assets(app, args):
+    """Сборка статики в static/dist (хеш в имени, минификация, .gz и .br)"""
+    from utils.assets import build_assets as build
+
+    manifest = build(app.static_folder, minify_assets=not args.no_minify)
+    print(f"✅ Собрано файлов: {len(manifest)}")
+    return 0
+
+
+# Столбцы-идентификаторы, которые хранятся в компактном виде (models/types.py)
+UUID_COLUMNS = {
+    'users': ('id',),
+    'tasks': ('id', 'assigned_to_id'),
+    'system_settings': ('id', 'updated_by'),
+    'task_tombstones': ('task_id',),
+    'attachments': ('id', 'task_id', 'uploaded_by_id'),
+}
+
+
+def convert_uuid_keys(app, args):
+    """Перевод идентификаторов SQLite-базы из строк в 16 байт
+
+    Для PostgreSQL то же делает database/migration_uuid_keys.sql.
+    """
+    from sqlalchemy import inspect
+    from models.database import db
+
+    if db.engine.dialect.name != 'sqlite':
+        print("❌ Команда только для SQLite, для PostgreSQL: database/migration_uuid_keys.sql")
+        return 1
+
+    converted = 0
+    with db.engine.begin() as conn:
+        conn.connection.dbapi_connection.create_function(
+            'uuid_blob', 1, lambda value: uuid.UUID(value).bytes, deterministic=True)
+        tables = set(inspect(conn).get_table_names())
+        for table, columns in UUID_COLUMNS.items():
+            if table not in tables:
+                continue
+            for column in columns:
+                result = conn.exec_driver_sql(
+                    f"UPDATE {table} SET {column} = uuid_blob({column}) WHERE typeof({column}) = 'text'")
+                converted += result.rowcount
+    print(f"✅ Преобразовано значений: {converted}")
+    return 0
+
+
+def convert_label_codes(app, args):
+    """Перевод status, task_type и priority SQLite-базы из подписей в коды
+
+    Для PostgreSQL то же делает database/migration_task_label_codes.sql.
+    """
+    from models.database import db
+    from models.task import Task
+
+    if db.engine.dialect.name != 'sqlite':
+        print("❌ Команда только для SQLite, для PostgreSQL: database/migration_task_label_codes.sql")
+        return 1
+
+    converted = 0
+    with db.engine.begin() as conn:
+        for column in ('status', 'task_type', 'priority'):
+            for code, label in Task.__table__.c[column].type.labels:
+                result = conn.exec_driver_sql(
+                    f"UPDATE tasks SET {column} = ? WHERE {column} = ?", (code, label))
+                converted += result.rowcount
+    print(f"✅ Преобразовано значений: {converted}")
+    return 0
+
+
+def archive_tasks(app, args):
+    """Перенос завершенных задач в tasks_archive (например, из cron
+    при SCHEDULER_ENABLED=false)"""
+    service = app.extensions['services'].get('archive')
+    if not service.archive_days():
+        print("❌ Архивирование выключено: auto_archive_days = 0")
+        return 1
+    archived = service.archive_due()
+    print(f"✅ Перенесено в архив задач: {archived}")
+    return 0
+
+
+def backup(app, args):
+    """Резервная копия базы (независимо от backup_enabled и интервала)"""
+    service = app.extensions['services'].get('backup')
+    result = service.create_backup()
+    if result is None:
+        print("❌ Копию уже снимает другой процесс")
+        return 1
+    print(f"✅ Копия {result['path']} ({result['size']} байт, sha256 {result['sha256']})")
+    return 0
+
+
+def print_tables(tables):
+    for table, rows in sorted(tables.items()):
+        print(f"  {table}: {rows if rows is not None else '-'}")
+
+
+def verify_backup(app, args):
+    """Проверка контрольной суммы и содержимого копии"""
+    report = app.extensions['services'].get('backup').verify(args.file)
+    print(f"{'✅' if report['ok'] else '❌'} {report['message']}")
+    print_tables(report.get('tables', {}))
+    return 0 if report['ok'] else 1
+
+
+def restore_backup(app, args):
+    """Восстановление базы из проверенной копии (приложение должно быть
+    остановлено)"""
+    from sqlalchemy.engine import make_url
+    from models.database import db
+
+    service = app.extensions['services'].get('backup')
+    report = service.verify(args.file)
+    print(f"{'✅' if report['ok'] else '❌'} {report['message']}")
+    if not report['ok']:
+        return 1
+    print_tables(report['tables'])
+
+    target = args.target or service.database_url
+    if not args.yes:
+        answer = input(f"Данные базы {make_url(target).render_as_string()} будут заменены. Продолжить? [y/N] ")
+        if answer.strip().lower() not in ('y', 'yes', 'д', 'да'):
+            print("Восстановление отменено")
+            return 1
+
+    db.engine.dispose()
+    tables = service.restore(args.file, target_url=target)
+    print("✅ База восстановлена, строк в таблицах:")
+    print_tables(tables)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Служебные команды Менеджера задач')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_import = subparsers.add_parser('import-users', help='Импорт пользователей')
+    parser_import.add_argument('file', help='Файл CSV, JSON или NDJSON')
+    parser_import.add_argument('--format', choices=['csv', 'json', 'ndjson'])
+    parser_import.add_argument('--upsert', action='store_true',
+                               help='Обновлять существующих пользователей')
+    parser_import.add_argument('--batch-size', type=int, default=500)
+    parser_import.set_defaults(handler=import_users)
+
+    parser_assets = subparsers.add_parser('build-assets', help='Сборка статики')
+    parser_assets.add_argument('--no-minify', action='store_true',
+                               help='Не минифицировать CSS и JS')
+    parser_assets.set_defaults(handler=build_assets)
+
+    parser_uuid = subparsers.add_parser('convert-uuid-keys',
+                                        help='Перевод id SQLite-базы в компактный вид')
+    parser_uuid.set_defaults(handler=convert_uuid_keys)
+
+    parser_labels = subparsers.add_parser('convert-label-codes',
+                                          help='Перевод статусов, типов и приоритетов SQLite-базы в коды')
+    parser_labels.set_defaults(handler=convert_label_codes)
+
+    parser_archive = subparsers.add_parser('archive-tasks',
+                                           help='Перенос завершенных задач в архив')
+    parser_archive.set_defaults(handler=archive_tasks)
+
+    parser_backup = subparsers.add_parser('backup', help='Резервная копия базы')
+    parser_backup.set_defaults(handler=backup)
+
+    parser_verify = subparsers.add_parser('verify-backup', help='Проверка резервной копии')
+    parser_verify.add_argument('file', help='Файл копии (.sqlite3.gz или .pgdump)')
+    parser_verify.set_defaults(handler=verify_backup)
+
+    parser_restore = subparsers.add_parser('restore-backup', help='Восстановление базы из копии')
+    parser_restore.add_argument('file', help='Файл копии (.sqlite3.gz или .pgdump)')
+    parser_restore.add_argument('--target', help='URL базы для восстановления (по умолчанию рабочая)')
+    parser_restore.add_argument('--yes', action='store_true', help='Не спрашивать подтверждение')
+    parser_restore.set_defaults(handler=restore_backup)
+
+    args = parser.parse_args()
+
+    app, _, _ = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        sys.exit(args.handler(app, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 from .database import db
 from .user import User
-from .task import Task
+from .task import Task, TaskArchive, TaskStatusEvent, TaskTombstone
 from .settings import SystemSettings
+from .idempotency import IdempotencyKey
+from .attachment import Attachment
 
-__all__ = ['db', 'User', 'Task', 'SystemSettings']
+__all__ = ['db', 'User', 'Task', 'TaskArchive', 'TaskStatusEvent', 'TaskTombstone', 'SystemSettings', 'IdempotencyKey', 'Attachment']
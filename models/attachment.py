@@ -0,0 +1,62 @@
+from datetime import datetime
+from .database import db
+from .types import GUID
+import uuid
+
+# Типы, которые отдаются inline (в браузере): только растровые изображения,
+# определенные по содержимому. SVG и остальное всегда скачивается файлом
+INLINE_IMAGE_TYPES = frozenset({'image/png', 'image/jpeg', 'image/gif', 'image/webp'})
+
+class Attachment(db.Model):
+    """Файл, прикрепленный к задаче
+
+    Содержимое хранится в хранилище вложений по ключу из sha256, поэтому
+    одинаковые файлы разных задач занимают место один раз.
+    """
+    __tablename__ = 'attachments'
+    __table_args__ = (
+        db.Index('idx_attachments_task_id', 'task_id'),
+        db.Index('idx_attachments_sha256', 'sha256'),
+    )
+
+    id = db.Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Задача в tasks или tasks_archive (поэтому без внешнего ключа)
+    task_id = db.Column(GUID)
+    sha256 = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False, default='application/octet-stream')
+    uploaded_by_id = db.Column(GUID, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    task = db.relationship('Task', primaryjoin='foreign(Attachment.task_id) == Task.id',
+                           backref=db.backref('attachments', order_by='Attachment.created_at',
+                                              cascade='all, delete-orphan'))
+
+    @staticmethod
+    def key_for(sha256):
+        """Ключ содержимого в хранилище: ab/cd/<sha256>"""
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    @property
+    def storage_key(self):
+        return self.key_for(self.sha256)
+
+    @property
+    def is_image(self):
+        return self.content_type in INLINE_IMAGE_TYPES
+
+    def __repr__(self):
+        return f'<Attachment {self.filename} {self.sha256[:12]}>'
+
+    def to_dict(self):
+        """Преобразование в словарь для API"""
+        return {
+            'id': str(self.id),
+            'task_id': str(self.task_id) if self.task_id else None,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,28 @@
+from datetime import datetime
+from .database import db
+
+class IdempotencyKey(db.Model):
+    """Сохраненный ответ на запрос с ключом идемпотентности
+
+    Повтор запроса с тем же ключом получает сохраненный ответ вместо
+    повторного создания задачи. Записи живут до expires_at.
+    """
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.Index('idx_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    # sha256 от (обработчик, пользователь, ключ или отпечаток содержимого)
+    key = db.Column(db.String(64), primary_key=True)
+    # Отпечаток тела запроса: тот же ключ с другим телом - ошибка клиента
+    fingerprint = db.Column(db.String(64), nullable=False)
+    # Пусто, пока первый запрос еще выполняется
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    content_type = db.Column(db.String(100))
+    location = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key[:12]} {self.status_code}>'
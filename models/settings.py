@@ -1,16 +1,17 @@
 from datetime import datetime
 from .database import db
+from .types import GUID
 
 class SystemSettings(db.Model):
     """Модель для хранения настроек системы"""
     __tablename__ = 'system_settings'
     
-    id = db.Column(db.String(36), primary_key=True)
+    id = db.Column(GUID, primary_key=True)
     key = db.Column(db.String(100), unique=True, nullable=False)
     value = db.Column(db.Text)
     description = db.Column(db.String(500))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    updated_by = db.Column(db.String(36), db.ForeignKey('users.id'))
+    updated_by = db.Column(GUID, db.ForeignKey('users.id'))
     
     def __repr__(self):
         return f'<SystemSettings {self.key}: {self.value}>'
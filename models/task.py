@@ -1,20 +1,36 @@
 from datetime import datetime
 from .database import db
+from sqlalchemy.orm import validates
+from .types import GUID, LabelCode
 import uuid
 
+# Коды справочных значений в БД (models/types.py: LabelCode). Номера не
+# меняются; подписи совпадают с Config.TASK_STATUSES, TASK_TYPES и TASK_PRIORITIES
+TASK_STATUS_CODES = {1: 'Неразобранная', 2: 'В работе', 3: 'В очереди',
+                     4: 'Ожидает', 5: 'Готово', 6: 'Отменено'}
+TASK_TYPE_CODES = {1: 'Сбой', 2: 'Новая разработка', 3: 'Консультация', 4: 'Прочее'}
+# Порядок кодов - порядок сортировки: от высокого приоритета к низкому
+TASK_PRIORITY_CODES = {1: 'Высокий', 2: 'Средний', 3: 'Низкий'}
+
 class Task(db.Model):
     """Модель данных для задачи"""
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Синхронизация изменений по водяному знаку (updated_at, id)
+        db.Index('idx_tasks_updated_at', 'updated_at', 'id'),
+        # Страницы и счетчики архива (фильтр по статусу, сортировка по завершению)
+        db.Index('idx_tasks_status_completed_at', 'status', 'completed_at'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     task_number = db.Column(db.String(20), unique=True, nullable=False)
     
     # Основная информация
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    task_type = db.Column(db.String(50), nullable=False)  # Сбой, Новая разработка, Консультация, Прочее
-    status = db.Column(db.String(50), nullable=False, default='Неразобранная')
-    priority = db.Column(db.String(20), nullable=False, default='Средний')
+    task_type = db.Column(LabelCode(TASK_TYPE_CODES), nullable=False)  # Сбой, Новая разработка, Консультация, Прочее
+    status = db.Column(LabelCode(TASK_STATUS_CODES), nullable=False, default='Неразобранная')
+    priority = db.Column(LabelCode(TASK_PRIORITY_CODES), nullable=False, default='Средний')
     
     # Данные о постановщике
     requester_name = db.Column(db.String(100), nullable=False)
@@ -32,17 +48,60 @@ class Task(db.Model):
     estimated_hours = db.Column(db.Float)
     screenshot_url = db.Column(db.String(500))
     completion_comment = db.Column(db.Text)
+    # Ключ идемпотентности заявки из внешнего источника (источник:ID или хеш)
+    external_id = db.Column(db.String(128), unique=True)
     
     # Связи
-    assigned_to_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+    assigned_to_id = db.Column(GUID, db.ForeignKey('users.id'))
     assigned_to = db.relationship('User', backref='assigned_tasks')
+    # Журнал смен статусов; dynamic - добавление события не загружает историю.
+    # Без внешнего ключа в БД: история остается при переносе задачи в архив
+    status_events = db.relationship('TaskStatusEvent', backref='task', lazy='dynamic',
+                                    primaryjoin='Task.id == foreign(TaskStatusEvent.task_id)',
+                                    cascade='all, delete-orphan')
     
     # Метаданные
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Поля API в порядке to_dict(); все, кроме assigned_to_name, - столбцы tasks
+    API_FIELDS = (
+        'id', 'task_number', 'title', 'description', 'task_type', 'status', 'priority',
+        'requester_name', 'requester_department', 'requester_email', 'requester_phone',
+        'created_at', 'taken_at', 'completed_at', 'deadline', 'estimated_hours',
+        'screenshot_url', 'completion_comment', 'assigned_to_id', 'assigned_to_name', 'updated_at'
+    )
+    
+    # Задача в оперативной таблице (TaskArchive - перенесенная в архив)
+    is_archived = False
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.status is None:
+            self.status = 'Неразобранная'
+        # Начальный статус - первое событие журнала (время создания задачи)
+        self.status_events.append(TaskStatusEvent(status=self.status, at=self.created_at or datetime.utcnow()))
+    
     def __repr__(self):
         return f'<Task {self.task_number}: {self.title}>'
     
+    @validates('status', 'task_type', 'priority')
+    def validate_label(self, key, value):
+        """Неизвестная подпись отклоняется сразу, а не при записи в БД"""
+        self.__table__.c[key].type.code(value)
+        return value
+    
+    @classmethod
+    def invalid_labels(cls, values):
+        """Сообщение о недопустимых status/task_type/priority или None"""
+        errors = []
+        for key in ('status', 'task_type', 'priority'):
+            if key in values:
+                try:
+                    cls.__table__.c[key].type.code(values[key])
+                except ValueError:
+                    errors.append(f"{key}={values[key]}")
+        return f"Недопустимые значения: {', '.join(errors)}" if errors else None
+    
     def to_dict(self):
         """Преобразование в словарь для API"""
         return {
@@ -73,18 +132,24 @@ class Task(db.Model):
         """Обновление статуса задачи с автоматической фиксацией времени"""
         old_status = self.status
         self.status = new_status
+        now = datetime.utcnow()
+        
+        # Каждая смена статуса дописывается в журнал (taken_at и completed_at
+        # хранят только последнюю смену)
+        if new_status != old_status:
+            self.status_events.append(TaskStatusEvent(status=new_status, at=now))
         
         # Автоматическая фиксация времени взятия в работу
         if new_status == 'В работе' and old_status != 'В работе':
-            self.taken_at = datetime.utcnow()
+            self.taken_at = now
             if user_id:
                 self.assigned_to_id = user_id
         
         # Автоматическая фиксация времени выполнения
         if new_status == 'Готово' and old_status != 'Готово':
-            self.completed_at = datetime.utcnow()
+            self.completed_at = now
         
-        self.updated_at = datetime.utcnow()
+        self.updated_at = now
     
     @property
     def is_active(self):
@@ -113,3 +178,127 @@ class Task(db.Model):
             return None
         delta = self.completed_at - self.taken_at
         return round(delta.total_seconds() / 3600, 2)
+
+
+class TaskStatusEvent(db.Model):
+    """Смена статуса задачи (журнал только дописывается)
+
+    Интервал пребывания в статусе - от события до следующего события той
+    же задачи, поэтому время в статусах "Ожидает" и "В очереди" и повторные
+    открытия считаются оконными функциями по журналу без обхода tasks.
+    """
+    __tablename__ = 'task_status_events'
+    __table_args__ = (
+        # История задачи по порядку (оконные функции с PARTITION BY task_id)
+        db.Index('idx_task_status_events_task_id_at', 'task_id', 'at'),
+        # События статуса за период. Покрывающий: время в статусах за период
+        # считается по одному индексу, без чтения строк журнала
+        db.Index('idx_task_status_events_status_at', 'status', 'at', 'task_id',
+                 postgresql_include=['id']),
+    )
+    
+    # BIGINT под десятки миллионов событий; в SQLite автоинкремент только у INTEGER
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    # Ссылка на задачу в tasks или tasks_archive (поэтому без внешнего ключа)
+    task_id = db.Column(GUID, nullable=False)
+    status = db.Column(LabelCode(TASK_STATUS_CODES), nullable=False)
+    at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TaskStatusEvent {self.task_id}: {self.status}>'
+    
+    def to_dict(self):
+        """Преобразование в словарь для API"""
+        return {
+            'status': self.status,
+            'at': self.at.isoformat() if self.at else None
+        }
+
+
+class TaskArchive(db.Model):
+    """Завершенная задача, перенесенная в архив (services/archive_service.py)
+
+    Столбцы те же, что у Task, плюс closed_at - время завершения или
+    отмены, по которому PostgreSQL делит таблицу на месячные секции.
+    Архивная задача только читается; для шаблонов и API она ведет себя
+    как Task (to_dict, свойства, исполнитель и вложения).
+    """
+    __tablename__ = 'tasks_archive'
+    __table_args__ = (
+        db.Index('idx_tasks_archive_id', 'id'),
+        db.Index('idx_tasks_archive_status_completed_at', 'status', 'completed_at'),
+        # Повторная отправка уже архивной заявки не создает дубликат
+        db.Index('idx_tasks_archive_external_id', 'external_id'),
+        # Уникальные ключи секционированной таблицы включают ключ секционирования
+        {'postgresql_partition_by': 'RANGE (closed_at)'},
+    )
+    
+    id = db.Column(GUID, primary_key=True)
+    closed_at = db.Column(db.DateTime, primary_key=True)
+    task_number = db.Column(db.String(20), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    task_type = db.Column(LabelCode(TASK_TYPE_CODES), nullable=False)
+    status = db.Column(LabelCode(TASK_STATUS_CODES), nullable=False)
+    priority = db.Column(LabelCode(TASK_PRIORITY_CODES), nullable=False)
+    requester_name = db.Column(db.String(100), nullable=False)
+    requester_department = db.Column(db.String(100), nullable=False)
+    requester_email = db.Column(db.String(120))
+    requester_phone = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, nullable=False)
+    taken_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    deadline = db.Column(db.DateTime)
+    estimated_hours = db.Column(db.Float)
+    screenshot_url = db.Column(db.String(500))
+    completion_comment = db.Column(db.Text)
+    external_id = db.Column(db.String(128))
+    assigned_to_id = db.Column(GUID, db.ForeignKey('users.id'))
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    assigned_to = db.relationship('User', viewonly=True)
+    attachments = db.relationship('Attachment', viewonly=True, order_by='Attachment.created_at',
+                                  primaryjoin='TaskArchive.id == foreign(Attachment.task_id)')
+    
+    is_archived = True
+    to_dict = Task.to_dict
+    is_active = Task.is_active
+    is_overdue = Task.is_overdue
+    time_to_take = Task.time_to_take
+    time_to_complete = Task.time_to_complete
+    
+    def __repr__(self):
+        return f'<TaskArchive {self.task_number}: {self.title}>'
+
+
+class TaskTombstone(db.Model):
+    """Отметка об удалении задачи для синхронизации изменений
+
+    Клиенты, запрашивающие изменения с водяного знака, узнают об удалении
+    задачи по отметке, так как самой строки в tasks уже нет. reason
+    отличает удаление ('deleted') от переноса в архив ('archived').
+    """
+    __tablename__ = 'task_tombstones'
+    __table_args__ = (
+        db.Index('idx_task_tombstones_deleted_at', 'deleted_at', 'task_id'),
+    )
+    
+    task_id = db.Column(GUID, primary_key=True)
+    task_number = db.Column(db.String(20), nullable=False)
+    # Для фильтрации удалений по постановщику (обычные пользователи)
+    requester_email = db.Column(db.String(120))
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    reason = db.Column(db.String(10), nullable=False, default='deleted', server_default='deleted')
+    
+    def __repr__(self):
+        return f'<TaskTombstone {self.task_number}>'
+    
+    def to_dict(self):
+        """Преобразование в словарь для API"""
+        return {
+            'id': self.task_id,
+            'task_number': self.task_number,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None,
+            'reason': self.reason
+        }
@@ -0,0 +1,105 @@
+import uuid
+from sqlalchemy.types import LargeBinary, SmallInteger, TypeDecorator
+
+
+class GUID(TypeDecorator):
+    """Идентификатор UUID в компактном виде
+
+    PostgreSQL - нативный uuid (16 байт), остальные БД - BLOB из 16 байт
+    вместо строки из 36 символов. В Python и API значение остается
+    строкой вида 'xxxxxxxx-xxxx-...', поэтому код и клиенты не меняются.
+    Порядок значений совпадает с порядком строк, так что сортировка и
+    водяные знаки по id работают как раньше.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import UUID
+            return dialect.type_descriptor(UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def bind_processor(self, dialect):
+        # Без обработчиков базового типа: драйверы принимают bytes и str как есть
+        process_bind_param = self.process_bind_param
+        return lambda value: process_bind_param(value, dialect)
+
+    def result_processor(self, dialect, coltype):
+        process_result_value = self.process_result_value
+        return lambda value: process_result_value(value, dialect)
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value) if dialect.name == 'postgresql' else value.bytes
+        # Разбор строки без uuid.UUID: заметно дешевле на списках id
+        try:
+            raw = bytes.fromhex(str(value).replace('-', ''))
+        except ValueError:
+            raw = None
+        if raw is None or len(raw) != 16:
+            # Некорректный идентификатор из URL не совпадает ни с одной
+            # строкой (как и раньше со строковым ключом), а не роняет запрос
+            return None
+        if dialect.name == 'postgresql':
+            return _format(raw.hex())
+        return raw
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return _format(value.hex())
+        if isinstance(value, memoryview):
+            return _format(value.hex())
+        return str(value)
+
+
+def _format(digits):
+    """Строка UUID из 32 шестнадцатеричных цифр"""
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+class LabelCode(TypeDecorator):
+    """Справочное значение (статус, тип, приоритет), хранимое кодом SMALLINT
+
+    В Python и API значение остается подписью ('В работе'), в БД - номер
+    из labels ({код: подпись}). Коды не меняются: новые подписи получают
+    новые номера, иначе прочитанные данные изменят смысл. Порядок кодов
+    задает естественную сортировку (например, приоритет от высокого к низкому).
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, labels):
+        super().__init__()
+        self.labels = tuple(sorted(labels.items()))
+        self._codes = {label: code for code, label in self.labels}
+        self._label_by_code = dict(self.labels)
+
+    def code(self, label):
+        """Код подписи; ValueError для неизвестной подписи"""
+        try:
+            return self._codes[label]
+        except (KeyError, TypeError):
+            raise ValueError(f"Недопустимое значение: {label}") from None
+
+    def bind_processor(self, dialect):
+        # Неизвестная подпись в фильтре (?status=...) не совпадает ни с одной
+        # строкой; запись такой подписи отклоняет валидатор модели, а вставка
+        # в обход модели упрется в NOT NULL
+        codes = self._codes
+        return lambda value: None if value is None else codes.get(value)
+
+    def result_processor(self, dialect, coltype):
+        labels = self._label_by_code
+        # SQLite после convert-label-codes может вернуть код строкой
+        return lambda value: None if value is None else labels.get(int(value))
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self._codes.get(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self._label_by_code.get(int(value))
@@ -1,12 +1,19 @@
 from datetime import datetime
 from .database import db
+from .types import GUID
 import uuid
 
 class User(db.Model):
     """Модель данных для пользователя системы"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Постраничный список пользователей в админке (фильтр + сортировка)
+        db.Index('idx_users_active_name', 'is_active', 'name', 'id'),
+        db.Index('idx_users_role', 'role'),
+        db.Index('idx_users_department', 'department'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -16,8 +23,8 @@ class User(db.Model):
     # Telegram username для уведомлений
     telegram_username = db.Column(db.String(50), nullable=True)
     
-    # Пароль (в реальном проекте должен быть хеширован)
-    password_hash = db.Column(db.String(255), nullable=False)
+    # Хеш пароля; NULL у учетных записей без локального пароля (LDAP)
+    password_hash = db.Column(db.String(255), nullable=True)
     
     # Статус пользователя
     is_active = db.Column(db.Boolean, default=True)
@@ -59,6 +66,11 @@ class User(db.Model):
         """Проверка, является ли пользователь обычным пользователем"""
         return self.role == 'user'
     
+    @property
+    def has_local_password(self):
+        """Проверка, может ли пользователь входить по локальному паролю"""
+        return bool(self.password_hash)
+    
     @property
     def can_manage_tasks(self):
         """Проверка, может ли пользователь управлять задачами"""
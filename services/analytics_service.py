@@ -1,16 +1,26 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
-from models.task import Task, db
+from sqlalchemy import func, and_, case, select, union_all
+from models.task import Task, TaskArchive, TaskStatusEvent, db
 from models.user import User
 
+# Столбцы задач, которые нужны агрегатам аналитики
+ANALYTICS_COLUMNS = ('id', 'task_type', 'status', 'priority', 'created_at', 'taken_at',
+                     'completed_at', 'assigned_to_id')
+
 class AnalyticsService:
     """Сервис для аналитики эффективности выполнения задач"""
     
     def __init__(self):
         self.db = db
     
-    def get_performance_stats(self):
-        """Получение основных показателей эффективности"""
+    def get_performance_stats(self, include_archived=False):
+        """Получение основных показателей эффективности
+        
+        include_archived - вместе с задачами, перенесенными в tasks_archive
+        (агрегаты считаются по объединению таблиц).
+        """
+        tasks = self._tasks(include_archived)
+        
         # Получение выполненных задач за последние 30 дней
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
@@ -20,22 +30,32 @@ class AnalyticsService:
                 Task.completed_at >= thirty_days_ago
             )
         ).all()
+        if include_archived:
+            # closed_at (ключ секций) отсекает секции старше периода
+            completed_tasks += TaskArchive.query.filter(
+                TaskArchive.status == 'Готово',
+                TaskArchive.completed_at >= thirty_days_ago,
+                TaskArchive.closed_at >= thirty_days_ago
+            ).all()
         
         # Расчет средних показателей
         avg_time_to_take = self._calculate_avg_time_to_take(completed_tasks)
         avg_time_to_complete = self._calculate_avg_time_to_complete(completed_tasks)
         
         # Статистика по типам задач
-        task_type_stats = self._get_task_type_statistics()
+        task_type_stats = self._get_task_type_statistics(tasks)
         
         # Статистика по приоритетам
-        priority_stats = self._get_priority_statistics()
+        priority_stats = self._get_priority_statistics(tasks)
         
         # Статистика по исполнителям
-        user_stats = self._get_user_statistics()
+        user_stats = self._get_user_statistics(tasks)
         
         # Тренды по дням
-        daily_trends = self._get_daily_trends()
+        daily_trends = self._get_daily_trends(tasks)
+        
+        # Время в статусах и сроки реакции по журналу смен статусов
+        status_stats = self.get_status_statistics(include_archived=include_archived)
         
         return {
             'overview': {
@@ -48,9 +68,21 @@ class AnalyticsService:
             'priority_statistics': priority_stats,
             'user_statistics': user_stats,
             'daily_trends': daily_trends,
+            'include_archived': include_archived,
+            'status_time_statistics': status_stats['time_in_status'],
+            'sla_statistics': status_stats['sla'],
             'detailed_tasks': [task.to_dict() for task in completed_tasks[:50]]  # Последние 50 задач
         }
     
+    def _tasks(self, include_archived=False):
+        """Задачи для агрегатов: tasks или объединение tasks и tasks_archive"""
+        if not include_archived:
+            return Task.__table__
+        return union_all(*[
+            select(*[model.__table__.c[name] for name in ANALYTICS_COLUMNS])
+            for model in (Task, TaskArchive)
+        ]).subquery('all_tasks')
+    
     def _calculate_avg_time_to_take(self, tasks):
         """Расчет среднего времени от создания до взятия в работу (в минутах)"""
         valid_tasks = [task for task in tasks if task.time_to_take is not None]
@@ -71,15 +103,15 @@ class AnalyticsService:
         total_hours = sum(task.time_to_complete for task in valid_tasks)
         return round(total_hours / len(valid_tasks), 2)
     
-    def _get_task_type_statistics(self):
+    def _get_task_type_statistics(self, tasks):
         """Статистика по типам задач"""
-        stats = db.session.query(
-            Task.task_type,
-            func.count(Task.id).label('total'),
-            func.avg(func.extract('epoch', Task.completed_at - Task.created_at) / 3600).label('avg_hours')
-        ).filter(
-            Task.status == 'Готово'
-        ).group_by(Task.task_type).all()
+        stats = db.session.execute(select(
+            tasks.c.task_type,
+            func.count(tasks.c.id).label('total'),
+            func.avg(func.extract('epoch', tasks.c.completed_at - tasks.c.created_at) / 3600).label('avg_hours')
+        ).where(
+            tasks.c.status == 'Готово'
+        ).group_by(tasks.c.task_type)).all()
         
         return [
             {
@@ -90,15 +122,15 @@ class AnalyticsService:
             for stat in stats
         ]
     
-    def _get_priority_statistics(self):
+    def _get_priority_statistics(self, tasks):
         """Статистика по приоритетам задач"""
-        stats = db.session.query(
-            Task.priority,
-            func.count(Task.id).label('total'),
-            func.avg(func.extract('epoch', Task.completed_at - Task.created_at) / 3600).label('avg_hours')
-        ).filter(
-            Task.status == 'Готово'
-        ).group_by(Task.priority).all()
+        stats = db.session.execute(select(
+            tasks.c.priority,
+            func.count(tasks.c.id).label('total'),
+            func.avg(func.extract('epoch', tasks.c.completed_at - tasks.c.created_at) / 3600).label('avg_hours')
+        ).where(
+            tasks.c.status == 'Готово'
+        ).group_by(tasks.c.priority)).all()
         
         return [
             {
@@ -109,15 +141,15 @@ class AnalyticsService:
             for stat in stats
         ]
     
-    def _get_user_statistics(self):
+    def _get_user_statistics(self, tasks):
         """Статистика по исполнителям"""
-        stats = db.session.query(
+        stats = db.session.execute(select(
             User.name,
-            func.count(Task.id).label('total'),
-            func.avg(func.extract('epoch', Task.completed_at - Task.taken_at) / 3600).label('avg_hours')
-        ).join(Task, User.id == Task.assigned_to_id).filter(
-            Task.status == 'Готово'
-        ).group_by(User.name).all()
+            func.count(tasks.c.id).label('total'),
+            func.avg(func.extract('epoch', tasks.c.completed_at - tasks.c.taken_at) / 3600).label('avg_hours')
+        ).join(tasks, User.id == tasks.c.assigned_to_id).where(
+            tasks.c.status == 'Готово'
+        ).group_by(User.name)).all()
         
         return [
             {
@@ -128,21 +160,21 @@ class AnalyticsService:
             for stat in stats
         ]
     
-    def _get_daily_trends(self):
+    def _get_daily_trends(self, tasks):
         """Тренды по дням за последние 30 дней"""
         trends = []
         for i in range(30):
             date = datetime.utcnow().date() - timedelta(days=i)
             
             # Задачи, созданные в этот день
-            created_count = Task.query.filter(
-                func.date(Task.created_at) == date
-            ).count()
+            created_count = db.session.execute(select(func.count()).select_from(tasks).where(
+                func.date(tasks.c.created_at) == date
+            )).scalar()
             
             # Задачи, завершенные в этот день
-            completed_count = Task.query.filter(
-                func.date(Task.completed_at) == date
-            ).count()
+            completed_count = db.session.execute(select(func.count()).select_from(tasks).where(
+                func.date(tasks.c.completed_at) == date
+            )).scalar()
             
             trends.append({
                 'date': date.strftime('%Y-%m-%d'),
@@ -152,6 +184,126 @@ class AnalyticsService:
         
         return list(reversed(trends))
     
+    def get_status_statistics(self, days=30, include_archived=False):
+        """Время в статусах и сроки реакции за период по журналу смен статусов
+        
+        Считается оконными функциями по task_status_events с фильтром по
+        времени события, поэтому объем работы зависит от событий за период,
+        а не от размера журнала и таблицы задач. Журнал общий для задач в
+        tasks и tasks_archive; include_archived влияет на сроки по
+        приоритетам, где нужны приоритет и текущий статус задачи.
+        """
+        since = datetime.utcnow() - timedelta(days=days)
+        return {
+            'period_days': days,
+            'include_archived': include_archived,
+            'time_in_status': self._get_time_in_status(since),
+            'sla': self._get_sla_statistics(since, self._tasks(include_archived))
+        }
+    
+    def _seconds_between(self, start, end):
+        """Выражение: секунды между двумя отметками времени"""
+        if self.db.session.get_bind().dialect.name == 'postgresql':
+            return func.extract('epoch', end - start)
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    
+    def _get_time_in_status(self, since):
+        """Время пребывания в каждом статусе (интервалы, начатые за период)"""
+        events = TaskStatusEvent.__table__
+        # Задачи с событиями за период - по индексу (status, at): условие по
+        # всем статусам нужно, иначе фильтр только по at просматривает весь
+        # журнал. Их история читается по (task_id, at) уже упорядоченной
+        touched = select(events.c.task_id).where(
+            events.c.status.in_([label for _, label in events.c.status.type.labels]),
+            events.c.at >= since
+        )
+        # Следующее событие той же задачи - в пределах периода, так что
+        # фильтр по at не обрезает интервалы
+        intervals = select(
+            events.c.status,
+            events.c.at,
+            func.lead(events.c.at).over(
+                partition_by=events.c.task_id, order_by=(events.c.at, events.c.id)
+            ).label('next_at')
+        ).where(
+            events.c.task_id.in_(touched),
+            events.c.at >= since
+        ).subquery()
+        seconds = self._seconds_between(intervals.c.at, intervals.c.next_at)
+        
+        stats = self.db.session.execute(select(
+            intervals.c.status,
+            func.count().label('entered'),
+            # Незавершенные интервалы (задача все еще в статусе) в среднее не входят
+            (func.count() - func.count(intervals.c.next_at)).label('current'),
+            func.avg(seconds).label('avg_seconds'),
+            func.max(seconds).label('max_seconds')
+        ).group_by(intervals.c.status).order_by(intervals.c.status)).all()
+        
+        return [
+            {
+                'status': stat.status,
+                'entered': stat.entered,
+                'current': stat.current,
+                'avg_hours': round(stat.avg_seconds / 3600, 2) if stat.avg_seconds else 0,
+                'max_hours': round(stat.max_seconds / 3600, 2) if stat.max_seconds else 0
+            }
+            for stat in stats
+        ]
+    
+    def _get_sla_statistics(self, since, tasks):
+        """Сроки реакции и решения по приоритетам для задач, созданных за период
+        
+        Реакция - от создания до первого ухода из "Неразобранная", решение -
+        до последнего перехода в "Готово" (только для задач, которые сейчас
+        в "Готово"). Повторное открытие - переход из "Готово" в другой статус.
+        """
+        events = TaskStatusEvent.__table__
+        created = select(events.c.task_id).where(
+            events.c.status == 'Неразобранная',
+            events.c.at >= since
+        )
+        history = select(
+            events.c.task_id,
+            events.c.status,
+            events.c.at,
+            func.lag(events.c.status, type_=events.c.status.type).over(
+                partition_by=events.c.task_id, order_by=(events.c.at, events.c.id)
+            ).label('previous_status')
+        ).where(events.c.task_id.in_(created)).subquery()
+        
+        per_task = select(
+            history.c.task_id,
+            func.min(history.c.at).label('created_at'),
+            func.min(case((history.c.status != 'Неразобранная', history.c.at))).label('responded_at'),
+            func.max(case((history.c.status == 'Готово', history.c.at))).label('resolved_at'),
+            func.sum(case((history.c.previous_status == 'Готово', 1), else_=0)).label('reopened')
+        ).group_by(history.c.task_id).subquery()
+        
+        response = self._seconds_between(per_task.c.created_at, per_task.c.responded_at)
+        resolution = self._seconds_between(per_task.c.created_at, per_task.c.resolved_at)
+        stats = self.db.session.execute(select(
+            tasks.c.priority,
+            func.count().label('total'),
+            func.avg(response).label('avg_response_seconds'),
+            func.avg(case((tasks.c.status == 'Готово', resolution))).label('avg_resolution_seconds'),
+            func.sum(case((tasks.c.status == 'Готово', 1), else_=0)).label('resolved'),
+            func.sum(case((per_task.c.reopened > 0, 1), else_=0)).label('reopened')
+        ).select_from(tasks).join(per_task, tasks.c.id == per_task.c.task_id).group_by(
+            tasks.c.priority).order_by(tasks.c.priority)).all()
+        
+        return [
+            {
+                'priority': stat.priority,
+                'total': stat.total,
+                'resolved': stat.resolved or 0,
+                'reopened': stat.reopened or 0,
+                'avg_response_minutes': round(stat.avg_response_seconds / 60, 1) if stat.avg_response_seconds else 0,
+                'avg_resolution_hours': round(stat.avg_resolution_seconds / 3600, 2) if stat.avg_resolution_seconds else 0
+            }
+            for stat in stats
+        ]
+    
     def get_user_performance(self, user_id, days=30):
         """Детальная статистика по конкретному пользователю"""
         start_date = datetime.utcnow() - timedelta(days=days)
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, text
+from models.task import Task, TaskArchive, TaskTombstone, db
+
+# Статусы завершенных задач, которые переносятся в архив
+FINISHED_STATUSES = ('Готово', 'Отменено')
+
+
+class ArchiveService:
+    """Перенос завершенных задач в архивную таблицу tasks_archive
+
+    Задачи в статусах "Готово" и "Отменено", завершенные раньше чем
+    auto_archive_days дней назад, переносятся пачками: INSERT ... SELECT в
+    архив и DELETE из tasks в одной транзакции на пачку. Строки берутся с
+    FOR UPDATE SKIP LOCKED, поэтому архиваторы нескольких воркеров не
+    мешают друг другу. В PostgreSQL архив разделен на месячные секции по
+    closed_at; недостающие секции создаются перед вставкой пачки.
+    История статусов и вложения остаются на месте: они ссылаются на id
+    задачи, который в архиве не меняется. Для синхронизации клиентов
+    пишется отметка TaskTombstone с reason='archived'.
+    """
+
+    def __init__(self, settings_service, batch_size=500):
+        self.db = db
+        self.settings_service = settings_service
+        self.batch_size = batch_size
+
+    def archive_days(self):
+        """Срок из настройки auto_archive_days; 0 - архивирование выключено"""
+        try:
+            return max(int(self.settings_service.get_setting('auto_archive_days', '30')), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def archive_due(self, now=None):
+        """Перенос задач, срок которых истек; возвращает количество"""
+        days = self.archive_days()
+        if not days:
+            return 0
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=days)
+
+        archived = 0
+        while True:
+            count = self._archive_batch(cutoff, now)
+            archived += count
+            if count < self.batch_size:
+                break
+        if archived:
+            print(f"Перенесено в архив задач: {archived}")
+        return archived
+
+    def _archive_batch(self, cutoff, now):
+        tasks = Task.__table__
+        closed_at = func.coalesce(tasks.c.completed_at, tasks.c.updated_at, tasks.c.created_at)
+        try:
+            # Отмененные задачи без completed_at - по времени последнего изменения
+            rows = self.db.session.execute(
+                select(tasks.c.id, closed_at.label('closed_at')).where(
+                    tasks.c.status.in_(FINISHED_STATUSES),
+                    or_(tasks.c.completed_at < cutoff,
+                        and_(tasks.c.completed_at.is_(None), tasks.c.updated_at < cutoff))
+                ).limit(self.batch_size).with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                self.db.session.rollback()
+                return 0
+
+            self._ensure_partitions(row.closed_at for row in rows)
+            ids = [row.id for row in rows]
+            columns = [column.name for column in tasks.columns]
+            self.db.session.execute(insert(TaskArchive.__table__).from_select(
+                columns + ['closed_at', 'archived_at'],
+                select(*tasks.columns, closed_at, literal(now, db.DateTime)).where(tasks.c.id.in_(ids))
+            ))
+            # Клиенты синхронизации (get_changes_since) получают изменение
+            # 'archive' в той же транзакции, что и перенос
+            self.db.session.execute(insert(TaskTombstone.__table__).from_select(
+                ['task_id', 'task_number', 'requester_email', 'deleted_at', 'reason'],
+                select(tasks.c.id, tasks.c.task_number, tasks.c.requester_email,
+                       literal(now, db.DateTime), literal('archived')).where(tasks.c.id.in_(ids))
+            ))
+            self.db.session.execute(delete(tasks).where(tasks.c.id.in_(ids)))
+            self.db.session.commit()
+            return len(ids)
+        except Exception:
+            self.db.session.rollback()
+            raise
+
+    def _ensure_partitions(self, moments):
+        """Месячные секции архива для переданных closed_at (только PostgreSQL)
+
+        Секция создается в транзакции пачки: при откате пачки пропадает и
+        она, и следующий запуск создаст ее снова.
+        """
+        if self.db.session.get_bind().dialect.name != 'postgresql':
+            return
+        for year, month in sorted({(moment.year, moment.month) for moment in moments}):
+            name = f"tasks_archive_{year:04d}_{month:02d}"
+            if self.db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar():
+                continue
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+            self.db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tasks_archive "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            ))
@@ -0,0 +1,173 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+from datetime import datetime
+from models.database import db
+from models.attachment import Attachment, INLINE_IMAGE_TYPES
+
+# Сигнатуры (magic bytes) типов, которые определяются по содержимому
+MAGIC_TYPES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+)
+
+
+def sniff_content_type(head):
+    """Тип содержимого по первым байтам файла или None"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in MAGIC_TYPES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+class AttachmentTooLarge(ValueError):
+    """Файл больше max_file_size из настроек системы"""
+
+    def __init__(self, limit):
+        super().__init__(f"Файл больше допустимого размера ({limit // (1024 * 1024)} МБ)")
+        self.limit = limit
+
+
+class StoredBlob:
+    """Содержимое, уже записанное в хранилище: ключ, размер и тип,
+    определенный по первым байтам (None, если не распознан)"""
+
+    def __init__(self, sha256, size, deduplicated, content_type=None):
+        self.sha256 = sha256
+        self.size = size
+        self.deduplicated = deduplicated
+        self.content_type = content_type
+
+
+class AttachmentService:
+    """Вложения задач: потоковая загрузка и дедупликация по sha256
+
+    Тело загрузки копируется во временный файл кусками по chunk_size
+    байт с подсчетом хеша и размера, без чтения файла в память целиком.
+    Превышение max_file_size прерывает копирование сразу. Готовый файл
+    переносится в хранилище под ключом из sha256; если такое содержимое
+    уже есть, временный файл просто удаляется.
+    """
+
+    def __init__(self, storage, settings_service, chunk_size=64 * 1024, default_max_size=10 * 1024 * 1024):
+        self.db = db
+        self.storage = storage
+        self.settings_service = settings_service
+        self.chunk_size = chunk_size
+        self.default_max_size = default_max_size
+
+    def max_file_size(self):
+        """Лимит размера файла из настроек системы (max_file_size)"""
+        value = self.settings_service.get_setting('max_file_size')
+        try:
+            return int(value) if value else self.default_max_size
+        except ValueError:
+            return self.default_max_size
+
+    def store(self, stream, content_length=None, max_size=None):
+        """Потоковая запись содержимого в хранилище"""
+        limit = max_size or self.max_file_size()
+        if content_length is not None and content_length > limit:
+            raise AttachmentTooLarge(limit)
+
+        digest = hashlib.sha256()
+        size = 0
+        head = b''
+        fd, temp_path = tempfile.mkstemp(prefix='upload-', dir=self.storage.temp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if len(head) < 16:
+                        head += chunk[:16 - len(head)]
+                    size += len(chunk)
+                    if size > limit:
+                        raise AttachmentTooLarge(limit)
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            if size == 0:
+                raise ValueError("Файл пустой")
+
+            sha256 = digest.hexdigest()
+            content_type = sniff_content_type(head)
+            key = Attachment.key_for(sha256)
+            if self.storage.exists(key):
+                os.remove(temp_path)
+                return StoredBlob(sha256, size, deduplicated=True, content_type=content_type)
+            self.storage.put_file(temp_path, key)
+            return StoredBlob(sha256, size, deduplicated=False, content_type=content_type)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def attach(self, task, blob, filename, content_type=None, user_id=None, screenshot_url=None):
+        """Запись о вложении задачи; screenshot_url заполняется, если он пуст
+
+        Тип, присланный браузером, не проверяется, поэтому для типов,
+        отдаваемых inline, берется только тип, найденный по содержимому.
+        """
+        filename = os.path.basename((filename or '').replace('\\', '/')).strip() or blob.sha256[:12]
+        if blob.content_type:
+            content_type = blob.content_type
+        else:
+            if not content_type or content_type == 'application/octet-stream':
+                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            if content_type in INLINE_IMAGE_TYPES:
+                content_type = 'application/octet-stream'
+
+        attachment = Attachment(
+            task_id=task.id if task else None,
+            sha256=blob.sha256,
+            size=blob.size,
+            filename=filename[:255],
+            content_type=content_type[:100],
+            uploaded_by_id=user_id
+        )
+        self.db.session.add(attachment)
+        self.db.session.flush()
+        if task is not None:
+            if screenshot_url and not task.screenshot_url:
+                task.screenshot_url = screenshot_url(attachment) if callable(screenshot_url) else screenshot_url
+            # Страница задачи и лента изменений должны увидеть новый файл
+            task.updated_at = datetime.utcnow()
+        self.db.session.commit()
+        return attachment
+
+    def get_attachment(self, attachment_id):
+        return self.db.session.get(Attachment, attachment_id)
+
+    def open(self, attachment):
+        return self.storage.open(attachment.storage_key)
+
+    def delete_attachment(self, attachment, screenshot_url=None):
+        """Удаление вложения; содержимое удаляется, если на него больше нет ссылок"""
+        sha256 = attachment.sha256
+        task = attachment.task
+        if task is not None:
+            if screenshot_url and task.screenshot_url == screenshot_url:
+                task.screenshot_url = None
+            task.updated_at = datetime.utcnow()
+        self.db.session.delete(attachment)
+        self.db.session.commit()
+        return self.delete_unreferenced([sha256])
+
+    def delete_unreferenced(self, hashes):
+        """Удаление содержимого, на которое не осталось вложений; возвращает его хеши"""
+        hashes = set(hashes)
+        if not hashes:
+            return set()
+        referenced = {sha256 for sha256, in self.db.session.query(Attachment.sha256).filter(
+            Attachment.sha256.in_(hashes)).distinct()}
+        for sha256 in hashes - referenced:
+            self.storage.delete(Attachment.key_for(sha256))
+        return hashes - referenced
@@ -0,0 +1,163 @@
+import os
+import shutil
+from urllib.parse import quote
+
+
+class LocalStorage:
+    """Хранилище файлов вложений в локальном каталоге (том ./uploads)
+
+    Ключ - путь относительно корня, файлы адресуются по содержимому
+    (ab/cd/<sha256>), поэтому запись одинаковых файлов не дублируется.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+
+    def temp_dir(self):
+        """Каталог для загрузки: на том же диске, чтобы перенос был атомарным"""
+        return os.path.join(self.root, 'tmp')
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def put_file(self, source_path, key):
+        """Перенос загруженного временного файла под ключ"""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key, filename=None, expires=3600):
+        """Прямой URL файла: у локального хранилища его нет, файл отдает приложение"""
+        return None
+
+
+class S3Storage:
+    """Хранилище вложений в S3-совместимом сервисе (MinIO, Yandex Object Storage)
+
+    client - клиент boto3 или LocalS3Client; используются только
+    head_object, upload_file, get_object, delete_object и
+    generate_presigned_url.
+    """
+
+    def __init__(self, client, bucket, prefix='attachments/', temp_dir=None):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self._temp_dir = temp_dir
+
+    def temp_dir(self):
+        if self._temp_dir:
+            os.makedirs(self._temp_dir, exist_ok=True)
+        return self._temp_dir
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def put_file(self, source_path, key):
+        self.client.upload_file(source_path, self.bucket, self.prefix + key)
+        os.remove(source_path)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def url(self, key, filename=None, expires=3600):
+        """Временная подписанная ссылка: файл скачивается мимо приложения"""
+        params = {'Bucket': self.bucket, 'Key': self.prefix + key}
+        if filename:
+            params['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
+
+
+class LocalObjectNotFound(Exception):
+    """Аналог ClientError 404 из botocore"""
+
+    def __init__(self, key):
+        super().__init__(f"Объект не найден: {key}")
+        self.response = {'Error': {'Code': '404'}}
+
+
+class LocalS3Client:
+    """Замена клиента S3 на локальном диске (разработка и тесты)
+
+    Реализует подмножество API boto3, которое использует S3Storage;
+    бакеты - подкаталоги root. Подписанных ссылок нет, файлы отдает
+    приложение.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split('/'))
+
+    def head_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise LocalObjectNotFound(Key)
+        return {'ContentLength': os.path.getsize(path)}
+
+    def upload_file(self, Filename, Bucket, Key):
+        target = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(Filename, target)
+
+    def get_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise LocalObjectNotFound(Key)
+        return {'Body': open(path, 'rb'), 'ContentLength': os.path.getsize(path)}
+
+    def delete_object(self, Bucket, Key):
+        try:
+            os.remove(self._path(Bucket, Key))
+        except FileNotFoundError:
+            pass
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600):
+        return None
+
+
+def create_storage(config):
+    """Хранилище вложений по ATTACHMENTS_BACKEND: local, s3 или s3-local"""
+    backend = config.get('ATTACHMENTS_BACKEND', 'local')
+    root = config['UPLOAD_FOLDER']
+    if backend == 'local':
+        return LocalStorage(root)
+    temp_dir = os.path.join(os.path.abspath(root), 'tmp')
+    if backend == 's3-local':
+        return S3Storage(LocalS3Client(os.path.join(root, 's3')), config['S3_BUCKET'], temp_dir=temp_dir)
+    if backend == 's3':
+        import boto3
+
+        client = boto3.client(
+            's3',
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            aws_access_key_id=config.get('S3_ACCESS_KEY'),
+            aws_secret_access_key=config.get('S3_SECRET_KEY'),
+            region_name=config.get('S3_REGION')
+        )
+        return S3Storage(client, config['S3_BUCKET'], temp_dir=temp_dir)
+    raise ValueError(f"Неизвестное хранилище вложений: {backend}")
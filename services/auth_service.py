@@ -1,18 +1,28 @@
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import func, or_
 from models.database import db
 from models.user import User
 from services.settings_service import SettingsService
-from services.ldap_service import LDAPService
+from services.password_service import PasswordService
+from utils.session_store import invalidate_user_sessions
 import uuid
 
 class AuthService:
     """Сервис для аутентификации и авторизации пользователей"""
     
-    def __init__(self):
+    def __init__(self, password_service=None, settings_service=None):
         self.db = db
-        self.settings_service = SettingsService()
-        self.ldap_service = LDAPService()
+        self.settings_service = settings_service or SettingsService()
+        self.password_service = password_service or PasswordService()
+        self._ldap_service = None
+    
+    @property
+    def ldap_service(self):
+        """Сервис LDAP создается только при первой попытке входа через LDAP"""
+        if self._ldap_service is None:
+            from services.ldap_service import LDAPService
+            self._ldap_service = LDAPService()
+        return self._ldap_service
     
     def register_user(self, username, email, password, name, department, role='user', telegram_username=None):
         """Регистрация нового пользователя"""
@@ -27,7 +37,7 @@ class AuthService:
         user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=self.password_service.hash_password(password),
             name=name,
             department=department,
             role=role,
@@ -44,7 +54,11 @@ class AuthService:
         # Сначала пробуем локальную аутентификацию
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password_hash, password):
+        if user and user.has_local_password and \
+                self.password_service.check_password(user.password_hash, password):
+            # Перехешируем пароль, если изменились алгоритм или стоимость
+            if self.password_service.needs_rehash(user.password_hash):
+                user.password_hash = self.password_service.hash_password(password)
             user.update_last_login()
             self.db.session.commit()
             return user
@@ -94,14 +108,11 @@ class AuthService:
     def _create_user_from_ldap(self, user_info, ldap_settings):
         """Создание пользователя из информации LDAP"""
         try:
-            # Генерируем случайный пароль для локальной записи
-            import secrets
-            temp_password = secrets.token_urlsafe(16)
-            
+            # У пользователей LDAP нет локального пароля: вход только через каталог
             user = User(
                 username=user_info['username'],
                 email=user_info['email'] or f"{user_info['username']}@company.local",
-                password_hash=generate_password_hash(temp_password),
+                password_hash=None,
                 name=user_info['cn'] or user_info['username'],
                 department=user_info['department'] or 'Не указан',
                 role=ldap_settings['ldap_default_role'],
@@ -153,6 +164,7 @@ class AuthService:
         
         user.role = new_role
         self.db.session.commit()
+        invalidate_user_sessions(user.id)
         
         return user
     
@@ -192,6 +204,8 @@ class AuthService:
             user.telegram_username = telegram_username
         
         self.db.session.commit()
+        if role is not None:
+            invalidate_user_sessions(user.id)
         return user
     
     def deactivate_user(self, user_id):
@@ -202,6 +216,8 @@ class AuthService:
         
         user.is_active = False
         self.db.session.commit()
+        # Отзываем все сессии пользователя немедленно
+        invalidate_user_sessions(user.id)
         
         return user
     
@@ -209,6 +225,35 @@ class AuthService:
         """Получение всех пользователей (только для администраторов)"""
         return User.query.filter_by(is_active=True).all()
     
+    def search_users(self, search=None, role=None, department=None, status='active', page=1, per_page=50):
+        """Постраничный поиск пользователей по имени, ФИО, email и отделу"""
+        query = User.query
+        
+        if status == 'active':
+            query = query.filter(User.is_active.is_(True))
+        elif status == 'inactive':
+            query = query.filter(User.is_active.is_(False))
+        
+        if role:
+            query = query.filter(User.role == role)
+        if department:
+            query = query.filter(User.department == department)
+        
+        if search and search.strip():
+            # Поиск подстроки без учета регистра (на PostgreSQL - через триграммные индексы)
+            term = search.strip().lower()
+            term = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f'%{term}%'
+            query = query.filter(or_(
+                func.lower(User.username).like(pattern, escape='\\'),
+                func.lower(User.name).like(pattern, escape='\\'),
+                func.lower(User.email).like(pattern, escape='\\'),
+                func.lower(User.department).like(pattern, escape='\\')
+            ))
+        
+        per_page = min(max(per_page, 1), 200)
+        return query.order_by(User.name, User.id).paginate(page=page, per_page=per_page, error_out=False)
+    
     def get_users_by_role(self, role):
         """Получение пользователей по роли"""
         return User.query.filter_by(role=role, is_active=True).all()
@@ -223,7 +268,7 @@ class AuthService:
         admin = User(
             username='admin',
             email='admin@company.com',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=self.password_service.hash_password('admin123'),
             name='Администратор Системы',
             department='IT',
             role='admin'
@@ -233,7 +278,7 @@ class AuthService:
         it_staff = User(
             username='it_staff',
             email='it@company.com',
-            password_hash=generate_password_hash('it123'),
+            password_hash=self.password_service.hash_password('it123'),
             name='IT Сотрудник',
             department='IT',
             role='it_staff'
@@ -243,7 +288,7 @@ class AuthService:
         user = User(
             username='user',
             email='user@company.com',
-            password_hash=generate_password_hash('user123'),
+            password_hash=self.password_service.hash_password('user123'),
             name='Обычный Пользователь',
             department='Продажи',
             role='user'
@@ -0,0 +1,390 @@
+import gzip
+import hashlib
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from sqlalchemy import create_engine, func, inspect, select, table
+from sqlalchemy.engine import make_url
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки между воркерами
+    fcntl = None
+
+BACKUP_PREFIX = 'taskmanager_'
+# Расширения копий: SQLite - снимок базы в gzip, PostgreSQL - pg_dump -Fc
+BACKUP_SUFFIXES = ('.sqlite3.gz', '.pgdump')
+CHUNK_SIZE = 1024 * 1024
+
+
+def _lower_priority():
+    """Инициализатор процесса копирования: минимальный приоритет процессора
+    и класс ввода-вывода idle (наследуются запущенным pg_dump)"""
+    try:
+        os.nice(19)
+    except (AttributeError, OSError):
+        pass
+    if shutil.which('ionice'):
+        subprocess.run(['ionice', '-c', '3', '-p', str(os.getpid())],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class _Throttle:
+    """Ограничение скорости записи копии (байт в секунду, 0 - без ограничения)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.total = 0
+
+    def __call__(self, size):
+        self.total += size
+        if self.rate:
+            delay = self.total / self.rate - (time.monotonic() - self.started)
+            if delay > 0:
+                time.sleep(delay)
+
+
+def _pg_command(program, url):
+    """Аргументы и окружение для pg_dump/pg_restore: пароль передается через
+    PGPASSWORD, а не в командной строке"""
+    url = make_url(url)
+    args = [program]
+    if url.host:
+        args += ['-h', url.host]
+    if url.port:
+        args += ['-p', str(url.port)]
+    if url.username:
+        args += ['-U', url.username]
+    env = dict(os.environ)
+    if url.password:
+        env['PGPASSWORD'] = url.password
+    return args, url.database, env
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dump_database(url, target_path, rate=0):
+    """Согласованная копия базы url в target_path (выполняется в процессе пула)
+
+    SQLite: снимок через online backup API в одной транзакции чтения, затем
+    сжатие gzip. PostgreSQL: поток pg_dump в формате custom (сжатый, снимок
+    одной транзакции). Запись ограничена по скорости rate; ограничение
+    потока pg_dump притормаживает и чтение на стороне сервера.
+    Возвращает sha256 записанного файла.
+    """
+    throttle = _Throttle(rate)
+    digest = hashlib.sha256()
+    temp_path = f"{target_path}.tmp"
+    dialect = make_url(url).get_backend_name()
+    try:
+        with open(temp_path, 'wb') as target:
+            def write(chunk):
+                digest.update(chunk)
+                target.write(chunk)
+                throttle(len(chunk))
+
+            if dialect == 'sqlite':
+                _dump_sqlite(make_url(url).database, target, write)
+            elif dialect == 'postgresql':
+                _dump_postgresql(url, write)
+            else:
+                raise ValueError(f"Резервное копирование {dialect} не поддерживается")
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return digest.hexdigest()
+
+
+def _dump_sqlite(database, target, write):
+    snapshot_path = f"{target.name}.snapshot"
+    source = sqlite3.connect(f"file:{quote(os.path.abspath(database))}?mode=ro", uri=True,
+                             timeout=60, isolation_level=None)
+    try:
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            # Блокировка чтения берется с ожиданием (backup() при занятой базе
+            # повторяет попытки с паузой и может долго не пробиться сквозь
+            # частые записи), копия снимается в этой же транзакции за один
+            # шаг: по шагам копирование начиналось бы заново после записи
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            source.backup(snapshot)
+            source.execute('COMMIT')
+        finally:
+            snapshot.close()
+    finally:
+        source.close()
+
+    class _Writer:
+        def write(self, data):
+            write(bytes(data))
+            return len(data)
+
+        def flush(self):
+            pass
+
+    try:
+        with open(snapshot_path, 'rb') as snapshot, \
+                gzip.GzipFile(filename='', mode='wb', fileobj=_Writer(), mtime=0) as compressed:
+            for chunk in iter(lambda: snapshot.read(CHUNK_SIZE), b''):
+                compressed.write(chunk)
+    finally:
+        os.remove(snapshot_path)
+
+
+def _dump_postgresql(url, write):
+    args, database, env = _pg_command('pg_dump', url)
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(args + ['--format=custom', '--compress=6', database],
+                                   stdout=subprocess.PIPE, stderr=errors, env=env)
+        try:
+            for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b''):
+                write(chunk)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode:
+            errors.seek(0)
+            message = errors.read().decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"pg_dump завершился с кодом {returncode}: {message}")
+
+
+class BackupService:
+    """Резервное копирование базы по настройкам backup_enabled и
+    backup_interval_hours
+
+    Копия снимается в отдельном процессе с минимальным приоритетом
+    процессора и ввода-вывода и пишется с ограничением скорости, чтобы не
+    замедлять обработку запросов. Рядом с каждой копией лежит файл .sha256
+    (формат sha256sum), копия без него считается незавершенной. Хранятся
+    keep последних копий. Воркеры приложения согласуют запуск блокировкой
+    файла в каталоге копий.
+    """
+
+    def __init__(self, settings_service, folder, database_url, keep=7, rate=0):
+        self.settings_service = settings_service
+        self.folder = os.path.abspath(folder)
+        self.database_url = database_url
+        self.keep = keep
+        self.rate = rate
+
+    @classmethod
+    def from_config(cls, settings_service, database_url, config):
+        """Создание сервиса из конфигурации Flask приложения"""
+        return cls(
+            settings_service,
+            config.get('BACKUP_FOLDER', 'backups'),
+            database_url,
+            keep=config.get('BACKUP_KEEP', 7),
+            rate=config.get('BACKUP_MAX_RATE', 0)
+        )
+
+    def enabled(self):
+        return self.settings_service.get_setting('backup_enabled', 'true') == 'true'
+
+    def interval(self):
+        """Интервал из настройки backup_interval_hours (не меньше часа)"""
+        try:
+            hours = int(self.settings_service.get_setting('backup_interval_hours', '24'))
+        except (TypeError, ValueError):
+            hours = 24
+        return timedelta(hours=max(hours, 1))
+
+    def list_backups(self):
+        """Завершенные копии, новые первыми"""
+        if not os.path.isdir(self.folder):
+            return []
+        backups = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if (name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIXES)
+                    and os.path.isfile(f"{path}.sha256")):
+                backups.append({
+                    'name': name,
+                    'path': path,
+                    'size': os.path.getsize(path),
+                    'created_at': datetime.utcfromtimestamp(os.path.getmtime(path))
+                })
+        return sorted(backups, key=lambda backup: backup['name'], reverse=True)
+
+    def is_due(self, now=None):
+        backups = self.list_backups()
+        if not backups:
+            return True
+        return backups[0]['created_at'] + self.interval() <= (now or datetime.utcnow())
+
+    def backup_due(self):
+        """Фоновое задание: копия, если включено и интервал истек"""
+        if not self.enabled() or not self.is_due():
+            return None
+        return self.create_backup(only_if_due=True)
+
+    def create_backup(self, only_if_due=False):
+        """Новая копия базы и удаление старых; возвращает описание копии
+        или None, если копию уже снимает другой процесс"""
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, '.lock'), 'w') as lock:
+            if fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+            # Другой воркер мог закончить копию, пока ждали блокировку
+            if only_if_due and not self.is_due():
+                return None
+
+            url = make_url(self.database_url)
+            if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+                raise ValueError("Резервное копирование базы в памяти не поддерживается")
+            suffix = '.pgdump' if url.get_backend_name() == 'postgresql' else '.sqlite3.gz'
+            name = f"{BACKUP_PREFIX}{datetime.utcnow():%Y%m%d_%H%M%S}{suffix}"
+            path = os.path.join(self.folder, name)
+
+            started = time.monotonic()
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_lower_priority) as executor:
+                sha256 = executor.submit(dump_database, self.database_url, path, self.rate).result()
+            with open(f"{path}.sha256", 'w') as checksum:
+                checksum.write(f"{sha256}  {name}\n")
+
+            self._rotate()
+            size = os.path.getsize(path)
+            print(f"Резервная копия {name}: {size} байт за {time.monotonic() - started:.1f} с")
+            return {'name': name, 'path': path, 'size': size, 'sha256': sha256}
+
+    def _rotate(self):
+        for backup in self.list_backups()[self.keep:]:
+            for path in (backup['path'], f"{backup['path']}.sha256"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def verify(self, path):
+        """Проверка копии: контрольная сумма и читаемость содержимого
+
+        SQLite - распаковка и PRAGMA integrity_check, PostgreSQL - чтение
+        оглавления pg_restore --list. Возвращает словарь с полем ok.
+        """
+        report = {'path': path, 'ok': False, 'checksum_ok': False}
+        try:
+            with open(f"{path}.sha256") as checksum:
+                expected = checksum.read().split()[0]
+        except (FileNotFoundError, IndexError):
+            report['message'] = "Нет файла контрольной суммы .sha256"
+            return report
+        report['checksum_ok'] = _sha256_file(path) == expected
+        if not report['checksum_ok']:
+            report['message'] = "Контрольная сумма не совпадает"
+            return report
+
+        try:
+            if path.endswith('.sqlite3.gz'):
+                with tempfile.TemporaryDirectory() as workdir:
+                    database = self._unpack_sqlite(path, workdir)
+                    report['tables'] = self._check_sqlite(database)
+            else:
+                result = subprocess.run(['pg_restore', '--list', path], capture_output=True, text=True)
+                if result.returncode:
+                    raise RuntimeError(result.stderr.strip())
+                # Строки оглавления: "...; 0 16390 TABLE DATA public tasks owner"
+                report['tables'] = {line.split(' TABLE DATA ')[1].split()[1]: None
+                                    for line in result.stdout.splitlines() if ' TABLE DATA ' in line}
+        except (OSError, EOFError, RuntimeError, sqlite3.Error) as e:
+            report['message'] = f"Копия повреждена: {e}"
+            return report
+
+        report['ok'] = True
+        report['message'] = "Копия в порядке"
+        return report
+
+    def restore(self, path, target_url=None):
+        """Восстановление базы target_url (по умолчанию рабочей) из копии
+
+        Копия сначала проверяется, при ошибке восстановление не начинается.
+        Приложение на время восстановления должно быть остановлено.
+        """
+        report = self.verify(path)
+        if not report['ok']:
+            raise ValueError(report['message'])
+        target_url = target_url or self.database_url
+        url = make_url(target_url)
+
+        if path.endswith('.sqlite3.gz'):
+            if url.get_backend_name() != 'sqlite':
+                raise ValueError("Копия SQLite восстанавливается только в SQLite")
+            database = os.path.abspath(url.database)
+            workdir = os.path.dirname(database)
+            os.makedirs(workdir, exist_ok=True)
+            restored = self._unpack_sqlite(path, workdir)
+            os.replace(restored, database)
+            # Журнал старой базы не должен примениться к восстановленной
+            for leftover in (f"{database}-wal", f"{database}-shm", f"{database}-journal"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            return self._check_sqlite(database)
+
+        if url.get_backend_name() != 'postgresql':
+            raise ValueError("Копия PostgreSQL восстанавливается только в PostgreSQL")
+        args, database, env = _pg_command('pg_restore', target_url)
+        result = subprocess.run(args + ['--clean', '--if-exists', '--no-owner', '--single-transaction',
+                                        '-d', database, path], env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise RuntimeError(f"pg_restore завершился с кодом {result.returncode}: {result.stderr.strip()}")
+        return self._count_rows(target_url, report['tables'])
+
+    def _unpack_sqlite(self, path, workdir):
+        """Распаковка копии во временный файл каталога workdir (gzip
+        проверяет CRC содержимого)"""
+        handle, database = tempfile.mkstemp(suffix='.restore', dir=workdir)
+        try:
+            with os.fdopen(handle, 'wb') as target, gzip.open(path, 'rb') as source:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+        except BaseException:
+            os.remove(database)
+            raise
+        return database
+
+    def _check_sqlite(self, database):
+        """PRAGMA integrity_check и число строк по таблицам"""
+        connection = sqlite3.connect(database)
+        try:
+            result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+            if result != 'ok':
+                raise RuntimeError(f"integrity_check: {result}")
+            tables = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+            return {table: connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                    for table in tables}
+        finally:
+            connection.close()
+
+    def _count_rows(self, url, tables):
+        """Число строк в восстановленных таблицах PostgreSQL"""
+        engine = create_engine(url)
+        try:
+            with engine.connect() as connection:
+                existing = set(inspect(connection).get_table_names())
+                return {name: connection.execute(select(func.count()).select_from(table(name))).scalar()
+                        for name in tables if name in existing}
+        finally:
+            engine.dispose()
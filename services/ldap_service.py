@@ -1,11 +1,11 @@
-import ldap3
-from ldap3 import Server, Connection, ALL, NTLM, SIMPLE, ANONYMOUS
-from ldap3.core.exceptions import LDAPException
 import logging
 from typing import Optional, Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+# ldap3 импортируется внутри методов: библиотека нужна только при включенной
+# интеграции с LDAP и не должна замедлять запуск приложения
+
 class LDAPService:
     """Сервис для интеграции с LDAP/Active Directory"""
     
@@ -16,6 +16,9 @@ class LDAPService:
     def test_connection(self, server_url: str, port: int, use_ssl: bool, 
                        bind_dn: str, bind_password: str, auth_method: str = 'SIMPLE') -> Dict:
         """Тестирование подключения к LDAP серверу"""
+        from ldap3 import Server, Connection, ALL, NTLM, SIMPLE, ANONYMOUS
+        from ldap3.core.exceptions import LDAPException
+        
         try:
             # Создание сервера
             self.server = Server(server_url, port=port, use_ssl=use_ssl, get_info=ALL)
@@ -71,6 +74,9 @@ class LDAPService:
                          user_search_base: str, user_search_filter: str,
                          auth_method: str = 'SIMPLE') -> Dict:
         """Аутентификация пользователя через LDAP"""
+        from ldap3 import Server, Connection, ALL, NTLM, SIMPLE, ANONYMOUS
+        from ldap3.core.exceptions import LDAPException
+        
         try:
             # Подключение к серверу
             self.server = Server(server_url, port=port, use_ssl=use_ssl, get_info=ALL)
@@ -171,6 +177,9 @@ class LDAPService:
                     bind_dn: str, bind_password: str, user_search_base: str,
                     auth_method: str = 'SIMPLE') -> Dict:
         """Поиск пользователей в LDAP"""
+        from ldap3 import Server, Connection, ALL, NTLM, SIMPLE, ANONYMOUS
+        from ldap3.core.exceptions import LDAPException
+        
         try:
             # Подключение к серверу
             self.server = Server(server_url, port=port, use_ssl=use_ssl, get_info=ALL)
@@ -244,6 +253,8 @@ class LDAPService:
     
     def get_server_info(self, server_url: str, port: int, use_ssl: bool) -> Dict:
         """Получение информации о LDAP сервере"""
+        from ldap3 import Server, ALL
+        
         try:
             self.server = Server(server_url, port=port, use_ssl=use_ssl, get_info=ALL)
             
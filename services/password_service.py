@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordServiceBusy(RuntimeError):
+    """Пул хеширования переполнен: запрос не дождался свободного слота"""
+
+
+class PasswordService:
+    """Сервис хеширования и проверки паролей в ограниченном пуле потоков
+
+    Хеширование (pbkdf2/scrypt) намеренно дорогое, поэтому одновременно
+    выполняется не более ``max_workers`` операций, а в очереди ожидает не более
+    ``max_pending``. Лишние запросы получают ``PasswordServiceBusy`` вместо того,
+    чтобы занимать все воркеры приложения во время волны входов.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', salt_length=16,
+                 max_workers=2, max_pending=32, wait_timeout=5.0,
+                 thread_name_prefix='password-hash'):
+        self.method = method
+        self.salt_length = salt_length
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    @classmethod
+    def from_config(cls, config):
+        """Создание сервиса из конфигурации Flask приложения"""
+        return cls(
+            method=config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+            salt_length=config.get('PASSWORD_HASH_SALT_LENGTH', 16),
+            max_workers=config.get('PASSWORD_HASH_WORKERS', 2),
+            max_pending=config.get('PASSWORD_HASH_QUEUE_SIZE', 32),
+            wait_timeout=config.get('PASSWORD_HASH_TIMEOUT', 5.0)
+        )
+
+    @classmethod
+    def for_import(cls, config):
+        """Отдельный пул для массового импорта пользователей
+
+        Импорт не занимает слоты пула входа: его пакет ждет свободного слота
+        своего пула без таймаута, поэтому hash_many идет со скоростью
+        ``PASSWORD_IMPORT_WORKERS`` потоков, а входы не получают
+        ``PasswordServiceBusy`` из-за импорта.
+        """
+        return cls(
+            method=config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+            salt_length=config.get('PASSWORD_HASH_SALT_LENGTH', 16),
+            max_workers=config.get('PASSWORD_IMPORT_WORKERS', 2),
+            max_pending=config.get('PASSWORD_IMPORT_QUEUE_SIZE', 2),
+            wait_timeout=None,
+            thread_name_prefix='password-import'
+        )
+
+    def hash_password(self, password):
+        """Хеширование пароля с настроенным алгоритмом и стоимостью"""
+        return self._run(generate_password_hash, password,
+                         method=self.method, salt_length=self.salt_length)
+
+    def hash_many(self, passwords):
+        """Параллельное хеширование списка паролей (None остается None)"""
+        futures = [
+            self._submit(generate_password_hash, password,
+                         method=self.method, salt_length=self.salt_length)
+            if password else None
+            for password in passwords
+        ]
+        return [future.result() if future else None for future in futures]
+
+    def check_password(self, password_hash, password):
+        """Проверка пароля; учетные записи без локального пароля не проходят"""
+        if not password_hash or not password:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Проверка, создан ли хеш с устаревшим алгоритмом или стоимостью"""
+        if not password_hash or '$' not in password_hash:
+            return False
+        hash_method = password_hash.split('$', 1)[0]
+        return hash_method != self.method and not hash_method.startswith(self.method + ':')
+
+    def shutdown(self):
+        """Остановка пула потоков"""
+        self._executor.shutdown(wait=False)
+
+    def _run(self, fn, *args, **kwargs):
+        return self._submit(fn, *args, **kwargs).result()
+
+    def _submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordServiceBusy("Сервер перегружен запросами входа, попробуйте позже")
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
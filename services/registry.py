@@ -0,0 +1,70 @@
+import importlib
+import threading
+
+
+class ServiceRegistry:
+    """Реестр сервисов приложения с ленивым созданием
+
+    Сервис (и модуль, в котором он объявлен) создается при первом обращении,
+    поэтому запуск воркера не платит за импорт и инициализацию интеграций,
+    которые в данной установке не используются.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory, shared=True):
+        """Регистрация фабрики сервиса
+
+        factory - вызываемый объект или строка вида 'модуль:Класс'.
+        shared=False - новый экземпляр при каждом обращении (для сервисов
+        с состоянием на время одного вызова).
+        """
+        self._factories[name] = (factory, shared)
+
+    def get(self, name):
+        """Получение экземпляра сервиса (создается при первом обращении)"""
+        factory, shared = self._factories[name]
+        if not shared:
+            return self._build(factory)
+
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._build(factory)
+                    self._instances[name] = instance
+        return instance
+
+    def lazy(self, name):
+        """Прокси, откладывающий создание сервиса до первого обращения"""
+        return LazyService(self, name)
+
+    def is_loaded(self, name):
+        """Проверка, создан ли уже экземпляр сервиса"""
+        return name in self._instances
+
+    def _build(self, factory):
+        if isinstance(factory, str):
+            module_name, class_name = factory.split(':')
+            factory = getattr(importlib.import_module(module_name), class_name)
+        return factory()
+
+
+class LazyService:
+    """Прокси сервиса: первое обращение к атрибуту создает сервис в реестре"""
+
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry, name):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __repr__(self):
+        return f'<LazyService {self._name}>'
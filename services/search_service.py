@@ -0,0 +1,259 @@
+import re
+import threading
+from markupsafe import escape
+from sqlalchemy import bindparam, text
+from models.database import db
+from models.task import Task
+from models.types import GUID
+
+# Маркеры подсветки: БД вставляет их вокруг совпадений, а HTML-разметка
+# добавляется после экранирования текста задачи
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# Столбцы, индексируемые FTS5 (совпадают с именами столбцов tasks)
+FTS_COLUMNS = ('title', 'description', 'completion_comment',
+               'requester_name', 'requester_department', 'requester_email')
+
+# Частые окончания русских слов: в FTS5 нет русского стемминга, поэтому
+# окончание отбрасывается и слово ищется по префиксу (принтеры -> принтер*)
+RUSSIAN_ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией',
+    'ия', 'ие', 'ий', 'ая', 'яя', 'ое', 'ее', 'ые', 'ой', 'ей', 'ом', 'ем',
+    'ов', 'ев', 'ах', 'ях', 'ам', 'ям', 'ую', 'юю', 'ых', 'их',
+    'а', 'я', 'ы', 'и', 'у', 'ю', 'е', 'о', 'ь', 'й'
+], key=len, reverse=True)
+
+# Таблица FTS5 и триггеры для tasks и для архива tasks_archive
+SQLITE_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE {fts} USING fts5("
+    "title, description, completion_comment, requester_name, requester_department, requester_email, "
+    "content='{table}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new}); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old}); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old}); "
+    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new}); END",
+    # Индексация задач, созданных до появления таблицы
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+]
+SQLITE_FTS_TABLES = (('tasks', 'tasks_fts'), ('tasks_archive', 'tasks_archive_fts'))
+
+# Поиск идет по tasks и tasks_archive: ранжируются и ограничиваются
+# объединенные совпадения, подсветка строится только для страницы
+POSTGRES_SEARCH_ARM = """
+    SELECT t.id, t.task_number, t.title, t.status, t.priority, t.task_type,
+           t.requester_name, t.created_at, t.completed_at, t.description, t.completion_comment,
+           ts_rank_cd(t.search_vector, q.query) AS rank, q.query, {archived} AS archived
+    FROM {table} t, websearch_to_tsquery('russian', :query) AS q(query)
+    WHERE t.search_vector @@ q.query {filters}
+"""
+
+POSTGRES_SEARCH_SQL = """
+SELECT ranked.id, ranked.task_number, ranked.title, ranked.status, ranked.priority, ranked.task_type,
+       ranked.requester_name, ranked.created_at, ranked.completed_at, ranked.rank, ranked.archived,
+       ts_headline('russian', ranked.title, ranked.query,
+                   'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', HighlightAll=true') AS title_highlight,
+       ts_headline('russian', coalesce(ranked.description, '') || ' ' || coalesce(ranked.completion_comment, ''),
+                   ranked.query,
+                   'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxFragments=2, MaxWords=20, MinWords=5')
+           AS snippet
+FROM (
+    {hot}
+    UNION ALL
+    {archive}
+    ORDER BY rank DESC, created_at DESC
+    LIMIT :limit OFFSET :offset
+) AS ranked
+ORDER BY ranked.rank DESC, ranked.created_at DESC
+"""
+
+SQLITE_SEARCH_ARM = """
+SELECT t.id, t.task_number, t.title, t.status, t.priority, t.task_type,
+       t.requester_name, t.created_at, t.completed_at,
+       {bm25} AS rank,
+       highlight({fts}, 0, char(2), char(3)) AS title_highlight,
+       snippet({fts}, -1, char(2), char(3), '…', 20) AS snippet,
+       {archived} AS archived
+FROM {fts}
+JOIN {table} t ON t.rowid = {fts}.rowid
+WHERE {fts} MATCH :query {filters}
+"""
+
+SQLITE_SEARCH_SQL = """
+{hot}
+UNION ALL
+{archive}
+ORDER BY rank, created_at DESC
+LIMIT :limit OFFSET :offset
+"""
+
+# Веса столбцов FTS_COLUMNS для bm25
+SQLITE_BM25 = 'bm25({fts}, 10.0, 4.0, 3.0, 2.0, 1.0, 1.0)'
+
+# Есть ли совпадения сверх :candidates (без ранжирования, по порядку rowid)
+SQLITE_OVERFLOW_SQL = """
+SELECT 1 FROM {fts} WHERE {fts} MATCH :query LIMIT 1 OFFSET :candidates
+"""
+
+# Самые релевантные :candidates совпадений: ранжируется только таблица
+# FTS5, соединение с задачами и подсветка - уже для отобранных
+SQLITE_TOP_CANDIDATES = """
+ AND {fts}.rowid IN (SELECT rowid FROM {fts} WHERE {fts} MATCH :query
+                     ORDER BY {bm25} LIMIT :candidates)"""
+
+
+class SearchService:
+    """Полнотекстовый поиск по задачам
+
+    PostgreSQL: столбец tsvector (русская конфигурация) с GIN-индексом,
+    см. database/migration_task_search.sql. SQLite (разработка и тесты):
+    таблица FTS5, которая создается при первом поиске и поддерживается
+    триггерами. Ищется по названию, описанию, комментарию выполнения и
+    данным постановщика; результаты ранжируются и подсвечиваются.
+    Задачи, перенесенные в tasks_archive, тоже находятся (archived=true).
+    """
+
+    def __init__(self, max_candidates=5000):
+        self.db = db
+        # SQLite без фильтров: в выдачу попадают не больше max_candidates
+        # самых релевантных совпадений каждой таблицы, иначе запрос из
+        # частых слов соединяет с задачами и подсвечивает всю таблицу
+        self.max_candidates = max_candidates
+        self._sqlite_ready = False
+        self._lock = threading.Lock()
+
+    def search(self, query, page=1, per_page=20, status=None, requester_email=None):
+        """Страница результатов поиска: (результаты, есть ли следующая,
+        урезана ли выдача до max_candidates лучших совпадений)"""
+        if not query or not query.strip():
+            return [], False, False
+
+        per_page = min(max(per_page, 1), 100)
+        params = {'limit': per_page + 1, 'offset': (max(page, 1) - 1) * per_page}
+
+        filters = ''
+        if status:
+            filters += ' AND t.status = :status'
+            params['status'] = status
+        if requester_email is not None:
+            filters += ' AND t.requester_email = :requester_email'
+            params['requester_email'] = requester_email
+
+        truncated = False
+        dialect = self.db.engine.dialect.name
+        if dialect == 'postgresql':
+            params['query'] = query.strip()
+            sql = POSTGRES_SEARCH_SQL.format(
+                hot=POSTGRES_SEARCH_ARM.format(table='tasks', archived='false', filters=filters),
+                archive=POSTGRES_SEARCH_ARM.format(table='tasks_archive', archived='true', filters=filters))
+        elif dialect == 'sqlite':
+            match = self._fts_match_expression(query)
+            if not match:
+                return [], False, False
+            self._ensure_sqlite_index()
+            params['query'] = match
+            arms = []
+            for (table, fts), archived in zip(SQLITE_FTS_TABLES, (0, 1)):
+                bm25 = SQLITE_BM25.format(fts=fts)
+                arm_filters = filters
+                if not filters:
+                    overflow = self.db.session.execute(text(SQLITE_OVERFLOW_SQL.format(fts=fts)), {
+                        'query': match, 'candidates': self.max_candidates
+                    }).first()
+                    if overflow:
+                        truncated = True
+                        arm_filters = SQLITE_TOP_CANDIDATES.format(fts=fts, bm25=bm25)
+                        params['candidates'] = self.max_candidates
+                arms.append(SQLITE_SEARCH_ARM.format(fts=fts, table=table, archived=archived,
+                                                     bm25=bm25, filters=arm_filters))
+            sql = SQLITE_SEARCH_SQL.format(hot=arms[0], archive=arms[1])
+        else:
+            raise ValueError(f"Полнотекстовый поиск не поддерживается для {dialect}")
+
+        # id и справочные значения хранятся кодами: типы столбцов
+        # преобразуют параметры и результаты в строки
+        statement = text(sql)
+        if status:
+            statement = statement.bindparams(bindparam('status', type_=Task.status.type))
+        columns = Task.__table__.c
+        statement = statement.columns(id=GUID, status=columns.status.type,
+                                      priority=columns.priority.type, task_type=columns.task_type.type)
+        rows = self.db.session.execute(statement, params).mappings().all()
+        results = [self._to_result(row) for row in rows[:per_page]]
+        return results, len(rows) > per_page, truncated
+
+    def _ensure_sqlite_index(self):
+        """Создание таблицы FTS5 и триггеров (один раз на процесс)"""
+        if self._sqlite_ready:
+            return
+        with self._lock:
+            if self._sqlite_ready:
+                return
+            columns = ', '.join(FTS_COLUMNS)
+            new = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+            old = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+            for table, fts in SQLITE_FTS_TABLES:
+                exists = self.db.session.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+                ), {'name': fts}).first()
+                if exists:
+                    continue
+                for statement in SQLITE_FTS_SCHEMA:
+                    self.db.session.execute(text(statement.format(
+                        fts=fts, table=table, columns=columns, new=new, old=old)))
+                self.db.session.commit()
+                print(f"Создан полнотекстовый индекс {table} (FTS5)")
+            self._sqlite_ready = True
+
+    @staticmethod
+    def _fts_match_expression(query):
+        """Запрос пользователя -> выражение MATCH для FTS5
+
+        Слова берутся без синтаксиса FTS5 и ищутся по префиксу без
+        окончания; должны встретиться все слова.
+        """
+        words = re.findall(r'\w+', query.lower())
+        return ' '.join(f'"{SearchService._stem(word)}"*' for word in words[:16])
+
+    @staticmethod
+    def _stem(word):
+        for ending in RUSSIAN_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 4:
+                return word[:-len(ending)]
+        return word
+
+    @staticmethod
+    def _highlight(value):
+        """Экранирование текста с подсветкой совпадений тегом <mark>"""
+        if not value:
+            return ''
+        return str(escape(value)).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+    def _to_result(self, row):
+        return {
+            'id': str(row['id']),
+            'task_number': row['task_number'],
+            'title': row['title'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'task_type': row['task_type'],
+            'requester_name': row['requester_name'],
+            'created_at': self._isoformat(row['created_at']),
+            'completed_at': self._isoformat(row['completed_at']),
+            'rank': round(float(row['rank']), 4),
+            'archived': bool(row['archived']),
+            'title_highlight': self._highlight(row['title_highlight']),
+            'snippet': self._highlight(row['snippet'])
+        }
+
+    @staticmethod
+    def _isoformat(value):
+        # SQLite через text() возвращает даты строками
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return value.replace(' ', 'T', 1)
+        return value.isoformat()
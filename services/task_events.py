@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class MemoryEventBackend:
+    """Кольцевой буфер событий в памяти процесса
+
+    Подходит для одного процесса (разработка, тесты, один воркер с потоками).
+    """
+
+    def __init__(self, size):
+        self._events = deque(maxlen=size)
+        self._last_id = 0
+        self._condition = threading.Condition()
+
+    def publish(self, payload):
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, payload))
+            self._condition.notify_all()
+            return str(self._last_id)
+
+    def last_id(self):
+        return str(self._last_id)
+
+    def read(self, after_id, timeout):
+        """События после after_id; ждет появления новых не дольше timeout секунд
+
+        Возвращает (события, gap); gap=True, если часть событий уже вытеснена
+        из буфера и клиенту нужно полное обновление.
+        """
+        with self._condition:
+            after = self._parse_id(after_id)
+            self._condition.wait_for(lambda: self._last_id > after, timeout)
+
+            events = [(str(event_id), payload) for event_id, payload in self._events
+                      if event_id > after]
+            first_id = self._events[0][0] if self._events else self._last_id + 1
+            return events, first_id > after + 1 and bool(events)
+
+    def _parse_id(self, after_id):
+        try:
+            after = int(after_id)
+        except (TypeError, ValueError):
+            return self._last_id
+        # ID больше текущего - процесс перезапущен, счетчик начался заново
+        return after if after <= self._last_id else 0
+
+
+class RedisEventBackend:
+    """События в Redis Stream, общие для всех воркеров и хостов"""
+
+    def __init__(self, url, size, key='taskmanager:task_events'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._size = size
+        self._key = key
+
+    def publish(self, payload):
+        event_id = self._redis.xadd(self._key, {'data': json.dumps(payload)},
+                                    maxlen=self._size, approximate=True)
+        return event_id.decode()
+
+    def last_id(self):
+        entries = self._redis.xrevrange(self._key, count=1)
+        return entries[0][0].decode() if entries else '0-0'
+
+    def read(self, after_id, timeout):
+        after_id = after_id or self.last_id()
+        response = self._redis.xread({self._key: after_id}, count=self._size,
+                                     block=max(int(timeout * 1000), 1))
+        events = []
+        for _, entries in response or []:
+            for event_id, fields in entries:
+                events.append((event_id.decode(), json.loads(fields[b'data'])))
+        return events, False
+
+
+class TaskEventBroker:
+    """Рассылка изменений задач открытым рабочим столам
+
+    Методы записи TaskService публикуют компактные события, а подписчики
+    (SSE или long-poll) читают их из кольцевого буфера по ID последнего
+    полученного события. Нагрузка пропорциональна числу изменений, а не
+    числу открытых вкладок.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @classmethod
+    def from_config(cls, config):
+        """Создание брокера по настройке TASK_EVENTS_BACKEND"""
+        backend = config.get('TASK_EVENTS_BACKEND')
+        size = config.get('TASK_EVENTS_BUFFER_SIZE', 1000)
+        if backend == 'redis':
+            return cls(RedisEventBackend(config['REDIS_URL'], size))
+        if backend == 'memory':
+            return cls(MemoryEventBackend(size))
+        raise ValueError(f"Неизвестное хранилище событий: {backend}")
+
+    def publish(self, event_type, task):
+        """Публикация события о задаче (ошибка публикации не ломает запись)"""
+        payload = {
+            'type': event_type,
+            'task': {
+                'id': str(task.id),
+                'task_number': task.task_number,
+                'status': task.status,
+                'is_active': task.is_active,
+                'updated_at': task.updated_at.isoformat() if task.updated_at else None
+            },
+            'requester_email': task.requester_email,
+            'published_at': time.time()
+        }
+        try:
+            return self.backend.publish(payload)
+        except Exception as e:
+            print(f"Ошибка публикации события задачи: {e}")
+            return None
+
+    def last_id(self):
+        """ID последнего опубликованного события"""
+        return self.backend.last_id()
+
+    def read(self, after_id, timeout, requester_email=None):
+        """Чтение событий после after_id с ожиданием до timeout секунд
+
+        requester_email - только события задач этого постановщика (для обычных
+        пользователей). Возвращает (события, ID последнего прочитанного события).
+        Если клиент отстал больше, чем на размер буфера, первым идет событие reset.
+        """
+        events, gap = self.backend.read(after_id, timeout)
+        last_id = events[-1][0] if events else (after_id or self.last_id())
+
+        result = []
+        if gap:
+            result.append({'id': last_id, 'type': 'reset'})
+        for event_id, payload in events:
+            if requester_email is not None and payload.get('requester_email') != requester_email:
+                continue
+            result.append({'id': event_id, 'type': payload['type'], 'task': payload['task']})
+        return result, last_id
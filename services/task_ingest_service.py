@@ -0,0 +1,245 @@
+import codecs
+import hashlib
+import json
+import math
+import uuid
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from models.database import db
+from models.task import Task, TaskArchive, TaskStatusEvent
+
+# Поля заявки, которые принимаются из внешних источников
+TASK_FIELDS = ('title', 'description', 'task_type', 'priority', 'requester_name',
+               'requester_department', 'requester_email', 'requester_phone',
+               'deadline', 'estimated_hours', 'screenshot_url')
+# Текстовые поля заявки (длина ограничена столбцом tasks, кроме Text)
+TEXT_FIELDS = ('title', 'description', 'task_type', 'priority', 'requester_name',
+               'requester_department', 'requester_email', 'requester_phone', 'screenshot_url')
+
+
+class TaskIngestService:
+    """Пакетный прием заявок из Google Forms и внешних систем
+
+    Заявки обрабатываются пачками: существующие ключи идемпотентности
+    проверяются одним запросом на пачку, номера задач выделяются
+    непрерывным блоком, вставка выполняется через executemany в одной
+    транзакции на пачку. Повторная отправка той же заявки не создает
+    дубликат, а возвращает уже созданную задачу.
+    """
+
+    def __init__(self, task_service, batch_size=200, max_retries=3):
+        self.db = db
+        self.task_service = task_service
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+    @staticmethod
+    def parse_stream(stream, mimetype):
+        """Потоковый разбор JSON-массива или NDJSON в словари"""
+        if mimetype in ('application/x-ndjson', 'application/jsonl'):
+            lines = codecs.iterdecode(stream, 'utf-8')
+            return (json.loads(line) for line in lines if line.strip())
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get('tasks')
+        if not isinstance(data, list):
+            raise ValueError("Ожидается JSON-массив заявок или NDJSON")
+        return data
+
+    def ingest(self, rows, source=None):
+        """Прием заявок: (результаты по строкам, созданные задачи)"""
+        results = []
+        created = []
+        seen = {}
+        repeats = []
+        rows = iter(rows)
+        row_number = 0
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+
+            numbered = []
+            for row in batch:
+                row_number += 1
+                numbered.append((row_number, row))
+
+            created.extend(self._ingest_batch(numbered, source, seen, repeats, results))
+
+        # Повтор внутри запроса получает результат первой такой строки
+        for row_number, external_id in repeats:
+            first = seen.get(external_id)
+            if first:
+                results.append(dict(first, row=row_number, duplicate=True))
+            else:
+                results.append({'row': row_number, 'success': False, 'external_id': external_id,
+                                'message': "Заявка не принята (см. первую такую строку)"})
+
+        results.sort(key=lambda result: result['row'])
+        return results, created
+
+    def _ingest_batch(self, numbered, source, seen, repeats, results):
+        normalized = []
+        for row_number, row in numbered:
+            try:
+                normalized.append((row_number, self._normalize_row(row, source)))
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append({'row': row_number, 'success': False, 'message': str(e)})
+
+        # Сроки пачки разбираются одним проходом; нераспознанный срок -
+        # ошибка строки, а не задача без срока
+        deadlines, rejects = self.task_service.deadline_parser.parse_many(
+            [record['deadline'] for _, record in normalized])
+        rejected = {reject['index']: reject['message'] for reject in rejects}
+
+        keys = set(seen)
+        valid = []
+        for index, (row_number, record) in enumerate(normalized):
+            if index in rejected:
+                results.append({'row': row_number, 'success': False, 'message': rejected[index]})
+                continue
+            record['deadline'] = deadlines[index]
+
+            if record['external_id'] in keys:
+                repeats.append((row_number, record['external_id']))
+                continue
+            keys.add(record['external_id'])
+            valid.append((row_number, record))
+
+        for _ in range(self.max_retries):
+            if not valid:
+                return []
+            # Уже принятые заявки (повторная отправка) не создаются заново,
+            # в том числе перенесенные в архив
+            external_ids = [record['external_id'] for _, record in valid]
+            existing = {}
+            for model in (Task, TaskArchive):
+                existing.update((external_id, (task_id, task_number)) for external_id, task_id, task_number
+                                in self.db.session.query(model.external_id, model.id, model.task_number).filter(
+                                    model.external_id.in_(external_ids)))
+            pending = []
+            for row_number, record in valid:
+                if record['external_id'] in existing:
+                    task_id, task_number = existing[record['external_id']]
+                    self._add_result(results, seen, row_number, record, str(task_id), task_number,
+                                     duplicate=True)
+                else:
+                    pending.append((row_number, record))
+            valid = pending
+            if not valid:
+                return []
+
+            now = datetime.utcnow()
+            numbers = self.task_service.reserve_task_numbers(len(valid))
+            insert_rows = [dict(record, id=str(uuid.uuid4()), task_number=number,
+                                status='Неразобранная', created_at=now, updated_at=now)
+                           for (_, record), number in zip(valid, numbers)]
+            try:
+                self.db.session.execute(insert(Task), insert_rows)
+                self.db.session.execute(insert(TaskStatusEvent), [
+                    {'task_id': values['id'], 'status': values['status'], 'at': now}
+                    for values in insert_rows])
+                self.db.session.commit()
+            except IntegrityError as e:
+                # Номера заняты параллельной вставкой или заявка принята
+                # другим запросом: пачка повторяется с новой проверкой
+                self.db.session.rollback()
+                print(f"Конфликт при приеме пачки заявок, повтор: {e.orig}")
+                continue
+            except SQLAlchemyError as e:
+                # Остальные пачки запроса принимаются, строки этой - с ошибкой
+                self.db.session.rollback()
+                print(f"Ошибка при приеме пачки заявок: {e}")
+                for row_number, record in valid:
+                    results.append({'row': row_number, 'success': False,
+                                    'external_id': record['external_id'],
+                                    'message': "Ошибка базы данных при сохранении пачки, повторите запрос"})
+                return []
+
+            for (row_number, record), values in zip(valid, insert_rows):
+                self._add_result(results, seen, row_number, record, values['id'], values['task_number'])
+            tasks = Task.query.filter(Task.id.in_([values['id'] for values in insert_rows])).order_by(
+                Task.task_number).all()
+            for task in tasks:
+                self.task_service._publish('created', task)
+            return tasks
+
+        for row_number, record in valid:
+            results.append({'row': row_number, 'success': False,
+                            'external_id': record['external_id'],
+                            'message': "Не удалось выделить номера задач, повторите запрос"})
+        return []
+
+    def _add_result(self, results, seen, row_number, record, task_id, task_number, duplicate=False):
+        result = {'row': row_number, 'success': True, 'external_id': record['external_id'],
+                  'task_id': task_id, 'task_number': task_number, 'duplicate': duplicate}
+        seen[record['external_id']] = result
+        results.append(result)
+
+    def _normalize_row(self, row, source):
+        if not isinstance(row, dict):
+            raise ValueError("Строка должна быть объектом")
+
+        record = {field: row.get(field) for field in TASK_FIELDS}
+        for field in TEXT_FIELDS:
+            record[field] = self._text(field, record[field])
+        title = (record['title'] or '').strip()
+        if not title:
+            raise ValueError("Отсутствует обязательное поле: title")
+        record['title'] = title[:200]
+        record['estimated_hours'] = self._hours(record['estimated_hours'])
+        record['task_type'] = record['task_type'] or 'Прочее'
+        record['priority'] = record['priority'] or 'Средний'
+        record['requester_name'] = record['requester_name'] or 'Не указано'
+        record['requester_department'] = record['requester_department'] or 'Не указано'
+        error = Task.invalid_labels(record)
+        if error:
+            raise ValueError(error)
+        record['external_id'] = self._external_id(row, source)
+        return record
+
+    @staticmethod
+    def _text(field, value):
+        """Текстовое поле: строка (число приводится к строке) не длиннее
+        столбца; title обрезается, остальные поля отклоняются"""
+        if value is None:
+            return None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            raise ValueError(f"Поле {field} должно быть строкой")
+        length = Task.__table__.c[field].type.length
+        if field != 'title' and length and len(value) > length:
+            raise ValueError(f"Поле {field} длиннее {length} символов")
+        return value
+
+    @staticmethod
+    def _hours(value):
+        """estimated_hours: неотрицательное число или None"""
+        if value is None or value == '':
+            return None
+        if isinstance(value, bool):
+            raise ValueError("Поле estimated_hours должно быть числом")
+        try:
+            hours = float(value.replace(',', '.') if isinstance(value, str) else value)
+        except (TypeError, ValueError):
+            raise ValueError("Поле estimated_hours должно быть числом") from None
+        if not math.isfinite(hours) or hours < 0:
+            raise ValueError("Поле estimated_hours должно быть неотрицательным числом")
+        return hours
+
+    @staticmethod
+    def _external_id(row, source):
+        """Ключ идемпотентности: ID заявки в источнике или хеш содержимого
+
+        Без external_id повтором считается заявка с тем же содержимым
+        (включая время ответа формы, если источник его передает).
+        """
+        external_id = row.get('external_id')
+        if external_id:
+            return f"{row.get('source') or source or 'external'}:{external_id}"[:128]
+        content = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+        return 'sha256:' + hashlib.sha256(content.encode('utf-8')).hexdigest()
@@ -1,14 +1,26 @@
-from datetime import datetime, timedelta
-from sqlalchemy import and_, or_, desc, asc
-from models.task import Task, db
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, or_, desc, asc, func, case, literal, select, union_all
+from sqlalchemy.orm import joinedload
+from models.task import Task, TaskArchive, TaskTombstone, db
 from models.user import User
+from utils.deadline_parser import DeadlineParser
+import base64
+import threading
+import time
 import uuid
 
 class TaskService:
     """Сервис для работы с задачами"""
     
-    def __init__(self):
+    def __init__(self, events=None, summary_ttl=5):
         self.db = db
+        # Брокер событий для живого обновления рабочих столов (необязателен)
+        self.events = events
+        # Кэш счетчиков рабочего стола (в пределах процесса)
+        self.summary_ttl = summary_ttl
+        self._summary_cache = {}
+        self._summary_lock = threading.Lock()
+        self.deadline_parser = DeadlineParser()
     
     def create_task_from_form(self, form_data):
         """Создание задачи из данных веб-формы или Google Forms"""
@@ -24,8 +36,8 @@ class TaskService:
                 task_number=task_number,
                 title=form_data.get('title', 'Без названия'),
                 description=form_data.get('description', ''),
-                task_type=form_data.get('task_type', 'Прочее'),
-                priority=form_data.get('priority', 'Средний'),
+                task_type=form_data.get('task_type') or 'Прочее',
+                priority=form_data.get('priority') or 'Средний',
                 requester_name=form_data.get('requester_name', 'Не указано'),
                 requester_department=form_data.get('requester_department', 'Не указано'),
                 requester_email=form_data.get('requester_email'),
@@ -42,6 +54,7 @@ class TaskService:
             
             print(f"Задача успешно сохранена в базе данных с ID: {task.id}")
             
+            self._publish('created', task)
             return task
             
         except Exception as e:
@@ -61,9 +74,8 @@ class TaskService:
             # 2. По статусу (неразобранные выше тех, что в работе)
             asc(Task.status == 'Неразобранная'),
             desc(Task.status == 'В работе'),
-            # 3. По приоритету (высокий приоритет выше низкого)
-            desc(Task.priority == 'Высокий'),
-            desc(Task.priority == 'Средний'),
+            # 3. По приоритету (коды приоритетов идут от высокого к низкому)
+            asc(Task.priority),
             # 4. По дедлайну
             asc(Task.deadline)
         ).all()
@@ -78,6 +90,157 @@ class TaskService:
         
         return tasks
     
+    def mark_overdue_tasks(self, tasks):
+        """Строки рабочего стола: (задача, просрочена) с одним "сейчас" на всех"""
+        now = datetime.utcnow()
+        return [(task, bool(task.deadline and task.is_active and now > task.deadline))
+                for task in tasks]
+    
+    def get_task_summary(self, requester_email=None, active_only=False):
+        """Счетчики рабочего стола одним агрегатным запросом
+        
+        Результат кэшируется на summary_ttl секунд для каждого набора задач
+        и сбрасывается при любом изменении задач через сервис.
+        """
+        key = (requester_email, active_only)
+        now = time.monotonic()
+        with self._summary_lock:
+            cached = self._summary_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        query = self.db.session.query(
+            func.count(Task.id),
+            func.coalesce(func.sum(case((Task.status == 'Неразобранная', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Task.status == 'В работе', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((and_(
+                Task.deadline < datetime.utcnow(),
+                Task.status.notin_(['Готово', 'Отменено'])
+            ), 1), else_=0)), 0)
+        )
+        if active_only:
+            query = query.filter(Task.status.notin_(['Готово', 'Отменено']))
+        if requester_email is not None:
+            query = query.filter(Task.requester_email == requester_email)
+        total, unassigned, in_progress, overdue = query.one()
+        summary = {
+            'total': total,
+            'unassigned': unassigned,
+            'in_progress': in_progress,
+            'overdue': overdue
+        }
+        
+        if self.summary_ttl > 0:
+            with self._summary_lock:
+                self._summary_cache[key] = (now + self.summary_ttl, summary)
+        return summary
+    
+    def summarize_completed_tasks(self, tasks):
+        """Счетчики архива за один проход по задачам"""
+        counters = {'total': 0, 'done': 0, 'cancelled': 0, 'with_completed_at': 0}
+        for task in tasks:
+            counters['total'] += 1
+            if task.status == 'Готово':
+                counters['done'] += 1
+            elif task.status == 'Отменено':
+                counters['cancelled'] += 1
+            if task.completed_at:
+                counters['with_completed_at'] += 1
+        return counters
+    
+    def get_archive_page(self, page=1, per_page=20, status=None, include_archived=False, **filters):
+        """Страница архива в порядке завершения: (задачи, есть ли следующая)
+        
+        Общее количество берется из get_archive_counters, поэтому здесь
+        выбирается на одну строку больше страницы вместо отдельного COUNT.
+        include_archived - вместе с задачами, перенесенными в tasks_archive:
+        страница выбирается по ключам из объединения обеих таблиц, затем
+        задачи загружаются из каждой таблицы одним запросом.
+        """
+        per_page = min(max(per_page, 1), 200)
+        page = max(page, 1)
+        if not include_archived:
+            tasks = self._archive_query(status=status, **filters).order_by(
+                desc(Task.completed_at), desc(Task.id)
+            ).offset((page - 1) * per_page).limit(per_page + 1).all()
+            return tasks[:per_page], len(tasks) > per_page
+        
+        keys = union_all(*[
+            self._archive_query(query=self.db.session.query(
+                model.id.label('id'),
+                model.completed_at.label('completed_at'),
+                literal(model.is_archived).label('archived')
+            ), model=model, status=status, **filters).statement
+            for model in (Task, TaskArchive)
+        ]).subquery()
+        rows = self.db.session.execute(select(keys).order_by(
+            desc(keys.c.completed_at), desc(keys.c.id)
+        ).offset((page - 1) * per_page).limit(per_page + 1)).all()
+        
+        loaded = {}
+        for model in (Task, TaskArchive):
+            ids = [row.id for row in rows[:per_page] if bool(row.archived) == model.is_archived]
+            if ids:
+                loaded.update((str(task.id), task) for task in model.query.filter(model.id.in_(ids)))
+        tasks = [loaded[str(row.id)] for row in rows[:per_page] if str(row.id) in loaded]
+        return tasks, len(rows) > per_page
+    
+    def get_archive_counters(self, include_archived=False, **filters):
+        """Счетчики архива одним агрегатным запросом на таблицу (по индексу status, completed_at)"""
+        counters = {'total': 0, 'done': 0, 'cancelled': 0, 'with_completed_at': 0}
+        for model in (Task, TaskArchive) if include_archived else (Task,):
+            query = self._archive_query(query=self.db.session.query(
+                func.count(model.id),
+                func.coalesce(func.sum(case((model.status == 'Готово', 1), else_=0)), 0),
+                func.coalesce(func.sum(case((model.status == 'Отменено', 1), else_=0)), 0),
+                func.count(model.completed_at)
+            ), model=model, **filters)
+            total, done, cancelled, with_completed_at = query.one()
+            counters['total'] += total
+            counters['done'] += done
+            counters['cancelled'] += cancelled
+            counters['with_completed_at'] += with_completed_at
+        return counters
+    
+    def _archive_query(self, query=None, model=Task, status=None, task_type=None, priority=None,
+                       date_from=None, date_to=None, search=None, assigned_to_id=None):
+        """Запрос выполненных и отмененных задач с фильтрами архива (tasks или tasks_archive)"""
+        query = query if query is not None else model.query
+        if status in ('Готово', 'Отменено'):
+            query = query.filter(model.status == status)
+        else:
+            query = query.filter(model.status.in_(['Готово', 'Отменено']))
+        
+        if task_type:
+            query = query.filter(model.task_type == task_type)
+        if priority:
+            query = query.filter(model.priority == priority)
+        if assigned_to_id:
+            query = query.filter(model.assigned_to_id == assigned_to_id)
+        
+        # Период по дате завершения, обе границы включительно. В архиве
+        # closed_at совпадает с completed_at, если оно есть, и то же условие
+        # по ключу секционирования отсекает лишние месячные секции
+        if date_from:
+            query = query.filter(model.completed_at >= date_from)
+            if model.is_archived:
+                query = query.filter(model.closed_at >= date_from)
+        if date_to:
+            query = query.filter(model.completed_at < date_to + timedelta(days=1))
+            if model.is_archived:
+                query = query.filter(model.closed_at < date_to + timedelta(days=1))
+        
+        if search and search.strip():
+            term = search.strip().lower()
+            term = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f'%{term}%'
+            query = query.filter(or_(
+                func.lower(model.task_number).like(pattern, escape='\\'),
+                func.lower(model.title).like(pattern, escape='\\'),
+                func.lower(model.requester_name).like(pattern, escape='\\')
+            ))
+        return query
+    
     def get_tasks_filtered(self, status=None, task_type=None, priority=None):
         """Получение задач с фильтрацией"""
         query = Task.query
@@ -91,6 +254,67 @@ class TaskService:
         
         return query.order_by(desc(Task.created_at)).all()
     
+    def get_task_rows(self, fields=None, status=None, task_type=None, priority=None,
+                      requester_email=None):
+        """Задачи для API в виде словарей с полями fields (по умолчанию все)
+
+        Выбираются только нужные столбцы, без загрузки моделей; имя
+        исполнителя берется внешним соединением, а не связью на каждую
+        строку. Даты остаются datetime и сериализуются JSON-провайдером.
+        """
+        fields = fields or Task.API_FIELDS
+        columns = [User.name if field == 'assigned_to_name' else getattr(Task, field)
+                   for field in fields]
+        query = self.db.session.query(*columns)
+        if 'assigned_to_name' in fields:
+            query = query.outerjoin(User, User.id == Task.assigned_to_id)
+
+        if status:
+            query = query.filter(Task.status == status)
+        if task_type:
+            query = query.filter(Task.task_type == task_type)
+        if priority:
+            query = query.filter(Task.priority == priority)
+        if requester_email is not None:
+            query = query.filter(Task.requester_email == requester_email)
+
+        return [dict(zip(fields, row)) for row in query.order_by(desc(Task.created_at))]
+
+    @staticmethod
+    def parse_fields(value):
+        """Разбор параметра fields=a,b,c; неизвестные поля - ValueError"""
+        if not value:
+            return None
+        fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in Task.API_FIELDS]
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+        return fields or None
+
+    def get_change_marker(self, status=None, task_type=None, priority=None,
+                          requester_email=None, active_only=False):
+        """Маркер изменений набора задач: количество и max(updated_at)
+        
+        Меняется при создании, изменении и удалении любой задачи набора;
+        считается одним агрегатным запросом для ETag.
+        """
+        query = self.db.session.query(func.count(Task.id), func.max(Task.updated_at))
+        if active_only:
+            query = query.filter(Task.status.notin_(['Готово', 'Отменено']))
+        if status:
+            query = query.filter(Task.status == status)
+        if task_type:
+            query = query.filter(Task.task_type == task_type)
+        if priority:
+            query = query.filter(Task.priority == priority)
+        if requester_email is not None:
+            query = query.filter(Task.requester_email == requester_email)
+        return tuple(query.one())
+    
+    def get_task_marker(self, task_id):
+        """Маркер изменений одной задачи (updated_at) или None, если ее нет"""
+        return self.db.session.query(Task.updated_at).filter(Task.id == task_id).scalar()
+    
     def get_task_by_id(self, task_id):
         """Получение задачи по ID"""
         try:
@@ -98,6 +322,10 @@ class TaskService:
         except:
             return None
     
+    def get_archived_task(self, task_id):
+        """Задача, перенесенная в архив (только для чтения), или None"""
+        return TaskArchive.query.filter(TaskArchive.id == task_id).first()
+    
     def update_task(self, task_id, update_data):
         """Обновление задачи"""
         task = self.get_task_by_id(task_id)
@@ -118,8 +346,98 @@ class TaskService:
         task.updated_at = datetime.utcnow()
         self.db.session.commit()
         
+        self._publish('updated', task)
         return task
     
+    # Поля, которые можно менять пакетным обновлением
+    BATCH_FIELDS = ('status', 'priority', 'task_type', 'assigned_to_id', 'deadline',
+                    'estimated_hours', 'completion_comment', 'title', 'description')
+
+    def update_tasks(self, items, user_id=None):
+        """Пакетное обновление задач одной транзакцией
+
+        items - список {'id': ..., 'changes': {...}}. Задачи и исполнители
+        загружаются одним запросом каждый, изменения проверяются до
+        применения: ошибочные элементы пропускаются, остальные фиксируются
+        одним commit. Смена статуса работает как update_status; при взятии
+        в работу без assigned_to_id задача назначается user_id.
+        Возвращает (результаты по элементам, задачи со сменой статуса).
+        """
+        ids = [str(item.get('id')) for item in items if isinstance(item, dict) and item.get('id')]
+        tasks = {str(task.id): task for task in Task.query.filter(Task.id.in_(ids)).all()} if ids else {}
+        assignee_ids = {str(item['changes']['assigned_to_id']) for item in items
+                        if isinstance(item, dict) and isinstance(item.get('changes'), dict)
+                        and item['changes'].get('assigned_to_id')}
+        assignees = {str(user_id) for (user_id,) in self.db.session.query(User.id).filter(
+            User.id.in_(assignee_ids))} if assignee_ids else set()
+
+        results = []
+        updated = []
+        status_changed = []
+        seen = set()
+        for item in items:
+            task_id = str(item.get('id')) if isinstance(item, dict) and item.get('id') else None
+            changes = item.get('changes') if isinstance(item, dict) else None
+            error = None
+            if not task_id or not isinstance(changes, dict) or not changes:
+                error = "Ожидается {id, changes}"
+            elif task_id in seen:
+                error = "Задача указана в пакете повторно"
+            elif task_id not in tasks:
+                error = "Задача не найдена"
+            else:
+                unknown = [field for field in changes if field not in self.BATCH_FIELDS]
+                if unknown:
+                    error = f"Поля нельзя изменить: {', '.join(unknown)}"
+                elif changes.get('assigned_to_id') and str(changes['assigned_to_id']) not in assignees:
+                    error = "Пользователь не найден"
+                else:
+                    error = Task.invalid_labels(changes)
+
+            if error:
+                results.append({'id': task_id, 'success': False, 'message': error})
+                continue
+
+            seen.add(task_id)
+            task = tasks[task_id]
+            old_status = task.status
+            for field, value in changes.items():
+                if field == 'status':
+                    task.update_status(value, changes.get('assigned_to_id') or user_id)
+                elif field == 'deadline':
+                    task.deadline = self._parse_deadline(value) if value else None
+                else:
+                    setattr(task, field, value)
+            task.updated_at = datetime.utcnow()
+            updated.append(task)
+            if task.status != old_status:
+                status_changed.append(task)
+            results.append({'id': task_id, 'success': True})
+
+        if updated:
+            try:
+                self.db.session.commit()
+            except Exception as e:
+                self.db.session.rollback()
+                print(f"Ошибка пакетного обновления задач: {e}")
+                message = "Ошибка сохранения пакета"
+                return [result if not result['success'] else
+                        {'id': result['id'], 'success': False, 'message': message}
+                        for result in results], []
+
+            # После commit задачи устарели: перечитываются одним запросом
+            # вместе с исполнителями, а не по одной при сериализации
+            Task.query.options(joinedload(Task.assigned_to)).filter(
+                Task.id.in_(list(seen))
+            ).all()
+            for task in updated:
+                self._publish('updated', task)
+
+        for result in results:
+            if result['success']:
+                result['task'] = tasks[result['id']].to_dict()
+        return results, status_changed
+
     def assign_task(self, task_id, user_id):
         """Назначение задачи пользователю"""
         task = self.get_task_by_id(task_id)
@@ -134,8 +452,103 @@ class TaskService:
         task.updated_at = datetime.utcnow()
         
         self.db.session.commit()
+        self._publish('updated', task)
         return task
     
+    def delete_task(self, task_id):
+        """Удаление задачи с отметкой для синхронизации клиентов"""
+        task = self.get_task_by_id(task_id)
+        if not task:
+            raise ValueError("Задача не найдена")
+        
+        self.db.session.add(TaskTombstone(
+            task_id=str(task.id),
+            task_number=task.task_number,
+            requester_email=task.requester_email
+        ))
+        self.db.session.delete(task)
+        self.db.session.commit()
+        
+        self._publish('deleted', task)
+        return task
+    
+    def get_changes_since(self, since=None, limit=500, requester_email=None, settle_seconds=0):
+        """Изменения задач после водяного знака в порядке (updated_at, id)
+        
+        Возвращает (изменения, новый водяной знак, есть ли еще изменения).
+        Изменения последних settle_seconds секунд не отдаются: транзакция,
+        начатая раньше, может зафиксироваться позже, и водяной знак
+        перескочил бы через ее изменения.
+        """
+        cursor = self.decode_watermark(since)
+        upper = datetime.utcnow() - timedelta(seconds=settle_seconds)
+        
+        tasks = Task.query.options(joinedload(Task.assigned_to)).filter(Task.updated_at <= upper)
+        tombstones = TaskTombstone.query.filter(TaskTombstone.deleted_at <= upper)
+        if cursor:
+            moment, last_id = cursor
+            tasks = tasks.filter(or_(
+                Task.updated_at > moment,
+                and_(Task.updated_at == moment, Task.id > last_id)
+            ))
+            tombstones = tombstones.filter(or_(
+                TaskTombstone.deleted_at > moment,
+                and_(TaskTombstone.deleted_at == moment, TaskTombstone.task_id > last_id)
+            ))
+        if requester_email is not None:
+            tasks = tasks.filter(Task.requester_email == requester_email)
+            tombstones = tombstones.filter(TaskTombstone.requester_email == requester_email)
+        
+        # По limit + 1 строке из каждого источника: хватает и для слияния,
+        # и для признака has_more
+        tasks = tasks.order_by(Task.updated_at, Task.id).limit(limit + 1).all()
+        tombstones = tombstones.order_by(TaskTombstone.deleted_at, TaskTombstone.task_id).limit(limit + 1).all()
+        
+        merged = sorted(
+            [(task.updated_at, str(task.id), 'upsert', task) for task in tasks] +
+            [(tombstone.deleted_at, tombstone.task_id,
+              'archive' if tombstone.reason == 'archived' else 'delete', tombstone)
+             for tombstone in tombstones],
+            key=lambda item: (item[0], item[1])
+        )
+        has_more = len(merged) > limit
+        merged = merged[:limit]
+        
+        if merged:
+            moment, last_id = merged[-1][0], merged[-1][1]
+            watermark = self.encode_watermark(moment, last_id)
+        else:
+            watermark = since
+        
+        changes = [{'type': change_type, 'task': item.to_dict()}
+                   for _, _, change_type, item in merged]
+        return changes, watermark, has_more
+    
+    @staticmethod
+    def encode_watermark(moment, last_id):
+        """Непрозрачный водяной знак из (updated_at, id)"""
+        raw = f'{moment.isoformat()}|{last_id}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_watermark(watermark):
+        """Разбор водяного знака; принимает также дату в формате ISO 8601"""
+        if not watermark:
+            return None
+        try:
+            moment = datetime.fromisoformat(watermark)
+            if moment.tzinfo:
+                moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            return moment, ''
+        except ValueError:
+            pass
+        try:
+            padded = watermark + '=' * (-len(watermark) % 4)
+            moment, last_id = base64.urlsafe_b64decode(padded).decode().split('|', 1)
+            return datetime.fromisoformat(moment), last_id
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Некорректный водяной знак since")
+    
     def get_overdue_tasks(self):
         """Получение просроченных задач"""
         return Task.query.filter(
@@ -178,48 +591,39 @@ class TaskService:
             Task.status == 'Неразобранная'
         ).order_by(desc(Task.created_at)).all()
     
+    def _publish(self, event_type, task):
+        """Публикация события об изменении задачи после фиксации транзакции"""
+        with self._summary_lock:
+            self._summary_cache.clear()
+        if self.events is not None:
+            self.events.publish(event_type, task)
+    
     def _generate_task_number(self):
         """Генерация уникального номера задачи"""
+        return self.reserve_task_numbers(1)[0]
+    
+    def reserve_task_numbers(self, count):
+        """Непрерывный блок из count номеров задач за сегодня
+        
+        Номера не блокируются: при параллельной вставке уникальный индекс
+        task_number отклонит транзакцию, и вызывающий код повторит ее.
+        """
         # Формат: TASK-YYYYMMDD-XXXX
         today = datetime.now().strftime('%Y%m%d')
         
         # Поиск последнего номера за сегодня
-        last_task = Task.query.filter(
+        last_number = self.db.session.query(Task.task_number).filter(
             Task.task_number.like(f'TASK-{today}-%')
-        ).order_by(desc(Task.task_number)).first()
-        
-        if last_task:
-            # Извлечение номера и увеличение на 1
-            last_number = int(last_task.task_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        ).order_by(desc(Task.task_number)).limit(1).scalar()
         
-        return f'TASK-{today}-{new_number:04d}'
+        # Извлечение номера и увеличение на 1
+        start = int(last_number.split('-')[-1]) + 1 if last_number else 1
+        return [f'TASK-{today}-{number:04d}' for number in range(start, start + count)]
     
     def _parse_deadline(self, deadline_str):
-        """Парсинг дедлайна из строки"""
-        if not deadline_str:
-            return None
-        
+        """Парсинг дедлайна из строки (нераспознанный срок - None; пакетный
+        прием сообщает об ошибке через DeadlineParser.parse_many)"""
         try:
-            # Попытка парсинга различных форматов даты
-            formats = [
-                '%Y-%m-%d',
-                '%d.%m.%Y',
-                '%d/%m/%Y',
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%dT%H:%M'  # Формат datetime-local
-            ]
-            
-            for fmt in formats:
-                try:
-                    return datetime.strptime(deadline_str, fmt)
-                except ValueError:
-                    continue
-            
-            # Если не удалось распарсить, возвращаем None
-            return None
-            
-        except:
+            return self.deadline_parser.parse(deadline_str)
+        except ValueError:
             return None
@@ -1,4 +1,3 @@
-import requests
 import os
 from datetime import datetime, timedelta
 from models.task import Task
@@ -60,6 +59,8 @@ class TelegramService:
             return True  # Возвращаем True, чтобы не блокировать создание задачи
         
         try:
+            import requests
+            
             url = f"{self.base_url}/sendMessage"
             data = {
                 'chat_id': self.chat_id,
@@ -93,6 +94,8 @@ class TelegramService:
             return False
         
         try:
+            import requests
+            
             # Убираем @ если есть
             username = telegram_username.lstrip('@')
             url = f"{self.base_url}/sendMessage"
@@ -133,6 +136,35 @@ class TelegramService:
         # Отправляем личные уведомления IT сотрудникам
         self._notify_it_staff_new_task(task)
     
+    def send_new_tasks_digest(self, tasks, limit=20):
+        """Одна сводка о нескольких новых заявках (пакетный прием)"""
+        if not tasks:
+            return
+        if len(tasks) == 1:
+            self.send_new_task_notification(tasks[0])
+            return
+
+        message = f"🚨 <b>Новые заявки: {len(tasks)}</b>\n\n"
+        for task in tasks[:limit]:
+            message += f"• {task.task_number}: {task.title} ({task.task_type}, {task.priority})\n"
+        if len(tasks) > limit:
+            message += f"\n... и еще {len(tasks) - limit} заявок"
+
+        # Отправляем в общий чат
+        self.send_message(message)
+
+        # IT сотрудники получают ту же сводку одним личным сообщением
+        try:
+            from models.user import User
+
+            it_staff = User.query.filter_by(role='it_staff', is_active=True).all()
+            for user in it_staff:
+                if user.telegram_username:
+                    self.send_private_message(user.telegram_username,
+                                              message + "\n💻 Перейдите в систему для принятия задач в работу.")
+        except Exception as e:
+            print(f"Ошибка при уведомлении IT сотрудников: {e}")
+
     def send_status_change_notification(self, task):
         """Уведомление об изменении статуса задачи"""
         status_emoji = {
@@ -162,6 +194,52 @@ class TelegramService:
         if task.requester_email:
             self._notify_requester_status_change(task)
     
+    def send_batch_status_notification(self, tasks, limit=20):
+        """Одно уведомление о смене статуса нескольких задач (пакетное обновление)
+
+        В общий чат уходит одно сообщение со списком задач, заявителям - по
+        одному личному сообщению со всеми их задачами пакета.
+        """
+        if not tasks:
+            return
+        if len(tasks) == 1:
+            self.send_status_change_notification(tasks[0])
+            return
+
+        message = f"📊 <b>Изменение статуса задач: {len(tasks)}</b>\n\n"
+        for task in tasks[:limit]:
+            message += f"• {task.task_number}: {task.title} → {task.status}\n"
+        if len(tasks) > limit:
+            message += f"\n... и еще {len(tasks) - limit} задач"
+        self.send_message(message)
+
+        self._notify_requesters_batch_status_change(tasks)
+
+    def _notify_requesters_batch_status_change(self, tasks):
+        """Личные уведомления заявителям: одно сообщение на заявителя"""
+        try:
+            from models.user import User
+
+            by_email = {}
+            for task in tasks:
+                if task.requester_email:
+                    by_email.setdefault(task.requester_email, []).append(task)
+            if not by_email:
+                return
+
+            users = User.query.filter(User.email.in_(list(by_email)), User.is_active == True).all()
+            for user in users:
+                if not user.telegram_username:
+                    continue
+                message = "🔄 <b>Статус ваших задач изменен</b>\n\n"
+                for task in by_email[user.email]:
+                    message += f"• {task.task_number}: {task.title} → {task.status}\n"
+                message += f"\n🔗 Следите за статусом в системе: {self._get_system_url()}"
+                self.send_private_message(user.telegram_username, message)
+
+        except Exception as e:
+            print(f"Ошибка при уведомлении заявителей: {e}")
+
     def _notify_it_staff_new_task(self, task):
         """Уведомление IT сотрудников о новой задаче"""
         try:
@@ -321,6 +399,8 @@ class TelegramService:
             return False, "Токен бота не настроен", None, None
         
         try:
+            import requests
+            
             # Тестируем подключение к боту
             url = f"{self.base_url}/getMe"
             response = requests.get(url, timeout=10)
@@ -0,0 +1,161 @@
+import importlib.util
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _lower_priority():
+    """Инициализатор процесса пула: превью уступают процессор веб-воркерам"""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def render_thumbnail(source_path, target_path, size, image_format, quality, max_pixels):
+    """Уменьшенная копия изображения (выполняется в процессе пула)"""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(source_path) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft('RGB', (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        temp_path = f"{target_path}.{os.getpid()}.tmp"
+        image.save(temp_path, image_format, quality=quality)
+    os.replace(temp_path, target_path)
+    return target_path
+
+
+class ThumbnailService:
+    """Фоновое создание превью изображений во вложениях
+
+    Превью пишутся рядом с оригиналом (<ключ>.<размер>.<webp|jpg>) и не
+    меняются, поэтому отдаются с долгим кэшем. Декодирование выполняется в
+    ограниченном пуле процессов с пониженным приоритетом: одновременно не
+    более max_workers превью и max_pending в очереди. При переполнении
+    задание не ставится, а превью будет запрошено снова при следующем
+    просмотре задачи, поэтому волна загрузок не занимает веб-воркеры.
+    """
+
+    def __init__(self, storage, size=320, image_format='WEBP', quality=80,
+                 max_workers=1, max_pending=16, max_pixels=40000000):
+        self.storage = storage
+        self.size = size
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.max_workers = max_workers
+        self.max_pixels = max_pixels
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        # Файлы, которые не удалось разобрать: повторно не ставятся
+        self._failed = set()
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        # Превью строятся только из файлов на локальном диске
+        self.available = (importlib.util.find_spec('PIL') is not None
+                          and hasattr(storage, 'path'))
+
+    @classmethod
+    def from_config(cls, storage, config):
+        """Создание сервиса из конфигурации Flask приложения"""
+        service = cls(
+            storage,
+            size=config.get('THUMBNAIL_SIZE', 320),
+            image_format=config.get('THUMBNAIL_FORMAT', 'WEBP'),
+            quality=config.get('THUMBNAIL_QUALITY', 80),
+            max_workers=config.get('THUMBNAIL_WORKERS', 1),
+            max_pending=config.get('THUMBNAIL_QUEUE_SIZE', 16),
+            max_pixels=config.get('THUMBNAIL_MAX_PIXELS', 40000000)
+        )
+        if not config.get('THUMBNAILS_ENABLED', True):
+            service.available = False
+        return service
+
+    @property
+    def extension(self):
+        return 'jpg' if self.image_format == 'JPEG' else self.image_format.lower()
+
+    def thumbnail_key(self, sha256):
+        # Модель импортируется здесь: процессы пула (spawn) загружают этот
+        # модуль и не должны тянуть за собой Flask и SQLAlchemy
+        from models.attachment import Attachment
+        return f"{Attachment.key_for(sha256)}.{self.size}.{self.extension}"
+
+    def supports(self, attachment):
+        return self.available and attachment.is_image
+
+    def thumbnail_path(self, attachment):
+        """Путь к готовому превью или None"""
+        if not self.supports(attachment):
+            return None
+        path = self.storage.path(self.thumbnail_key(attachment.sha256))
+        return path if os.path.isfile(path) else None
+
+    def schedule(self, attachment):
+        """Постановка превью в очередь без ожидания; False - очередь заполнена"""
+        if not self.supports(attachment):
+            return False
+        key = self.thumbnail_key(attachment.sha256)
+        with self._lock:
+            if key in self._in_flight:
+                return True
+            if key in self._failed:
+                return False
+            if not self._slots.acquire(blocking=False):
+                print(f"Очередь превью заполнена, пропущено: {attachment.filename}")
+                return False
+            self._in_flight.add(key)
+
+        try:
+            future = self._get_executor().submit(
+                render_thumbnail, self.storage.path(attachment.storage_key), self.storage.path(key),
+                self.size, self.image_format, self.quality, self.max_pixels)
+        except Exception:
+            self._done(key)
+            raise
+        future.add_done_callback(lambda f: self._done(key, f))
+        return True
+
+    def discard(self, hashes):
+        """Удаление превью удаленного содержимого"""
+        for sha256 in hashes:
+            self.storage.delete(self.thumbnail_key(sha256))
+
+    def shutdown(self):
+        """Остановка пула процессов"""
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: fork многопоточного воркера может унести чужие блокировки
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_lower_priority
+                )
+            return self._executor
+
+    def _done(self, key, future=None):
+        with self._lock:
+            self._in_flight.discard(key)
+        self._slots.release()
+        error = future.exception() if future is not None else None
+        if error:
+            print(f"Ошибка создания превью {key}: {error}")
+            with self._lock:
+                if isinstance(error, BrokenProcessPool):
+                    # Процесс пула упал (например, нехватка памяти): пул создается заново
+                    self._executor = None
+                else:
+                    self._failed.add(key)
@@ -0,0 +1,220 @@
+import codecs
+import csv
+import json
+import os
+import uuid
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert, update, or_
+from models.database import db
+from models.user import User
+from utils.session_store import invalidate_user_sessions
+
+VALID_ROLES = ('admin', 'it_staff', 'user')
+REQUIRED_FIELDS = ('username', 'email', 'name', 'department')
+
+
+class ImportTooLarge(ValueError):
+    """Файл больше лимита строк для импорта через API"""
+
+    def __init__(self, limit):
+        super().__init__(f"Больше {limit} строк: загрузите файл командой "
+                         f"python manage.py import-users или разбейте его на части")
+        self.limit = limit
+
+
+class UserImportService:
+    """Сервис массового импорта и обновления пользователей
+
+    Строки обрабатываются пачками: уникальность проверяется одним запросом
+    на пачку, пароли хешируются параллельно, вставка и обновление выполняются
+    через executemany в одной транзакции на пачку. Если пачка не
+    записалась, ее строки записываются по одной, и ошибка попадает в отчет
+    только у строк, которые не удалось записать.
+    """
+
+    def __init__(self, password_service, batch_size=500):
+        self.db = db
+        self.password_service = password_service
+        self.batch_size = batch_size
+
+    @staticmethod
+    def detect_format(filename=None, mimetype=None):
+        """Определение формата импорта по имени файла или MIME-типу"""
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension == '.csv' or mimetype == 'text/csv':
+            return 'csv'
+        if extension in ('.ndjson', '.jsonl') or mimetype in ('application/x-ndjson', 'application/jsonl'):
+            return 'ndjson'
+        if extension == '.json' or mimetype == 'application/json':
+            return 'json'
+        raise ValueError("Не удалось определить формат: ожидается CSV, JSON или NDJSON")
+
+    def parse_stream(self, stream, fmt):
+        """Потоковый разбор CSV, JSON-массива или NDJSON в словари"""
+        if fmt == 'csv':
+            return csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+        if fmt == 'ndjson':
+            lines = codecs.iterdecode(stream, 'utf-8')
+            return (json.loads(line) for line in lines if line.strip())
+        if fmt == 'json':
+            data = json.load(stream)
+            if not isinstance(data, list):
+                raise ValueError("Ожидается JSON-массив пользователей")
+            return iter(data)
+        raise ValueError(f"Неподдерживаемый формат: {fmt}")
+
+    def import_users(self, rows, upsert=False, max_rows=None):
+        """Импорт пользователей с отчетом об ошибках по строкам
+
+        max_rows - лимит строк (ImportTooLarge до записи первой пачки).
+        """
+        report = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+        seen_usernames = set()
+        seen_emails = set()
+        rows = iter(rows)
+        if max_rows is not None:
+            rows = list(islice(rows, max_rows + 1))
+            if len(rows) > max_rows:
+                raise ImportTooLarge(max_rows)
+            rows = iter(rows)
+        row_number = 0
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+
+            numbered = []
+            for row in batch:
+                row_number += 1
+                numbered.append((row_number, row))
+
+            self._import_batch(numbered, upsert, seen_usernames, seen_emails, report)
+
+        report['errors'].sort(key=lambda error: error['row'])
+        return report
+
+    def _import_batch(self, numbered, upsert, seen_usernames, seen_emails, report):
+        valid = []
+        for row_number, row in numbered:
+            try:
+                record = self._normalize_row(row)
+                if record['username'] in seen_usernames:
+                    raise ValueError("Повторяющееся имя пользователя в файле")
+                if record['email'] in seen_emails:
+                    raise ValueError("Повторяющийся email в файле")
+                seen_usernames.add(record['username'])
+                seen_emails.add(record['email'])
+                valid.append((row_number, record))
+            except (ValueError, TypeError, AttributeError) as e:
+                self._add_error(report, row_number, row, str(e))
+
+        if not valid:
+            return
+
+        # Проверка уникальности одним запросом на пачку
+        usernames = [record['username'] for _, record in valid]
+        emails = [record['email'] for _, record in valid]
+        existing = self.db.session.query(User.id, User.username, User.email).filter(
+            or_(User.username.in_(usernames), User.email.in_(emails))
+        ).all()
+        id_by_username = {row.username: row.id for row in existing}
+        id_by_email = {row.email: row.id for row in existing}
+
+        to_insert = []
+        to_update = []
+        for row_number, record in valid:
+            user_id = id_by_username.get(record['username'])
+            email_owner = id_by_email.get(record['email'])
+
+            if user_id and not upsert:
+                self._add_error(report, row_number, record, "Пользователь с таким именем уже существует")
+            elif email_owner and email_owner != user_id:
+                self._add_error(report, row_number, record, "Пользователь с таким email уже существует")
+            elif user_id:
+                record['id'] = user_id
+                to_update.append((row_number, record))
+            else:
+                record['id'] = str(uuid.uuid4())
+                to_insert.append((row_number, record))
+
+        # Параллельное хеширование паролей всей пачки
+        pending = to_insert + to_update
+        hashes = self.password_service.hash_many([record.pop('password') for _, record in pending])
+        for (_, record), password_hash in zip(pending, hashes):
+            if password_hash:
+                record['password_hash'] = password_hash
+
+        now = datetime.utcnow()
+        insert_rows = [dict(record, created_at=now, is_active=True,
+                            password_hash=record.get('password_hash'),
+                            telegram_username=record.get('telegram_username'))
+                       for _, record in to_insert]
+        update_rows = [record for _, record in to_update]
+
+        try:
+            if insert_rows:
+                self.db.session.execute(insert(User), insert_rows)
+            if update_rows:
+                self.db.session.execute(update(User), update_rows)
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            print(f"Пачка импорта не записана, запись по одной строке: {e}")
+            self._write_rows_one_by_one(to_insert, insert_rows, to_update, update_rows, report)
+            return
+
+        for _, record in to_update:
+            invalidate_user_sessions(record['id'])
+
+        report['created'] += len(insert_rows)
+        report['updated'] += len(update_rows)
+
+    def _write_rows_one_by_one(self, to_insert, insert_rows, to_update, update_rows, report):
+        """Запись строк пачки по одной: ошибка одной строки не отменяет остальные"""
+        for statement, numbered, rows, counter in ((insert(User), to_insert, insert_rows, 'created'),
+                                                    (update(User), to_update, update_rows, 'updated')):
+            for (row_number, record), row in zip(numbered, rows):
+                try:
+                    self.db.session.execute(statement, [row])
+                    self.db.session.commit()
+                except Exception as e:
+                    self.db.session.rollback()
+                    self._add_error(report, row_number, record, f"Ошибка записи строки: {e}")
+                    continue
+                if counter == 'updated':
+                    invalidate_user_sessions(record['id'])
+                report[counter] += 1
+
+    def _normalize_row(self, row):
+        if not isinstance(row, dict):
+            raise ValueError("Строка должна быть объектом")
+
+        record = {}
+        for field in REQUIRED_FIELDS:
+            value = (row.get(field) or '').strip()
+            if not value:
+                raise ValueError(f"Отсутствует обязательное поле: {field}")
+            record[field] = value
+
+        role = (row.get('role') or 'user').strip()
+        if role not in VALID_ROLES:
+            raise ValueError("Недопустимая роль")
+        record['role'] = role
+
+        telegram_username = (row.get('telegram_username') or '').strip()
+        if telegram_username:
+            record['telegram_username'] = telegram_username
+
+        # Пустой пароль - пользователь без локального пароля (например, LDAP)
+        record['password'] = row.get('password') or None
+        return record
+
+    def _add_error(self, report, row_number, row, message):
+        report['failed'] += 1
+        report['errors'].append({
+            'row': row_number,
+            'username': row.get('username') if isinstance(row, dict) else None,
+            'message': message
+        })
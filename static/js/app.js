@@ -98,18 +98,175 @@ function updateUserInterface() {
 
 /**
  * Настройка автообновления
+ *
+ * Вместо периодической перезагрузки страницы рабочий стол подписывается на
+ * поток событий /api/tasks/events и обновляет измененные строки на месте.
  */
 function setupAutoRefresh() {
-    // Автообновление каждые 5 минут
-    setInterval(function() {
-        if (document.visibilityState === 'visible') {
-            refreshData();
+    const tbody = document.querySelector('[data-live-tasks]');
+    if (!tbody) {
+        return;
+    }
+    
+    subscribeTaskEvents(tbody.dataset.lastEventId, tbody.dataset.eventsMode === 'stream', function(event) {
+        if (event.type === 'reset') {
+            // Пропущено больше событий, чем хранит сервер
+            location.reload();
+        } else {
+            scheduleTaskRowRefresh(event.task.id);
         }
-    }, 5 * 60 * 1000);
+    });
+}
+
+/**
+ * Подписка на события задач: SSE (если stream и сервер дал место), иначе опрос
+ *
+ * Сервер отвечает на SSE кодом 204, когда мест для потоков нет: EventSource
+ * закрывается, и подписка продолжается опросом с того же события. Опрос
+ * ждет событий на сервере или, если тот занят, повторяется через data.retry секунд.
+ */
+function subscribeTaskEvents(lastId, stream, onEvent) {
+    if (stream && window.EventSource) {
+        // При переподключении браузер сам передает Last-Event-ID
+        const source = new EventSource(`/api/tasks/events?last_id=${encodeURIComponent(lastId || '')}`);
+        source.onmessage = function(message) {
+            lastId = message.lastEventId || lastId;
+            onEvent(JSON.parse(message.data));
+        };
+        source.onerror = function() {
+            if (source.readyState === EventSource.CLOSED) {
+                poll();
+            }
+        };
+        return source;
+    }
+    
+    function poll() {
+        fetch(`/api/tasks/events?poll=1&last_id=${encodeURIComponent(lastId || '')}`, {
+            credentials: 'same-origin'
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            lastId = data.last_id;
+            data.events.forEach(onEvent);
+            setTimeout(poll, (data.retry || 0) * 1000);
+        })
+        .catch(error => {
+            console.error('Ошибка получения событий задач:', error);
+            setTimeout(poll, 5000);
+        });
+    }
+    poll();
+    return null;
+}
+
+// Задачи, строки которых нужно перезапросить (серия событий по одной
+// задаче объединяется в один запрос)
+const pendingTaskRows = new Set();
+let pendingTaskRowsTimer = null;
+
+function scheduleTaskRowRefresh(taskId) {
+    pendingTaskRows.add(taskId);
+    if (!pendingTaskRowsTimer) {
+        pendingTaskRowsTimer = setTimeout(function() {
+            pendingTaskRowsTimer = null;
+            const taskIds = Array.from(pendingTaskRows);
+            pendingTaskRows.clear();
+            Promise.all(taskIds.map(refreshTaskRow)).then(refreshTaskCounters);
+        }, 200);
+    }
+}
+
+/**
+ * Замена строки задачи на рабочем столе актуальной версией с сервера
+ */
+function refreshTaskRow(taskId) {
+    const tbody = document.querySelector('[data-live-tasks]');
+    if (!tbody) {
+        return Promise.resolve();
+    }
+    
+    return fetch(`/api/tasks/${encodeURIComponent(taskId)}/row`, { credentials: 'same-origin' })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            // 204 - задача больше не отображается на рабочем столе
+            return response.status === 204 ? '' : response.text();
+        })
+        .then(html => {
+            const existing = tbody.querySelector(`tr[data-task-id="${CSS.escape(taskId)}"]`);
+            if (!html.trim()) {
+                if (existing) {
+                    existing.remove();
+                }
+            } else {
+                const template = document.createElement('template');
+                template.innerHTML = html.trim();
+                const row = template.content.firstElementChild;
+                if (existing) {
+                    existing.replaceWith(row);
+                } else {
+                    tbody.prepend(row);
+                }
+            }
+            toggleTasksEmptyState(tbody);
+        })
+        .catch(error => console.error('Ошибка обновления строки задачи:', error));
+}
+
+/**
+ * Обновление счетчиков рабочего стола с сервера
+ * (таблица может показывать не все задачи, поэтому строки не пересчитываются)
+ */
+function refreshTaskCounters() {
+    if (!document.getElementById('totalActiveTasks')) {
+        return Promise.resolve();
+    }
+    
+    return fetch('/api/tasks/summary', { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                updateTaskCounters(data.counters);
+            }
+        })
+        .catch(error => console.error('Ошибка обновления счетчиков:', error));
+}
+
+function updateTaskCounters(counters) {
+    const elements = {
+        totalActiveTasks: counters.total,
+        unassignedTasks: counters.unassigned,
+        inProgressTasks: counters.in_progress,
+        overdueTasks: counters.overdue
+    };
+    
+    Object.keys(elements).forEach(id => {
+        const counter = document.getElementById(id);
+        if (counter) {
+            counter.textContent = elements[id];
+        }
+    });
+}
+
+function toggleTasksEmptyState(tbody) {
+    const hasRows = tbody.querySelector('tr[data-task-id]') !== null;
+    const wrapper = document.getElementById('tasksTableWrapper');
+    const emptyState = document.getElementById('tasksEmptyState');
+    if (wrapper && emptyState) {
+        wrapper.classList.toggle('d-none', !hasRows);
+        emptyState.classList.toggle('d-none', hasRows);
+    }
 }
 
 /**
- * Обновление данных
+ * Полное обновление страницы
  */
 function refreshData() {
     // Обновление только если страница активна
@@ -383,6 +540,219 @@ function handleApiError(error, context = '') {
     showNotification(message, 'danger');
 }
 
+/**
+ * Экранирование HTML для строк, вставляемых через innerHTML
+ */
+function escapeHtml(value) {
+    if (value === null || value === undefined) return '';
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+/**
+ * Постраничная подгрузка списка с сервера
+ *
+ * options.url        - адрес JSON API
+ * options.itemsKey   - ключ массива элементов в ответе
+ * options.tbody      - элемент tbody, куда добавляются строки
+ * options.renderRow  - функция, возвращающая HTML строки по элементу
+ * options.params     - функция, возвращающая параметры фильтра
+ * options.moreButton - кнопка "Показать еще" (необязательно)
+ * options.page       - номер уже отрисованной сервером страницы
+ * options.hasNext    - есть ли следующая страница
+ * options.onLoad     - обработчик ответа сервера (необязательно)
+ */
+function createPagedList(options) {
+    let page = options.page || 0;
+    let hasNext = options.hasNext !== undefined ? options.hasNext : true;
+    let loading = false;
+    // Номер набора фильтров: ответы на запросы по старым фильтрам отбрасываются
+    let generation = 0;
+
+    function updateButton() {
+        if (options.moreButton) {
+            options.moreButton.classList.toggle('d-none', !hasNext);
+            options.moreButton.disabled = loading;
+        }
+    }
+
+    function load(reset) {
+        if (reset) {
+            generation += 1;
+            loading = false;
+        }
+        if (loading || (!reset && !hasNext)) return Promise.resolve();
+        loading = true;
+        updateButton();
+        const currentGeneration = generation;
+
+        const params = new URLSearchParams(options.params ? options.params() : {});
+        params.set('page', reset ? 1 : page + 1);
+
+        return fetch(`${options.url}?${params.toString()}`)
+            .then(response => response.json())
+            .then(data => {
+                if (currentGeneration !== generation) return;
+                if (data.success === false) {
+                    throw new Error(data.message);
+                }
+                const html = data[options.itemsKey].map(options.renderRow).join('');
+                if (reset) {
+                    options.tbody.innerHTML = html;
+                } else {
+                    options.tbody.insertAdjacentHTML('beforeend', html);
+                }
+                page = data.page;
+                hasNext = data.has_next;
+                if (options.onLoad) {
+                    options.onLoad(data);
+                }
+            })
+            .catch(error => {
+                if (currentGeneration === generation) {
+                    handleApiError(error, options.url);
+                }
+            })
+            .finally(() => {
+                if (currentGeneration === generation) {
+                    loading = false;
+                    updateButton();
+                }
+            });
+    }
+
+    if (options.moreButton) {
+        options.moreButton.addEventListener('click', () => load(false));
+    }
+    updateButton();
+
+    return {
+        reload: () => load(true),
+        loadMore: () => load(false)
+    };
+}
+
+/**
+ * Бесконечная прокрутка таблицы с виртуализацией по страницам
+ *
+ * Каждая страница - отдельный tbody. Следующая страница подгружается,
+ * когда options.sentinel приближается к экрану. Страницы, далекие от
+ * экрана, заменяются пустой строкой той же высоты и восстанавливаются
+ * из сохраненного HTML при возврате, поэтому размер DOM не растет.
+ *
+ * options.url       - адрес JSON API (отвечает полями html, page, has_next)
+ * options.table     - таблица; tbody[data-page] внутри - уже отрисованные страницы
+ * options.sentinel  - элемент после таблицы, запускающий подгрузку
+ * options.params    - функция, возвращающая параметры фильтра
+ * options.hasNext   - есть ли следующая страница после отрисованных
+ * options.onLoad    - обработчик ответа сервера (необязательно)
+ */
+function createVirtualPager(options) {
+    const table = options.table;
+    const columns = table.querySelectorAll('thead th').length || 1;
+    const pages = new Map();
+    let lastPage = 0;
+    let hasNext = options.hasNext !== undefined ? options.hasNext : true;
+    let loading = false;
+    // Номер набора фильтров: ответы на запросы по старым фильтрам отбрасываются
+    let generation = 0;
+
+    const visibility = new IntersectionObserver(function(entries) {
+        entries.forEach(entry => {
+            const item = pages.get(Number(entry.target.dataset.page));
+            if (!item) return;
+            if (entry.isIntersecting && item.collapsed) {
+                item.tbody.innerHTML = item.html;
+                item.collapsed = false;
+            } else if (!entry.isIntersecting && !item.collapsed) {
+                const height = item.tbody.offsetHeight;
+                item.tbody.innerHTML = `<tr><td colspan="${columns}" style="height: ${height}px; padding: 0; border: 0;"></td></tr>`;
+                item.collapsed = true;
+            }
+        });
+    }, { rootMargin: '2000px 0px' });
+
+    function addPage(page, tbody, html) {
+        tbody.dataset.page = page;
+        pages.set(page, { tbody: tbody, html: html, collapsed: false });
+        visibility.observe(tbody);
+        lastPage = page;
+    }
+
+    function clear() {
+        pages.forEach(item => {
+            visibility.unobserve(item.tbody);
+            item.tbody.remove();
+        });
+        pages.clear();
+        lastPage = 0;
+    }
+
+    function load(reset) {
+        if (reset) {
+            generation += 1;
+            loading = false;
+        }
+        if (loading || (!reset && !hasNext)) return Promise.resolve();
+        loading = true;
+        const currentGeneration = generation;
+
+        const params = new URLSearchParams(options.params ? options.params() : {});
+        params.set('page', reset ? 1 : lastPage + 1);
+        params.set('html', '1');
+
+        return fetch(`${options.url}?${params.toString()}`)
+            .then(response => response.json())
+            .then(data => {
+                if (currentGeneration !== generation) return;
+                if (data.success === false) {
+                    throw new Error(data.message);
+                }
+                if (reset) {
+                    clear();
+                }
+                const tbody = document.createElement('tbody');
+                tbody.innerHTML = data.html;
+                table.appendChild(tbody);
+                addPage(data.page, tbody, data.html);
+                hasNext = data.has_next;
+                if (options.onLoad) {
+                    options.onLoad(data);
+                }
+            })
+            .catch(error => handleApiError(error, options.url))
+            .finally(() => {
+                if (currentGeneration === generation) {
+                    loading = false;
+                    // Короткая страница не сдвинула маркер за пределы экрана:
+                    // наблюдатель не сработает повторно, подгружаем сами
+                    if (hasNext && options.sentinel.getBoundingClientRect().top < window.innerHeight + 600) {
+                        load(false);
+                    }
+                }
+            });
+    }
+
+    table.querySelectorAll('tbody[data-page]').forEach(tbody => {
+        addPage(Number(tbody.dataset.page), tbody, tbody.innerHTML);
+    });
+
+    new IntersectionObserver(function(entries) {
+        if (entries.some(entry => entry.isIntersecting)) {
+            load(false);
+        }
+    }, { rootMargin: '600px 0px' }).observe(options.sentinel);
+
+    return {
+        reload: () => load(true),
+        loadMore: () => load(false)
+    };
+}
+
 /**
  * Утилиты для работы с данными
  */
@@ -437,5 +807,10 @@ window.TaskManager = {
     searchTable,
     sortTable,
     filterTasks,
+    escapeHtml,
+    createPagedList,
+    createVirtualPager,
+    refreshTaskRow,
+    refreshTaskCounters,
     DataUtils
 };
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import request, send_from_directory, url_for
+from utils.compression import brotli
+
+try:
+    import rjsmin
+except ImportError:  # без rjsmin JS не минифицируется, только сжимается
+    rjsmin = None
+
+# Каталог сборки внутри static и манифест "исходный путь -> путь с хешем"
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.css', '.js')
+PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+
+
+def minify_css(source):
+    """Простая минификация CSS: комментарии и лишние пробелы"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    # Пробел перед ":" значим в селекторах (.table :first-child)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify(filename, source):
+    if filename.endswith('.css'):
+        return minify_css(source)
+    if filename.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return source
+
+
+def build_assets(static_folder, minify_assets=True):
+    """Сборка статики: минификация, имена с хешем содержимого, .gz и .br
+
+    Результат пишется в static/dist вместе с манифестом; файлы прежних
+    сборок удаляются. Возвращает манифест.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    built = set()
+
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) != dist]
+        for name in sorted(files):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            source_path = os.path.join(root, name)
+            logical = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+            with open(source_path, encoding='utf-8') as source:
+                content = source.read()
+            if minify_assets:
+                content = minify(name, content)
+            data = content.encode('utf-8')
+
+            stem, ext = os.path.splitext(logical)
+            hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write(target, data)
+            _write(target + PRECOMPRESSED['gzip'], gzip.compress(data, compresslevel=9, mtime=0))
+            built.update({target, target + PRECOMPRESSED['gzip']})
+            if brotli is not None:
+                _write(target + PRECOMPRESSED['br'], brotli.compress(data, quality=11))
+                built.add(target + PRECOMPRESSED['br'])
+
+            manifest[logical] = hashed
+            print(f"{logical} -> {DIST_DIR}/{hashed} ({len(data)} байт)")
+
+    # Файлы прежних сборок больше не упоминаются в манифесте
+    for root, _, files in os.walk(dist):
+        for name in files:
+            path = os.path.join(root, name)
+            if path not in built and name != MANIFEST_NAME:
+                os.remove(path)
+
+    _write(os.path.join(dist, MANIFEST_NAME),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _write(path, data):
+    with open(path, 'wb') as target:
+        target.write(data)
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as manifest:
+        return json.load(manifest)
+
+
+def init_assets(app):
+    """Подключение собранной статики (python manage.py build-assets)
+
+    Шаблоны получают asset_url(filename): при наличии манифеста это URL
+    файла с хешем, который отдается с Cache-Control immutable, иначе
+    (разработка без сборки) - обычный url_for('static').
+    """
+    manifest = load_manifest(app.static_folder) if app.config.get('ASSETS_USE_MANIFEST', True) else {}
+    app.extensions['assets_manifest'] = manifest
+    dist = os.path.join(app.static_folder, DIST_DIR)
+    max_age = app.config.get('ASSETS_MAX_AGE', 31536000)
+
+    def asset_url(filename):
+        hashed = manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('dist_asset', filename=hashed)
+
+    @app.route(f'{app.static_url_path}/{DIST_DIR}/<path:filename>', endpoint='dist_asset')
+    def dist_asset(filename):
+        """Собранный файл; сжатая копия отдается по Accept-Encoding"""
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in PRECOMPRESSED.items():
+            if (request.accept_encodings.quality(encoding) > 0
+                    and os.path.isfile(os.path.join(dist, filename + suffix))):
+                response = send_from_directory(dist, filename + suffix, mimetype=mimetype,
+                                               max_age=max_age)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(dist, filename, mimetype=mimetype, max_age=max_age)
+        response.vary.add('Accept-Encoding')
+        # Имя меняется вместе с содержимым, поэтому файл не перепроверяется
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -0,0 +1,59 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него ответы сжимаются gzip
+    brotli = None
+
+# Суффиксы ETag сжатых представлений: у каждого кодирования свой ETag,
+# иначе кэш мог бы подменить сжатый ответ несжатым с тем же тегом
+ETAG_ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gzip'}
+
+
+def negotiate_encoding(accept_encodings):
+    """Кодирование ответа по Accept-Encoding: br, gzip или None"""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+def init_compression(app):
+    """Сжатие ответов (JSON, HTML) по Accept-Encoding"""
+    if not app.config.get('COMPRESS_RESPONSES', True):
+        return
+
+    mimetypes = set(app.config['COMPRESS_MIMETYPES'])
+    min_size = app.config['COMPRESS_MIN_SIZE']
+
+    @app.after_request
+    def compress_response(response):
+        # Потоки (SSE) и файлы отдаются как есть
+        if (response.status_code != 200 or response.mimetype not in mimetypes
+                or response.direct_passthrough or response.is_streamed):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if 'Content-Encoding' in response.headers:
+            return response
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(etag + ETAG_ENCODING_SUFFIXES[encoding], weak=weak)
+        return response
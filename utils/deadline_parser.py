@@ -0,0 +1,123 @@
+import re
+from datetime import datetime, timezone
+
+# ISO 8601 в виде, который понимает datetime.fromisoformat (Python 3.9):
+# дата, время через T или пробел, доли секунды из 3 или 6 цифр, пояс
+# Z / +03:00 / +0300 (только вместе со временем)
+ISO_RE = re.compile(
+    r'(?P<date>\d{4}-\d{2}-\d{2})'
+    r'(?:[T ](?P<time>\d{2}:\d{2}(?::\d{2}(?:\.\d{3}(?:\d{3})?)?)?)'
+    r'(?:(?P<utc>Z)|(?P<tz_hours>[+-]\d{2}):?(?P<tz_minutes>\d{2}))?)?'
+)
+# День.месяц.год и день/месяц/год, время необязательно
+DMY_RE = re.compile(r'(\d{1,2})([./])(\d{1,2})\2(\d{4})(?:[T ](\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+# ISO с однозначными месяцем и днем (2024-1-5), как допускал strptime
+LOOSE_ISO_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ](\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+
+
+def _from_iso(match):
+    date, time, utc, hours, minutes = match.groups()
+    if not utc and not hours:
+        return datetime.fromisoformat(match.string)
+    return datetime.fromisoformat(f"{date}T{time}{'+00:00' if utc else f'{hours}:{minutes}'}")
+
+
+def _from_dmy(match):
+    day, _, month, year, hour, minute, second = match.groups()
+    return datetime(int(year), int(month), int(day),
+                    int(hour or 0), int(minute or 0), int(second or 0))
+
+
+def _from_loose_iso(match):
+    year, month, day, hour, minute, second = match.groups()
+    return datetime(int(year), int(month), int(day),
+                    int(hour or 0), int(minute or 0), int(second or 0))
+
+
+# Форматы в порядке проверки: (имя, выражение, сборка datetime)
+DEADLINE_FORMATS = (
+    ('iso', ISO_RE, _from_iso),
+    ('dmy', DMY_RE, _from_dmy),
+    ('loose_iso', LOOSE_ISO_RE, _from_loose_iso),
+)
+
+
+class DeadlineParser:
+    """Разбор сроков задач из форм и внешних источников
+
+    Формат выбирается по заранее скомпилированным выражениям, datetime
+    собирается без strptime (ISO - через fromisoformat). Срок с часовым
+    поясом переводится в UTC и хранится без пояса, как created_at.
+    parse_many разбирает столбец значений пачки: формат, подошедший
+    предыдущему значению, проверяется первым, повторяющиеся строки
+    разбираются один раз, а ошибки возвращаются списком отказов.
+    """
+
+    def __init__(self, formats=DEADLINE_FORMATS):
+        self.formats = formats
+
+    def parse(self, value):
+        """Срок из строки или datetime; None для пустого значения,
+        ValueError - если разобрать не удалось"""
+        return self._parse(value, self.formats)[0]
+
+    def parse_many(self, values):
+        """Разбор столбца сроков: (значения по порядку, отказы)
+
+        Отказ - словарь с index, value и message; на его месте в списке
+        значений стоит None.
+        """
+        parsed = []
+        rejects = []
+        cache = {}
+        formats = self.formats
+        for index, value in enumerate(values):
+            try:
+                result = cache[value]
+            except KeyError:
+                try:
+                    result, fmt = self._parse(value, formats)
+                except ValueError as e:
+                    result = e
+                else:
+                    if fmt is not formats[0]:
+                        # Следующие значения пачки скорее всего в том же формате
+                        formats = (fmt,) + tuple(f for f in self.formats if f is not fmt)
+                if isinstance(value, str):
+                    cache[value] = result
+            except TypeError:
+                # Нехешируемое значение (список, объект JSON)
+                result = ValueError(f"Некорректный срок: ожидается строка, получено {type(value).__name__}")
+
+            if isinstance(result, ValueError):
+                rejects.append({'index': index, 'value': value, 'message': str(result)})
+                result = None
+            parsed.append(result)
+        return parsed, rejects
+
+    def _parse(self, value, formats):
+        if value is None:
+            return None, formats[0]
+        if isinstance(value, datetime):
+            return self._naive_utc(value), formats[0]
+        if not isinstance(value, str):
+            raise ValueError(f"Некорректный срок: ожидается строка, получено {type(value).__name__}")
+
+        text = value.strip()
+        if not text:
+            return None, formats[0]
+        for fmt in formats:
+            match = fmt[1].fullmatch(text)
+            if match:
+                try:
+                    return self._naive_utc(fmt[2](match)), fmt
+                except ValueError:
+                    # 31.02.2024, 25:00 и т.п.
+                    raise ValueError(f"Некорректный срок: несуществующая дата {text!r}") from None
+        raise ValueError(f"Некорректный срок: неизвестный формат {text!r}")
+
+    @staticmethod
+    def _naive_utc(value):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
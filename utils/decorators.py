@@ -1,6 +1,9 @@
+import hashlib
+import hmac
 from functools import wraps
-from flask import session, redirect, url_for, flash, abort
+from flask import current_app, session, redirect, url_for, flash, abort, g, request, jsonify
 from models.user import User
+from utils.session_store import get_session_claims
 
 def login_required(f):
     """Декоратор для проверки аутентификации пользователя"""
@@ -21,13 +24,14 @@ def role_required(required_roles):
                 flash('Необходимо войти в систему', 'warning')
                 return redirect(url_for('login'))
             
-            user = User.query.get(session['user_id'])
-            if not user or not user.is_active:
+            # Роль и статус берутся из утверждений сессии, без запроса к БД
+            claims = get_session_claims()
+            if not claims or not claims['active']:
                 session.pop('user_id', None)
                 flash('Сессия истекла. Войдите снова.', 'warning')
                 return redirect(url_for('login'))
             
-            if user.role not in required_roles:
+            if claims['role'] not in required_roles:
                 flash('Недостаточно прав для доступа к этой странице', 'danger')
                 return redirect(url_for('dashboard'))
             
@@ -47,11 +51,52 @@ def user_or_higher_required(f):
     """Декоратор для проверки прав пользователя или выше"""
     return role_required(['admin', 'it_staff', 'user'])(f)
 
+def upload_size_limit(get_limit, overhead=64 * 1024):
+    """Декоратор отказа (413) по Content-Length до разбора тела загрузки
+    
+    get_limit возвращает лимит размера файла; overhead - запас на поля
+    формы и границы multipart. Загрузки без Content-Length проверяются
+    при копировании в хранилище.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limit = get_limit()
+            if request.content_length is not None and request.content_length > limit + overhead:
+                return jsonify({
+                    'success': False,
+                    'message': f'Файл больше допустимого размера ({limit // (1024 * 1024)} МБ)'
+                }), 413
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def token_required(config_key):
+    """Декоратор проверки токена внешнего источника (Authorization: Bearer)
+    
+    Ставится выше декораторов, которые пишут в базу (idempotent), чтобы
+    запрос без токена отклонялся до них. Вызывающий определяется по
+    отпечатку токена (g.api_principal), а не по сессии.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            token = current_app.config.get(config_key)
+            header = request.headers.get('Authorization', '')
+            if not token or not hmac.compare_digest(header.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+                return jsonify({'error': 'Unauthorized'}), 401
+            g.api_principal = 'token:' + hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
 def get_current_user():
     """Получение текущего пользователя из сессии"""
-    if 'user_id' in session:
-        return User.query.get(session['user_id'])
-    return None
+    if 'user_id' not in session:
+        return None
+    if 'current_user' not in g:
+        g.current_user = User.query.get(session['user_id'])
+    return g.current_user
 
 def can_manage_tasks(user):
     """Проверка, может ли пользователь управлять задачами"""
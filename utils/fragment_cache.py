@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """LRU-кэш отрендеренных фрагментов шаблонов (строк таблиц)
+
+    Ключ фрагмента включает все, от чего зависит его HTML (ID и updated_at
+    задачи, имя исполнителя, признак просрочки, вариант для роли), поэтому
+    кэш не нужно сбрасывать: измененная задача просто получает новый ключ, а
+    старая запись вытесняется по LRU.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """Фрагмент по ключу; при промахе рендерится через render()"""
+        if self.max_entries <= 0:
+            return render()
+
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+
+        fragment = render()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = fragment
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_fragment_cache(app):
+    """Подключение кэша фрагментов и функции cached_row к шаблонам"""
+    app.extensions['fragment_cache'] = FragmentCache(app.config.get('FRAGMENT_CACHE_SIZE', 10000))
+    app.jinja_env.globals['cached_row'] = cached_row
+
+
+def cached_row(template_name, task, overdue=False, can_manage=False):
+    """Строка таблицы задач из кэша фрагментов
+
+    Шаблон строки получает только task, overdue и can_manage. Из связанных
+    записей выводится только имя исполнителя: его изменение не меняет
+    updated_at задачи, поэтому имя входит в ключ отдельно (исполнители
+    загружаются по одному разу на запрос через identity map сессии).
+    """
+    assignee = task.assigned_to.name if task.assigned_to_id and task.assigned_to else None
+    key = (template_name, str(task.id), task.updated_at, assignee, overdue, can_manage)
+
+    def render():
+        template = current_app.jinja_env.get_template(template_name)
+        return Markup(template.render(task=task, overdue=overdue, can_manage=can_manage))
+
+    return current_app.extensions['fragment_cache'].get_or_render(key, render)
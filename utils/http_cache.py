@@ -0,0 +1,53 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import make_response, request
+from utils.compression import ETAG_ENCODING_SUFFIXES
+
+
+def make_etag(*parts):
+    """Строгий ETag из маркера изменений (кортеж простых значений)"""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def time_bucket(seconds):
+    """Номер интервала времени: для ответов, зависящих от текущего времени
+    (просрочка, окна "за последние N дней"), ETag меняется раз в интервал"""
+    return int(datetime.utcnow().timestamp() // seconds)
+
+
+def conditional_get(marker):
+    """Декоратор условного GET по ETag
+
+    marker(*args, **kwargs) возвращает дешевый маркер изменений (кортеж) или
+    None, если ответ кэшировать нельзя. Маркер вычисляется до вызова
+    обработчика: при совпадении If-None-Match тяжелые запросы не выполняются
+    и сразу возвращается 304.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            parts = marker(*args, **kwargs)
+            if parts is None:
+                return f(*args, **kwargs)
+
+            # Путь с параметрами входит в ETag: одинаковые маркеры разных
+            # ресурсов и фильтров не совпадут
+            etag = make_etag(request.full_path, *parts)
+            # Клиент присылает тег своего представления (сжатые - с суффиксом)
+            matched = next((etag + suffix for suffix in ('',) + tuple(ETAG_ENCODING_SUFFIXES.values())
+                            if request.if_none_match.contains(etag + suffix)), None)
+            if matched:
+                response = make_response('', 304)
+                etag = matched
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Браузер хранит ответ, но каждый раз подтверждает его у сервера
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
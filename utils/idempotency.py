@@ -0,0 +1,189 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, g, jsonify, make_response, request, session
+from sqlalchemy.exc import IntegrityError
+from models.database import db
+from models.idempotency import IdempotencyKey
+
+# Время последней очистки устаревших ключей в этом процессе
+_last_cleanup = 0.0
+
+
+def request_fingerprint():
+    """Отпечаток тела запроса
+
+    Для форм берутся поля, имена и sha256 содержимого файлов, а не сырое
+    тело: граница multipart меняется при каждой отправке одной и той же формы.
+    """
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        fields = sorted(request.form.items(multi=True))
+        files = sorted((name, file.filename, _file_digest(file))
+                       for name, file in request.files.items(multi=True))
+        raw = json.dumps([fields, files], ensure_ascii=False).encode('utf-8')
+    else:
+        raw = request.get_data(cache=True)
+    return hashlib.sha256(request.path.encode('utf-8') + b'\n' + raw).hexdigest()
+
+
+def _file_digest(file, chunk_size=64 * 1024):
+    """sha256 загруженного файла; поток возвращается в начало для обработчика"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.stream.read(chunk_size), b''):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+
+def idempotent(scope, content_window=None):
+    """Декоратор идемпотентного POST по заголовку Idempotency-Key
+
+    Первый запрос с ключом выполняется, его успешный ответ (2xx, 3xx)
+    сохраняется и отдается повторам с заголовком Idempotent-Replayed.
+    Повтор во время выполнения первого запроса получает 409, тот же ключ
+    с другим телом - 422. Ошибочные ответы не сохраняются: клиент может
+    повторить запрос. content_window (секунды) включает защиту запросов
+    без ключа: одинаковые отправки одного пользователя в этом окне
+    считаются повтором.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            config = current_app.config
+            header = request.headers.get('Idempotency-Key')
+            if not header and not content_window:
+                return f(*args, **kwargs)
+            if header and len(header) > 255:
+                return jsonify({
+                    'success': False,
+                    'message': 'Idempotency-Key длиннее 255 символов'
+                }), 400
+
+            # Тело читается целиком: декоратор не для потоковых загрузок
+            fingerprint = request_fingerprint()
+            # Вызывающий: внешний источник по токену (token_required) или
+            # пользователь сессии
+            principal = g.get('api_principal') or str(session.get('user_id') or 'anonymous')
+            if header:
+                key = _make_key(scope, principal, 'key', header)
+                ttl = config['IDEMPOTENCY_KEY_TTL']
+            else:
+                key = _make_key(scope, principal, 'content', fingerprint)
+                ttl = content_window
+
+            state, record = claim(key, fingerprint, ttl)
+            if state == 'replay':
+                return replay(record)
+            if state == 'mismatch':
+                return jsonify({
+                    'success': False,
+                    'message': 'Idempotency-Key уже использован с другим запросом'
+                }), 422
+            if state == 'in_progress':
+                return jsonify({
+                    'success': False,
+                    'message': 'Запрос с этим ключом еще выполняется'
+                }), 409
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                release(key)
+                raise
+            if 200 <= response.status_code < 400:
+                complete(key, response)
+            else:
+                release(key)
+            return response
+        return decorated_function
+    return decorator
+
+
+def _make_key(*parts):
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def claim(key, fingerprint, ttl):
+    """Захват ключа: ('new' | 'replay' | 'in_progress' | 'mismatch', запись)"""
+    _cleanup_expired()
+    now = datetime.utcnow()
+    for _ in range(2):
+        db.session.add(IdempotencyKey(key=key, fingerprint=fingerprint, created_at=now,
+                                      expires_at=now + timedelta(seconds=ttl)))
+        try:
+            db.session.commit()
+            return 'new', None
+        except IntegrityError:
+            db.session.rollback()
+
+        record = db.session.get(IdempotencyKey, key)
+        if record is None:
+            continue
+        lock_timeout = timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+        # Истекший ключ и брошенный захват (воркер упал) занимаются заново
+        if record.expires_at <= now or (record.status_code is None and record.created_at + lock_timeout <= now):
+            db.session.delete(record)
+            db.session.commit()
+            continue
+        if record.fingerprint != fingerprint:
+            return 'mismatch', record
+        if record.status_code is None:
+            return 'in_progress', record
+        return 'replay', record
+    return 'in_progress', None
+
+
+def complete(key, response):
+    """Сохранение успешного ответа для повторов"""
+    try:
+        record = db.session.get(IdempotencyKey, key)
+        if record is None:
+            return
+        record.status_code = response.status_code
+        record.response_body = response.get_data(as_text=True)
+        record.content_type = response.content_type
+        record.location = response.headers.get('Location')
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Ошибка сохранения ответа идемпотентного запроса: {e}")
+
+
+def release(key):
+    """Снятие захвата: запрос не удался и может быть повторен"""
+    try:
+        db.session.rollback()
+        IdempotencyKey.query.filter_by(key=key).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Ошибка снятия ключа идемпотентности: {e}")
+
+
+def replay(record):
+    response = make_response(record.response_body or '', record.status_code)
+    if record.content_type:
+        response.headers['Content-Type'] = record.content_type
+    if record.location:
+        response.headers['Location'] = record.location
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _cleanup_expired():
+    """Удаление устаревших ключей не чаще раза в IDEMPOTENCY_CLEANUP_INTERVAL"""
+    global _last_cleanup
+    now = time.monotonic()
+    if now - _last_cleanup < current_app.config['IDEMPOTENCY_CLEANUP_INTERVAL']:
+        return
+    _last_cleanup = now
+    try:
+        deleted = IdempotencyKey.query.filter(IdempotencyKey.expires_at < datetime.utcnow()).delete()
+        db.session.commit()
+        if deleted:
+            print(f"Удалено устаревших ключей идемпотентности: {deleted}")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Ошибка очистки ключей идемпотентности: {e}")
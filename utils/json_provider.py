@@ -0,0 +1,49 @@
+import json
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него работает стандартный json
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON-провайдер Flask на orjson (если установлен)
+
+    Ответы пишутся в UTF-8 без экранирования кириллицы и без сортировки
+    ключей. Даты сериализуются в ISO 8601, как в Task.to_dict(), поэтому
+    сервисы могут отдавать строки выборки с datetime без .isoformat().
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = json.dumps(obj, default=self.default, ensure_ascii=False,
+                              separators=(',', ':')).encode('utf-8')
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+def init_json_provider(app):
+    """Подключение быстрого JSON-провайдера к приложению"""
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,63 @@
+import random
+import threading
+import time
+
+
+class Scheduler:
+    """Периодические задания в фоновом потоке воркера
+
+    Задание выполняется в контексте приложения не чаще раза в interval
+    секунд; ошибка печатается и не останавливает поток. Воркеры не
+    согласуют запуски между собой, поэтому задания должны выдерживать
+    параллельное выполнение (архиватор берет строки с SKIP LOCKED).
+    """
+
+    def __init__(self, app, tick=30):
+        self.app = app
+        self.tick = tick
+        self._jobs = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_job(self, name, func, interval, initial_delay=None):
+        """Регистрация задания; первый запуск по умолчанию - в случайный
+        момент первого интервала, чтобы воркеры не стартовали одновременно"""
+        if initial_delay is None:
+            initial_delay = random.uniform(0, interval)
+        self._jobs.append({'name': name, 'func': func, 'interval': interval,
+                           'next_run': time.monotonic() + initial_delay})
+
+    def start(self):
+        """Запуск фонового потока (повторный вызов ничего не делает)"""
+        if self._thread is None and self._jobs:
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_pending(self):
+        """Выполнение заданий, время которых подошло"""
+        now = time.monotonic()
+        for job in self._jobs:
+            if job['next_run'] <= now:
+                self._run_job(job)
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            self.run_pending()
+
+    def _run_job(self, job):
+        with self.app.app_context():
+            try:
+                job['func']()
+            except Exception as e:
+                print(f"Ошибка фонового задания {job['name']}: {e}")
+        job['next_run'] = time.monotonic() + job['interval']
+
+
+def init_scheduler(app):
+    """Планировщик фоновых заданий приложения (запускается в create_app)"""
+    scheduler = Scheduler(app, tick=app.config['SCHEDULER_TICK_SECONDS'])
+    app.extensions['scheduler'] = scheduler
+    return scheduler
@@ -0,0 +1,55 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.types import Integer
+
+from models.database import db
+
+LABEL_COLUMNS = ('status', 'task_type', 'priority')
+# PRAGMA user_version SQLite-базы, в которой коды уже проверены
+LABEL_CODES_SCHEMA_VERSION = 1
+
+
+class SchemaOutdated(RuntimeError):
+    """База не обновлена до схемы, которую читает текущий код"""
+
+
+def check_label_codes(app):
+    """Проверка при запуске, что status, task_type и priority хранятся кодами
+
+    Без convert-label-codes / migration_task_label_codes.sql каждое чтение
+    задачи падает в LabelCode.result_processor, поэтому приложение лучше не
+    запускать вовсе. Если база недоступна или таблицы tasks еще нет,
+    проверка пропускается. PostgreSQL проверяется по типам столбцов. В SQLite
+    значения проверяются один раз: успешная проверка записывается в
+    PRAGMA user_version, и следующие запуски таблицу не читают.
+    """
+    with app.app_context():
+        try:
+            if db.engine.dialect.name == 'sqlite':
+                with db.engine.begin() as conn:
+                    if conn.exec_driver_sql('PRAGMA user_version').scalar() >= LABEL_CODES_SCHEMA_VERSION:
+                        return
+                    if not inspect(conn).has_table('tasks'):
+                        return
+                    # После конвертации значения - числа (или строки из цифр в
+                    # старых столбцах VARCHAR); поиск останавливается на первой подписи
+                    condition = ' OR '.join(f"{column} NOT GLOB '[0-9]*'" for column in LABEL_COLUMNS)
+                    outdated = conn.execute(text(f'SELECT 1 FROM tasks WHERE {condition} LIMIT 1')).first()
+                    if not outdated:
+                        conn.exec_driver_sql(f'PRAGMA user_version = {LABEL_CODES_SCHEMA_VERSION}')
+                command = 'python manage.py convert-label-codes'
+            else:
+                inspector = inspect(db.engine)
+                if not inspector.has_table('tasks'):
+                    return
+                types = {column['name']: column['type'] for column in inspector.get_columns('tasks')}
+                outdated = any(not isinstance(types.get(column), Integer) for column in LABEL_COLUMNS)
+                command = 'psql -f database/migration_task_label_codes.sql'
+        except SQLAlchemyError as e:
+            print(f"Проверка схемы пропущена: {e}")
+            return
+
+    if outdated:
+        raise SchemaOutdated(
+            "Статусы, типы и приоритеты задач хранятся подписями, а не кодами. "
+            f"Обновите базу ({command}, см. DEPLOYMENT.md, \"Обновление базы данных\")")
@@ -0,0 +1,287 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask import current_app, g, has_app_context, session
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class MemorySessionBackend:
+    """Хранилище сессий в памяти процесса (для тестов и разработки)"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._user_versions = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            item = self._sessions.get(sid)
+            if not item:
+                return None
+            expires, data = item
+            if expires < time.time():
+                del self._sessions[sid]
+                return None
+            return json.loads(data)
+
+    def save(self, sid, data, ttl):
+        with self._lock:
+            self._sessions[sid] = (time.time() + ttl, json.dumps(data))
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def get_user_version(self, user_id):
+        return self._user_versions.get(user_id, 0)
+
+    def bump_user_version(self, user_id):
+        with self._lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+
+class SQLiteSessionBackend:
+    """Хранилище сессий в файле SQLite, общее для воркеров одного хоста
+
+    Истекшие сессии удаляются попутно при сохранении, не чаще раза в
+    ``purge_interval`` секунд на процесс.
+    """
+
+    def __init__(self, path, purge_interval=300):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                           '(sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS user_versions '
+                           '(user_id TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+        self._lock = threading.Lock()
+        self._purge_interval = purge_interval
+        self._next_purge = 0
+
+    def load(self, sid):
+        with self._lock:
+            row = self._conn.execute('SELECT data, expires FROM sessions WHERE sid = ?',
+                                     (sid,)).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def save(self, sid, data, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+                               (sid, json.dumps(data), now + ttl))
+            if now >= self._next_purge:
+                self._next_purge = now + self._purge_interval
+                self._conn.execute('DELETE FROM sessions WHERE expires < ?', (now,))
+
+    def delete(self, sid):
+        with self._lock:
+            self._conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def get_user_version(self, user_id):
+        with self._lock:
+            row = self._conn.execute('SELECT version FROM user_versions WHERE user_id = ?',
+                                     (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_user_version(self, user_id):
+        with self._lock:
+            self._conn.execute('INSERT INTO user_versions (user_id, version) VALUES (?, 1) '
+                               'ON CONFLICT(user_id) DO UPDATE SET version = version + 1',
+                               (user_id,))
+
+
+class RedisSessionBackend:
+    """Хранилище сессий в Redis"""
+
+    def __init__(self, url, prefix='taskmanager:'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def load(self, sid):
+        data = self._redis.get(f'{self._prefix}session:{sid}')
+        return json.loads(data) if data else None
+
+    def save(self, sid, data, ttl):
+        self._redis.setex(f'{self._prefix}session:{sid}', int(ttl), json.dumps(data))
+
+    def delete(self, sid):
+        self._redis.delete(f'{self._prefix}session:{sid}')
+
+    def get_user_version(self, user_id):
+        version = self._redis.get(f'{self._prefix}user_version:{user_id}')
+        return int(version) if version else 0
+
+    def bump_user_version(self, user_id):
+        self._redis.incr(f'{self._prefix}user_version:{user_id}')
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Сессия, данные которой хранятся на сервере, а в cookie только ее ID"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Смена ID сессии (защита от фиксации сессии при входе)"""
+        self.previous_sid = self.sid
+        self.sid = _generate_sid()
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Интерфейс сессий Flask поверх серверного хранилища"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.backend.load(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession(sid=_generate_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid:
+            self.backend.delete(session.previous_sid)
+
+        if not session:
+            if session.modified and not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        if not session.modified and not self.should_set_cookie(app, session):
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        self.backend.save(session.sid, dict(session), ttl)
+        response.set_cookie(
+            cookie_name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def _generate_sid():
+    return secrets.token_urlsafe(32)
+
+
+def create_session_backend(config):
+    """Создание хранилища сессий по настройке SESSION_BACKEND"""
+    backend = config.get('SESSION_BACKEND')
+    if backend == 'redis':
+        return RedisSessionBackend(config['REDIS_URL'])
+    if backend == 'sqlite':
+        path = config.get('SESSION_SQLITE_PATH') or 'sessions.db'
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        return SQLiteSessionBackend(path)
+    if backend == 'memory':
+        return MemorySessionBackend()
+    raise ValueError(f"Неизвестное хранилище сессий: {backend}")
+
+
+def init_session_store(app):
+    """Подключение серверных сессий к приложению"""
+    app.session_interface = ServerSideSessionInterface(create_session_backend(app.config))
+
+
+def _get_backend():
+    interface = current_app.session_interface
+    return getattr(interface, 'backend', None)
+
+
+def build_claims(user, version):
+    """Компактные утверждения о пользователе, хранимые в сессии"""
+    return {'role': user.role, 'active': bool(user.is_active), 'v': version}
+
+
+def get_session_claims():
+    """Получение роли и статуса текущего пользователя из сессии
+
+    Утверждения берутся из сессии, пока их версия совпадает с версией
+    пользователя в хранилище. Иначе (роль изменена, пользователь
+    деактивирован) они перечитываются из базы данных.
+    """
+    if 'session_claims' in g:
+        return g.session_claims
+
+    user_id = session.get('user_id')
+    if not user_id:
+        return None
+
+    backend = _get_backend()
+    version = backend.get_user_version(user_id) if backend else 0
+    claims = session.get('claims')
+
+    if not claims or claims.get('v') != version:
+        from models.user import User
+
+        user = User.query.get(user_id)
+        if not user or not user.is_active:
+            claims = None
+            session.pop('claims', None)
+        else:
+            claims = build_claims(user, version)
+            session['claims'] = claims
+
+    g.session_claims = claims
+    return claims
+
+
+def start_user_session(user):
+    """Вход: новая сессия с ID пользователя и его утверждениями"""
+    session.clear()
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
+    backend = _get_backend()
+    version = backend.get_user_version(str(user.id)) if backend else 0
+    session['user_id'] = str(user.id)
+    session['claims'] = build_claims(user, version)
+    g.pop('session_claims', None)
+
+
+def end_user_session():
+    """Выход: очистка данных сессии"""
+    session.clear()
+    g.pop('session_claims', None)
+
+
+def invalidate_user_sessions(user_id):
+    """Отзыв утверждений во всех сессиях пользователя
+
+    Следующий запрос любой из его сессий перечитает роль и статус из базы
+    данных; деактивированный пользователь сразу будет разлогинен.
+    """
+    if not has_app_context():
+        return
+    backend = _get_backend()
+    if backend:
+        backend.bump_user_version(str(user_id))